@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Throughput and peak memory of the Python pipeline stages on synthetic data.
+
+Stages:
+    parse_replays   JSON decode + log parsing + tags (fetch_replays backfill path)
+    parse_chaos     Smogon chaos JSON -> per-species top lists (fetch_smogon_stats)
+    load_replays    streaming COPY writer into replays            (needs DATABASE_URL)
+    pair_synergy    scripts/build_pair_synergy.py                 (needs DATABASE_URL)
+    counters        scripts/build_counters.py                     (needs DATABASE_URL)
+
+Each stage runs in a fresh child process so peak RSS is measured per stage.
+DB stages write under format_id 'bench' and clean up afterwards; point
+DATABASE_URL at a local Postgres, never production.
+
+Usage:
+    python benchmarks/run.py --replays 10000
+    python benchmarks/run.py --replays 1000000 --stages parse_replays,load_replays
+    python benchmarks/run.py compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path[:0] = [BENCH_DIR, SCRIPTS_DIR]
+
+import synth
+
+BENCH_FORMAT = "bench"
+ALL_STAGES = ["parse_replays", "parse_chaos", "load_replays", "pair_synergy", "counters"]
+DB_STAGES = {"load_replays", "pair_synergy", "counters"}
+AGGREGATE_STAGES = {"pair_synergy", "counters"}
+BENCH_TABLES = ["counters", "pair_synergy", "pokemon_usage", "replays", "aggregate_daily", "aggregate_watermarks"]
+
+def rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+# ---- stages (each returns the number of items processed) ----
+
+def stage_parse_replays(ctx: dict) -> int:
+    from fetch_replays import iter_dump_replays
+    return sum(1 for _ in iter_dump_replays(ctx["replays_path"], 0, workers=0))
+
+def stage_parse_chaos(ctx: dict) -> int:
+    from fetch_smogon_stats import load_chaos_file
+    return len(load_chaos_file(ctx["chaos_path"]))
+
+def stage_load_replays(ctx: dict) -> int:
+    import psycopg2
+    from fetch_replays import iter_dump_replays
+    from replay_writer import ReplayWriter
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    count = 0
+    try:
+        with ReplayWriter(conn, BENCH_FORMAT) as writer:
+            for record in iter_dump_replays(ctx["replays_path"], 0, workers=0):
+                writer.write(record)
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+def bench_window_days() -> str:
+    """Window (and retention) covering every synthetic replay, which start in the past."""
+    return str(int((time.time() - synth.START_TIME) // 86400) + 2)
+
+def stage_pair_synergy(ctx: dict) -> int:
+    os.environ["FORMAT_ID"] = BENCH_FORMAT
+    os.environ["WINDOW_DAYS"] = os.environ["RETENTION_DAYS"] = bench_window_days()
+    import build_pair_synergy
+    build_pair_synergy.build_pair_synergy(full_rebuild=True)
+    return ctx["replays"]
+
+def stage_counters(ctx: dict) -> int:
+    os.environ["FORMAT_ID"] = BENCH_FORMAT
+    os.environ["WINDOW_DAYS"] = os.environ["RETENTION_DAYS"] = bench_window_days()
+    import build_counters
+    build_counters.build_counters(full_rebuild=True)
+    return ctx["replays"]
+
+STAGE_FUNCS = {
+    "parse_replays": stage_parse_replays,
+    "parse_chaos": stage_parse_chaos,
+    "load_replays": stage_load_replays,
+    "pair_synergy": stage_pair_synergy,
+    "counters": stage_counters,
+}
+
+def stage_child(name: str, ctx: dict, results):
+    baseline = rss_mb()
+    log = io.StringIO()
+    try:
+        with redirect_stdout(log):
+            start = time.perf_counter()
+            items = STAGE_FUNCS[name](ctx)
+            seconds = time.perf_counter() - start
+        peak = rss_mb()
+        results.put({
+            "items": items,
+            "seconds": round(seconds, 4),
+            "items_per_sec": round(items / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": round(peak, 1),
+            "rss_delta_mb": round(peak - baseline, 1),
+        })
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}", "log_tail": log.getvalue()[-2000:]})
+
+def run_stage(name: str, ctx: dict) -> dict:
+    ctx_proc = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    results = ctx_proc.Queue()
+    proc = ctx_proc.Process(target=stage_child, args=(name, ctx, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+# ---- database fixtures ----
+
+def prepare_database(ctx: dict):
+    """Reset bench rows and register the synthetic species and threats."""
+    import psycopg2
+    from bulk_writer import bulk_upsert
+    from species import slugify
+
+    pool = synth.species_pool(ctx["species"])
+    weights = synth.zipf_weights(len(pool))
+    total = sum(weights)
+    bucket = datetime.now().strftime("%Y-%m")
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        cursor = conn.cursor()
+        for table in BENCH_TABLES:
+            cursor.execute(f"DELETE FROM {table} WHERE format_id = %s", (BENCH_FORMAT,))
+        bulk_upsert(conn, "pokemon_dim", ("slug", "name"),
+                    [(slugify(name), name) for name in pool], conflict=("slug",), update=())
+        usage_rows = [
+            (BENCH_FORMAT, bucket, 1760, slugify(name), round(min(99.0, 600 * w / total), 2), rank)
+            for rank, (name, w) in enumerate(zip(pool, weights), 1)
+        ]
+        bulk_upsert(conn, "pokemon_usage",
+                    ("format_id", "time_bucket", "cutoff", "pokemon", "usage_rate", "rank"),
+                    usage_rows, conflict=("format_id", "time_bucket", "cutoff", "pokemon"))
+        conn.commit()
+    finally:
+        conn.close()
+
+def backdate_replays():
+    """Move bench replays out of the aggregate builders' watermark lag."""
+    import psycopg2
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE replays SET indexed_at = indexed_at - INTERVAL '1 hour' WHERE format_id = %s",
+                       (BENCH_FORMAT,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def cleanup_database():
+    import psycopg2
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        cursor = conn.cursor()
+        for table in BENCH_TABLES:
+            cursor.execute(f"DELETE FROM {table} WHERE format_id = %s", (BENCH_FORMAT,))
+        conn.commit()
+    finally:
+        conn.close()
+
+# ---- results ----
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.check_output(["git", *args], cwd=ROOT_DIR, text=True,
+                                           stderr=subprocess.DEVNULL).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def compare(old_path: str, new_path: str):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'stage':16s} {'old items/s':>14s} {'new items/s':>14s} {'speedup':>8s} "
+          f"{'old MB':>8s} {'new MB':>8s}")
+    for name in ALL_STAGES:
+        a, b = old["stages"].get(name), new["stages"].get(name)
+        if not a or not b or "error" in a or "error" in b:
+            continue
+        speedup = (b["items_per_sec"] or 0) / a["items_per_sec"] if a["items_per_sec"] else float("nan")
+        print(f"{name:16s} {a['items_per_sec']:14.1f} {b['items_per_sec']:14.1f} {speedup:7.2f}x "
+              f"{a['rss_delta_mb']:8.1f} {b['rss_delta_mb']:8.1f}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+        parser.add_argument("command")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        args = parser.parse_args()
+        compare(args.old, args.new)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the Python data pipeline")
+    parser.add_argument("--replays", type=int, default=10000, help="Synthetic replays (1k to 1M)")
+    parser.add_argument("--species", type=int, default=120, help="Species pool for replays")
+    parser.add_argument("--chaos-species", type=int, default=300, help="Species in the chaos file")
+    parser.add_argument("--chaos-spreads", type=int, default=1500, help="Max spreads per species")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES), help="Comma-separated stages")
+    parser.add_argument("--workdir", help="Where to write generated data (default: temp dir)")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+    if DB_STAGES & set(stages) and not os.environ.get("DATABASE_URL"):
+        print("DATABASE_URL not set, skipping database stages")
+        stages = [s for s in stages if s not in DB_STAGES]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="vgc-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    ctx = {
+        "replays": args.replays,
+        "species": args.species,
+        "replays_path": os.path.join(workdir, f"replays-{args.replays}.jsonl"),
+        "chaos_path": os.path.join(workdir, f"chaos-{args.chaos_species}-{args.chaos_spreads}.json"),
+    }
+
+    if not os.path.exists(ctx["replays_path"]):
+        print(f"Generating {args.replays} replays -> {ctx['replays_path']}")
+        with open(ctx["replays_path"], "w", encoding="utf-8") as f:
+            for replay in synth.iter_replays(args.replays, args.species):
+                f.write(json.dumps(replay) + "\n")
+    if "parse_chaos" in stages and not os.path.exists(ctx["chaos_path"]):
+        print(f"Generating chaos file -> {ctx['chaos_path']}")
+        with open(ctx["chaos_path"], "w", encoding="utf-8") as f:
+            json.dump(synth.make_chaos(args.chaos_species, args.chaos_spreads), f)
+
+    if DB_STAGES & set(stages):
+        prepare_database(ctx)
+
+    results = {}
+    try:
+        for name in stages:
+            if name in AGGREGATE_STAGES:
+                backdate_replays()
+            print(f"Running {name}...", end=" ", flush=True)
+            results[name] = run_stage(name, ctx)
+            r = results[name]
+            if "error" in r:
+                print(f"failed ({r['error']})")
+            else:
+                print(f"{r['items_per_sec']} items/s, {r['seconds']}s, peak +{r['rss_delta_mb']} MB")
+    finally:
+        if DB_STAGES & set(stages):
+            cleanup_database()
+
+    revision = git_revision()
+    report = {
+        **revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": {
+            "replays": args.replays,
+            "species": args.species,
+            "chaos_species": args.chaos_species,
+            "chaos_spreads": args.chaos_spreads,
+        },
+        "stages": results,
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(revision['commit'] or 'nogit')[:8]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
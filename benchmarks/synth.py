@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+Realistic synthetic Showdown replays and Smogon chaos JSON for benchmarks.
+
+Species usage follows a Zipf distribution over a VGC-like species pool, so
+team overlap, pair counts and counter matrices look like real ladder data.
+Everything is seeded and generated lazily, so 1M replays never sit in
+memory at once.
+
+Usage:
+    python synth.py replays --count 1000 --output replays.jsonl.gz
+    python synth.py chaos --species 300 --output chaos.json
+"""
+
+import argparse
+import gzip
+import json
+import random
+from typing import Iterator
+
+# uploadtime of the first synthetic replay (replays are one minute apart)
+START_TIME = 1760000000
+
+CORE_SPECIES = [
+    "Flutter Mane", "Incineroar", "Rillaboom", "Urshifu-Rapid-Strike", "Tornadus",
+    "Landorus-Therian", "Amoonguss", "Iron Hands", "Chien-Pao", "Pelipper",
+    "Kingdra", "Torkoal", "Venusaur", "Hatterene", "Indeedee-F", "Chi-Yu",
+    "Ogerpon-Wellspring", "Farigiraf", "Gholdengo", "Raging Bolt", "Calyrex-Shadow",
+    "Miraidon", "Koraidon", "Whimsicott", "Dragonite", "Kingambit", "Porygon2",
+    "Dusclops", "Ursaluna", "Gouging Fire", "Archaludon", "Basculegion",
+    "Talonflame", "Murkrow", "Grimmsnarl", "Zamazenta-Crowned", "Iron Bundle",
+    "Entei", "Armarouge", "Politoed", "Ninetales-Alola", "Garchomp",
+]
+
+MOVES = [
+    "Protect", "Fake Out", "Tailwind", "Trick Room", "Moonblast", "Shadow Ball",
+    "Flare Blitz", "Knock Off", "Parting Shot", "Wood Hammer", "Grassy Glide",
+    "Surging Strikes", "Close Combat", "Aqua Jet", "Bleakwind Storm", "Spore",
+    "Rage Powder", "Pollen Puff", "Drain Punch", "Wild Charge", "Icicle Crash",
+    "Sucker Punch", "Sacred Sword", "Heat Wave", "Dazzling Gleam", "Icy Wind",
+    "Follow Me", "Helping Hand", "Earth Power", "Sludge Bomb", "Hurricane",
+]
+ITEMS = [
+    "Booster Energy", "Sitrus Berry", "Safety Goggles", "Assault Vest", "Choice Scarf",
+    "Choice Specs", "Focus Sash", "Life Orb", "Covert Cloak", "Mystic Water",
+    "Rocky Helmet", "Clear Amulet", "Leftovers", "Wellspring Mask", "Eviolite",
+]
+ABILITIES = ["Intimidate", "Protosynthesis", "Drizzle", "Drought", "Grassy Surge", "Regenerator", "Prankster"]
+TERA_TYPES = [
+    "Fairy", "Grass", "Water", "Fire", "Ghost", "Steel", "Dragon", "Ground",
+    "Flying", "Normal", "Electric", "Dark", "Psychic", "Poison", "Bug", "Rock", "Ice", "Fighting",
+]
+NATURES = ["Timid", "Modest", "Jolly", "Adamant", "Bold", "Calm", "Careful", "Impish", "Relaxed", "Sassy"]
+
+def species_pool(size: int) -> list[str]:
+    """Core species plus numbered filler species up to size."""
+    pool = list(CORE_SPECIES[:size])
+    pool += [f"Fillermon-{i}" for i in range(size - len(pool))]
+    return pool
+
+def zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1.0 / (rank + 1) ** s for rank in range(n)]
+
+def sample_team(rng: random.Random, pool: list[str], weights: list[float]) -> list[str]:
+    team: list[str] = []
+    while len(team) < 6:
+        mon = rng.choices(pool, weights)[0]
+        if mon not in team:
+            team.append(mon)
+    return team
+
+def make_log(rng: random.Random, p1: str, p2: str, team1: list[str], team2: list[str],
+             winner: str, turns: int) -> str:
+    lines = [
+        f"|j|☆{p1}", f"|j|☆{p2}", "|gametype|doubles",
+        f"|player|p1|{p1}|{rng.randint(1, 300)}|{rng.randint(1500, 2000)}",
+        f"|player|p2|{p2}|{rng.randint(1, 300)}|{rng.randint(1500, 2000)}",
+        "|teamsize|p1|6", "|teamsize|p2|6", "|gen|9",
+        "|tier|[Gen 9] VGC 2026 Reg F", "|rated|", "|rule|Species Clause: Limit one of each Pokémon",
+        "|clearpoke",
+    ]
+    for side, team in (("p1", team1), ("p2", team2)):
+        for mon in team:
+            gender = rng.choice(["", ", M", ", F"])
+            lines.append(f"|poke|{side}|{mon}, L50{gender}|")
+    lines += ["|teampreview|4", "|", "|t:|1760000000", "|start"]
+    for side, team in (("p1", team1), ("p2", team2)):
+        for slot, mon in zip("ab", team[:2]):
+            lines.append(f"|switch|{side}{slot}: {mon}|{mon}, L50|100/100")
+    for turn in range(1, turns + 1):
+        lines += [f"|turn|{turn}", "|"]
+        for side, team in (("p1", team1), ("p2", team2)):
+            for slot in "ab":
+                mon = rng.choice(team[:4])
+                foe = "p2" if side == "p1" else "p1"
+                lines.append(f"|move|{side}{slot}: {mon}|{rng.choice(MOVES)}|{foe}a: target")
+                lines.append(f"|-damage|{foe}a: target|{rng.randint(0, 100)}/100")
+        lines.append(f"|t:|{1760000000 + turn * 30}")
+    lines.append(f"|win|{winner}")
+    return "\n".join(lines)
+
+def iter_replays(count: int, species: int = 120, seed: int = 0, start_time: int = START_TIME,
+                 format_name: str = "gen9vgc2026regf") -> Iterator[dict]:
+    """Yield synthetic Showdown replay JSON objects (as served by /<id>.json)."""
+    rng = random.Random(seed)
+    pool = species_pool(species)
+    weights = zipf_weights(len(pool))
+    for i in range(count):
+        team1 = sample_team(rng, pool, weights)
+        team2 = sample_team(rng, pool, weights)
+        p1, p2 = f"Player{rng.randint(1, 50000)}", f"Trainer{rng.randint(1, 50000)}"
+        winner = rng.choice([p1, p2])
+        upload_time = start_time + i * 60
+        yield {
+            "id": f"{format_name}-{seed}{i:07d}",
+            "format": format_name,
+            "players": [p1, p2],
+            "log": make_log(rng, p1, p2, team1, team2, winner, rng.randint(6, 16)),
+            "uploadtime": upload_time,
+            "rating": rng.randint(1500, 2000),
+            "views": rng.randint(0, 100),
+        }
+
+def weighted_counts(rng: random.Random, keys: list[str], total: float) -> dict[str, float]:
+    weights = [rng.random() ** 3 for _ in keys]
+    scale = total / (sum(weights) or 1)
+    return {k: round(w * scale, 3) for k, w in zip(keys, weights)}
+
+def make_chaos(species: int = 300, spreads: int = 1500, battles: int = 200000, seed: int = 0) -> dict:
+    """Build a chaos JSON document shaped like smogon.com/stats/<month>/chaos/<format>.json."""
+    rng = random.Random(seed)
+    pool = species_pool(species)
+    weights = zipf_weights(len(pool))
+    total_weight = sum(weights)
+    data = {}
+    for name, weight in zip(pool, weights):
+        usage = min(0.95, 6 * weight / total_weight)
+        count = usage * battles * 2
+        spread_keys = [
+            f"{rng.choice(NATURES)}:{rng.choice([0, 4, 252])}/{rng.choice([0, 4, 252])}/"
+            f"{rng.choice([0, 4, 252])}/{rng.choice([0, 4, 252])}/{rng.choice([0, 4, 252])}/{i % 253}"
+            for i in range(rng.randint(spreads // 4, spreads))
+        ]
+        teammates = [m for m in rng.sample(pool, min(len(pool), 80)) if m != name]
+        data[name] = {
+            "Raw count": int(count),
+            "usage": usage,
+            "Viability Ceiling": [int(count), 90, 80, 70],
+            "Abilities": weighted_counts(rng, rng.sample(ABILITIES, 3), count),
+            "Items": weighted_counts(rng, ITEMS, count),
+            "Moves": weighted_counts(rng, MOVES, count * 4),
+            "Tera Types": weighted_counts(rng, TERA_TYPES, count),
+            "Spreads": weighted_counts(rng, spread_keys, count),
+            "Happiness": {"255": count},
+            "Teammates": weighted_counts(rng, teammates, count * 5),
+            "Checks and Counters": {},
+        }
+    return {"info": {"metagame": "gen9vgc2026regf", "cutoff": 1760, "cutoff deviation": 0,
+                     "team type": None, "number of battles": battles},
+            "data": data}
+
+def make_usage_text(chaos: dict) -> str:
+    """Usage .txt table matching a chaos document."""
+    battles = chaos["info"]["number of battles"]
+    ranked = sorted(chaos["data"].items(), key=lambda kv: -kv[1]["usage"])
+    lines = [f" Total battles: {battles}", " Avg. weight/team: 0.5",
+             " + ---- + ------------------ + --------- + ------ + ------- + ------ + ------- + ",
+             " | Rank | Pokemon            | Usage %   | Raw    | %       | Real   | %       | ",
+             " + ---- + ------------------ + --------- + ------ + ------- + ------ + ------- + "]
+    for rank, (name, info) in enumerate(ranked, 1):
+        lines.append(f" | {rank:<4d} | {name:<18s} | {info['usage'] * 100:8.5f}% | {info['Raw count']:<6d} "
+                     f"| {info['usage'] * 100:6.3f}% | {info['Raw count']:<6d} | {info['usage'] * 100:6.3f}% | ")
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark data")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("replays", help="Synthetic replay JSONL (one /<id>.json object per line)")
+    rep.add_argument("--count", type=int, default=1000)
+    rep.add_argument("--species", type=int, default=120)
+    rep.add_argument("--seed", type=int, default=0)
+    rep.add_argument("--output", required=True, help="Output path (.jsonl or .jsonl.gz)")
+    chaos = sub.add_parser("chaos", help="Synthetic chaos JSON")
+    chaos.add_argument("--species", type=int, default=300)
+    chaos.add_argument("--spreads", type=int, default=1500)
+    chaos.add_argument("--seed", type=int, default=0)
+    chaos.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    if args.command == "replays":
+        opener = gzip.open if args.output.endswith(".gz") else open
+        with opener(args.output, "wt", encoding="utf-8") as f:
+            for replay in iter_replays(args.count, args.species, args.seed):
+                f.write(json.dumps(replay) + "\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(make_chaos(args.species, args.spreads, seed=args.seed), f)
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -88,9 +88,15 @@ COMMENT ON COLUMN pair_synergy.pair_rate IS 'pair_team_rate: teams containing bo
 COMMENT ON COLUMN pair_synergy.pair_sample_size IS 'Number of teams containing both A and B';
 COMMENT ON COLUMN pair_synergy.battle_sample_size IS 'Number of battles containing both A and B';
 COMMENT ON COLUMN pair_synergy.top_third_partners IS 'PartnerList@v1: { "_v": 1, "data": [{ "pokemon": "...", "pct": 25.7, "n": 813, "rank": 1, "ci": [24.2, 27.3] }] }';
+COMMENT ON COLUMN pair_synergy.top_fourth_partners IS 'PartnerList@v1: fourth members for the pair plus its top third partner; pct = teams with all four / teams with the three';
 COMMENT ON COLUMN pair_synergy.common_leads IS 'LeadList@v1: { "_v": 1, "data": [{ "lead": ["a", "b"], "pct": 15.2, "n": 482, "rank": 1 }] }';
 COMMENT ON COLUMN pair_synergy.sample_pastes IS 'PasteBundle@v1';
 
+-- 95% Wilson bounds on pair_rate (added after v2; ALTER keeps existing databases in step)
+ALTER TABLE pair_synergy ADD COLUMN IF NOT EXISTS pair_rate_ci_low DECIMAL(5, 2);
+ALTER TABLE pair_synergy ADD COLUMN IF NOT EXISTS pair_rate_ci_high DECIMAL(5, 2);
+COMMENT ON COLUMN pair_synergy.pair_rate_ci_low IS '95% Wilson interval of pair_rate (percent); NULL if unknown';
+
 CREATE INDEX IF NOT EXISTS idx_synergy_pair ON pair_synergy(pokemon_a, pokemon_b);
 CREATE INDEX IF NOT EXISTS idx_synergy_format_time ON pair_synergy(format_id, time_bucket);
 
@@ -128,6 +134,11 @@ COMMENT ON COLUMN counters.loss_appearance_rate IS 'Denominator: n_losses. Numer
 COMMENT ON COLUMN counters.win_appearance_rate IS 'Denominator: n_wins. Numerator: answer_in_wins.';
 COMMENT ON COLUMN counters.evidence_replays IS 'ReplayRefList@v1: { "_v": 1, "data": [{ "replay_id": "...", "played_at": "...", "rating": 1900, "rating_source": "official" }] }';
 
+-- 95% Newcombe bounds on effectiveness_score (added after v2; ALTER keeps existing databases in step)
+ALTER TABLE counters ADD COLUMN IF NOT EXISTS effectiveness_ci_low DECIMAL(5, 4);
+ALTER TABLE counters ADD COLUMN IF NOT EXISTS effectiveness_ci_high DECIMAL(5, 4);
+COMMENT ON COLUMN counters.effectiveness_ci_low IS '95% Newcombe interval of effectiveness_score (difference of the two appearance rates); NULL if either rate is undefined';
+
 CREATE INDEX IF NOT EXISTS idx_counters_target ON counters(target_pokemon);
 CREATE INDEX IF NOT EXISTS idx_counters_format_time ON counters(format_id, time_bucket);
 
@@ -171,6 +182,42 @@ CREATE UNIQUE INDEX IF NOT EXISTS replays_battle_id_uidx ON replays (replay_id);
 CREATE INDEX IF NOT EXISTS idx_pair_synergy_lookup ON pair_synergy(format_id, time_bucket, pokemon_a, pokemon_b);
 CREATE INDEX IF NOT EXISTS idx_counters_lookup ON counters(format_id, time_bucket, target_pokemon);
 
+-- Incremental aggregate builds read replays by indexed_at
+CREATE INDEX IF NOT EXISTS idx_replays_format_indexed ON replays (format_id, indexed_at);
+
+-- ============================================================
+-- Daily aggregate partials (raw counts behind pair_synergy / counters)
+-- ============================================================
+CREATE TABLE IF NOT EXISTS aggregate_daily (
+    format_id VARCHAR(50) NOT NULL,
+    cutoff INTEGER NOT NULL,
+    day DATE NOT NULL,                     -- played_at date (indexed_at if unknown)
+    replay_count INTEGER NOT NULL DEFAULT 0,
+    partials BYTEA NOT NULL,               -- npz of pair, counters and itemset counts
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (format_id, cutoff, day)
+);
+
+CREATE TABLE IF NOT EXISTS aggregate_watermarks (
+    format_id VARCHAR(50) NOT NULL,
+    cutoff INTEGER NOT NULL,
+    watermark TIMESTAMP WITH TIME ZONE,    -- replays.indexed_at folded in up to here
+    species JSONB NOT NULL DEFAULT '[]'::jsonb, -- slug order of every daily blob
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (format_id, cutoff)
+);
+
+-- ============================================================
+-- Similar-team index (MinHash LSH over replay teams, scripts/team_index.py)
+-- ============================================================
+CREATE TABLE IF NOT EXISTS team_index (
+    format_id VARCHAR(50) PRIMARY KEY,
+    replay_count INTEGER NOT NULL DEFAULT 0,
+    species JSONB NOT NULL DEFAULT '[]'::jsonb, -- slug order of the species IDs
+    index_data BYTEA NOT NULL,             -- npz of teams, LSH band keys and replay postings
+    built_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- ============================================================
 -- Archetypes
 -- ============================================================
@@ -205,6 +252,9 @@ ALTER TABLE pair_synergy ENABLE ROW LEVEL SECURITY;
 ALTER TABLE counters ENABLE ROW LEVEL SECURITY;
 ALTER TABLE replays ENABLE ROW LEVEL SECURITY;
 ALTER TABLE archetypes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE aggregate_daily ENABLE ROW LEVEL SECURITY;     -- no public policy: pipeline only
+ALTER TABLE aggregate_watermarks ENABLE ROW LEVEL SECURITY; -- no public policy: pipeline only
+ALTER TABLE team_index ENABLE ROW LEVEL SECURITY;          -- no public policy: pipeline only
 
 -- Read-only public access
 DO $$
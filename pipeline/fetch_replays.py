@@ -1,20 +1,25 @@
 import os
-import requests
+import sys
 import psycopg2
-from psycopg2.extras import execute_values
 import json
 import time
 from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from bulk_writer import bulk_upsert
+from http_client import get_client
+from species import slugify
+
 load_dotenv(os.path.join(os.path.dirname(__file__), '../.env.local'))
 
 # Strict PRD Rules (Appendix D):
 # Replays: Public rated; format=reg-f; rating>=1700; No Move Parsing.
 # Rating Source: Official Only (or NULL). 
 
-REPLAY_LIST_URL = "https://replay.pokemonshowdown.com/api/replays"
-REPLAY_DATA_URL = "https://replay.pokemonshowdown.com/{id}.json"
+REPLAY_BASE = os.getenv('SHOWDOWN_REPLAY_BASE', "https://replay.pokemonshowdown.com").rstrip('/')
+REPLAY_LIST_URL = f"{REPLAY_BASE}/api/replays"
+REPLAY_DATA_URL = REPLAY_BASE + "/{id}.json"
 TARGET_FORMAT = "gen9vgc2026regf" # PRD Target
 RATING_THRESHOLD = 1700
 
@@ -37,7 +42,7 @@ def fetch_recent_replays(format_id):
         'page': 1 # MVP: Just fetch page 1 for now, loop later
     }
     try:
-        resp = requests.get(REPLAY_LIST_URL, params=params)
+        resp = get_client().get(REPLAY_LIST_URL, params=params)
         if resp.status_code == 200:
             return resp.json() # List of replay objects
         return []
@@ -48,7 +53,7 @@ def fetch_recent_replays(format_id):
 def fetch_replay_details(replay_id):
     url = REPLAY_DATA_URL.format(id=replay_id)
     try:
-        resp = requests.get(url)
+        resp = get_client().get(url)
         if resp.status_code == 200:
             return resp.json()
         return None
@@ -104,7 +109,7 @@ def parse_pokemon(log_text):
             # |poke|p1|Flutter Mane, L50|item
             side = parts[2]
             poke_str = parts[3].split(',')[0] # Remove ", L50"
-            slug = poke_str.lower().replace(' ', '-').replace('.', '').replace("'", "")
+            slug = slugify(poke_str)
             
             if side == 'p1':
                 p1_team.append(slug)
@@ -120,11 +125,14 @@ def process_replays(conn, format_id):
     cursor = conn.cursor()
     batch_replays = []
     
+    # Check which candidates are already indexed in one round trip
+    candidate_ids = [r.get('id') for r in replays_list if r.get('id')]
+    cursor.execute("SELECT replay_id FROM replays WHERE replay_id = ANY(%s)", (candidate_ids,))
+    known_ids = {row[0] for row in cursor.fetchall()}
+    
     for r in replays_list:
         rid = r.get('id')
-        # Check if already indexed
-        cursor.execute("SELECT 1 FROM replays WHERE replay_id = %s", (rid,))
-        if cursor.fetchone():
+        if not rid or rid in known_ids:
             continue
             
         details = fetch_replay_details(rid)
@@ -153,11 +161,10 @@ def process_replays(conn, format_id):
         ))
         
     if batch_replays:
-        execute_values(cursor, """
-            INSERT INTO replays 
-            (replay_id, format_id, rating_estimate, rating_source, played_at, p1_team, p2_team, winner_side, tags, featured_cores)
-            VALUES %s
-        """, batch_replays)
+        bulk_upsert(conn, 'replays',
+                    ('replay_id', 'format_id', 'rating_estimate', 'rating_source', 'played_at',
+                     'p1_team', 'p2_team', 'winner_side', 'tags', 'featured_cores'),
+                    batch_replays, conflict=('replay_id',), update=(), label='replays')
         conn.commit()
     
     print(f"Inserted {len(batch_replays)} valid replays.")
@@ -1,18 +1,23 @@
 import os
-import requests
+import sys
 import json
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from bulk_writer import bulk_upsert
+from http_client import get_client
+from species import slugify
+from teammate_matrix import TeammateMatrix, upsert_pair_synergy
+
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '../.env.local'))
 
 # Configuration
 # PRD: VGC 2026 Regulation F (using 2025 Reg H as placeholder until real data available)
 # Stats URL pattern: https://www.smogon.com/stats/2025-12/chaos/gen9vgc2025regh-1760.json
-BASE_URL = "https://www.smogon.com/stats"
+BASE_URL = os.getenv('SMOGON_STATS_BASE', "https://www.smogon.com/stats").rstrip('/')
 TARGET_FORMAT = "gen9vgc2025regh"  # Use available format for testing
 TARGET_CUTOFF = 1760
 TARGET_MONTH = "2025-12"  # Latest available month
@@ -33,7 +38,7 @@ def fetch_chaos_json(month, format_id, cutoff):
     url = f"{BASE_URL}/{month}/chaos/{format_id}-{cutoff}.json"
     print(f"Fetching from: {url}")
     try:
-        response = requests.get(url)
+        response = get_client().get(url, conditional=True)
         if response.status_code == 200:
             return response.json()
         else:
@@ -48,8 +53,6 @@ def process_usage_stats(data, conn, month, format_id, cutoff):
         print("No DB connection, skipping DB write.")
         return
 
-    cursor = conn.cursor()
-    
     # 1. Upsert Pokemon Dimensions (Basic) and Usage
     # Using 'info' and 'usage' keys from chaos json
     
@@ -58,11 +61,13 @@ def process_usage_stats(data, conn, month, format_id, cutoff):
     
     usage_data = data.get('data', {})
     
+    batch_dim = []
     batch_usage = []
+    teammates = TeammateMatrix()
     
     for pokemon_name, stats in usage_data.items():
         # Clean slug
-        slug = pokemon_name.lower().replace(' ', '-').replace('.', '').replace("'", "")
+        slug = slugify(pokemon_name)
         
         # Calculate Usage Rate
         # Chaos data 'usage' is raw count usually? Or normalized?
@@ -82,12 +87,8 @@ def process_usage_stats(data, conn, month, format_id, cutoff):
         top_spreads = json.dumps(stats.get('Spreads', {}))
         
         # Insert DIM if not exists (Simplified for MVP, ideally detailed data comes from PokeAPI or static file)
-        # We perform a safe upsert on dim
-        cursor.execute("""
-            INSERT INTO pokemon_dim (slug, name) 
-            VALUES (%s, %s) 
-            ON CONFLICT (slug) DO NOTHING
-        """, (slug, pokemon_name))
+        # We perform a safe upsert on dim (all species in one statement below)
+        batch_dim.append((slug, pokemon_name))
         
         # Add to batch for Usage
         batch_usage.append((
@@ -97,64 +98,33 @@ def process_usage_stats(data, conn, month, format_id, cutoff):
             int(total_battles * raw_usage) # Est sample size
         ))
         
-        # Process Synergies (Teammates)
-        teammates = stats.get('Teammates', {})
-        process_synergies(cursor, slug, teammates, format_id, month, cutoff)
+        # Collect Synergies (Teammates); pairs need every species' usage first
+        teammates.add(pokemon_name, stats)
+
+    bulk_upsert(conn, 'pokemon_dim', ('slug', 'name'), batch_dim, conflict=('slug',), update=())
 
     # Bulk Insert Usage
     if batch_usage:
-        execute_values(cursor, """
-            INSERT INTO pokemon_usage 
-            (format_id, time_bucket, cutoff, pokemon, usage_rate, top_moves, top_items, top_abilities, top_tera, top_spreads, sample_size)
-            VALUES %s
-            ON CONFLICT (format_id, time_bucket, cutoff, pokemon) 
-            DO UPDATE SET 
-                usage_rate = EXCLUDED.usage_rate,
-                top_moves = EXCLUDED.top_moves,
-                top_items = EXCLUDED.top_items,
-                top_abilities = EXCLUDED.top_abilities,
-                top_tera = EXCLUDED.top_tera,
-                top_spreads = EXCLUDED.top_spreads,
-                sample_size = EXCLUDED.sample_size
-        """, batch_usage)
+        bulk_upsert(conn, 'pokemon_usage',
+                    ('format_id', 'time_bucket', 'cutoff', 'pokemon', 'usage_rate', 'top_moves', 'top_items',
+                     'top_abilities', 'top_tera', 'top_spreads', 'sample_size'),
+                    batch_usage, conflict=('format_id', 'time_bucket', 'cutoff', 'pokemon'),
+                    label='pokemon_usage')
         print(f"Upserted {len(batch_usage)} usage records.")
 
+    process_synergies(conn, teammates, total_battles, format_id, month, cutoff)
+
     conn.commit()
 
-def process_synergies(cursor, pokemon_slug, teammates_data, format_id, month, cutoff):
-    # teammates_data is { "Teammate": fraction, ... }
-    # e.g., { "Incineroar": 0.35, ... }
-    
-    for partner_name, fraction in teammates_data.items():
-        partner_slug = partner_name.lower().replace(' ', '-').replace('.', '').replace("'", "")
-        
-        # PRD: Canonical Pair = Alphabetical order
-        if pokemon_slug < partner_slug:
-            p_a, p_b = pokemon_slug, partner_slug
-        else:
-            p_a, p_b = partner_slug, pokemon_slug
-            
-        # We need to calculate 'pair_rate'.
-        # 'fraction' in Teammates is P(Partner | Pokemon).
-        # Pair Rate usually means P(A and B).
-        # We might need the usage of the Pokemon to calculate Intersection.
-        # But for now, let's store what we have or defer.
-        # Actually, for "Core" page, we want the synergy score.
-        # Strict PRD doesn't define formula for 'pair_rate' explicitly here but presumably it's usage of the pair.
-        
-        # For MVP, we can treat the 'fraction' as a proxy for synergy if we lack full intersection data.
-        # OR better: skip detailed calculation in this pass and do it in a second pass if we needed strict P(A ^ B).
-        
-        # Let's insert into pair_synergy
-        # We'll need to aggregate because A->B and B->A give duplicates if we iterate all.
-        # But since we enforced A < B check, we can upsert.
-        # Wait, A->B data might differ slightly from B->A data in Smogon samples due to rounding?
-        # Typically they should be consistent.
-        
-        # Simplified: We just update the record. 
-        # Ideally we collect all and average, but usually Usage(A)*Teammate(B|A) ~= Usage(B)*Teammate(A|B)
-        pass 
-        # TODO: Implement full pair ingestion. requires accessing the usage map globaly.
+def process_synergies(conn, teammates, total_battles, format_id, month, cutoff):
+    # teammates holds every species' Teammates block: P(B | A) = Teammates_A[B] / w(A)
+    # Pair Rate = P(A and B) = P(B | A) * Usage(A), averaged with the B -> A estimate
+    if not total_battles:
+        print("No battle count in chaos info, skipping pair synergy.")
+        return
+    pairs = teammates.pair_rows(total_battles)
+    upsert_pair_synergy(conn, format_id, month, cutoff, pairs)
+    print(f"Upserted {len(pairs)} pair synergy records.")
 
 def main():
     print(f"Starting import for {TARGET_FORMAT} [{TARGET_MONTH}] cutoff {TARGET_CUTOFF}...")
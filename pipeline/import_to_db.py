@@ -2,25 +2,39 @@
 VGC Meta Compass - Database Importer
 Imports JSON data files into PostgreSQL database.
 
+Accepts JSON arrays (.json) or newline-delimited JSON (.jsonl), optionally
+compressed (.gz, .zst). JSONL files are streamed in fixed-size batches, so
+memory stays constant regardless of file size.
+
 Usage:
   python import_to_db.py --usage pokemon_usage_2026-01.json
   python import_to_db.py --pairs pair_synergy_2026-01.json
   python import_to_db.py --replays replays_20260129.json
+  python import_to_db.py --replays replays_*.jsonl.gz --jobs 4
 """
 
 import argparse
+import gzip
+import io
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 # Check for psycopg2
 try:
     import psycopg2
-    from psycopg2.extras import execute_values
 except ImportError:
     print("Error: psycopg2 not installed. Run: pip install psycopg2-binary")
     sys.exit(1)
 
+# zstd is optional (only needed for .zst inputs)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # Load env if available
 try:
     from dotenv import load_dotenv
@@ -28,6 +42,19 @@ try:
 except ImportError:
     pass
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from bulk_writer import bulk_upsert
+
+# Rows per COPY + merge; each batch is committed on its own
+DEFAULT_BATCH_SIZE = 10000
+
+USAGE_COLUMNS = ('format_id', 'time_bucket', 'cutoff', 'pokemon', 'usage_rate', 'rank',
+                 'top_moves', 'top_items', 'top_abilities', 'top_tera', 'top_spreads', 'sample_size')
+PAIR_COLUMNS = ('format_id', 'time_bucket', 'cutoff', 'pokemon_a', 'pokemon_b', 'pair_rate',
+                'pair_sample_size', 'top_third_partners', 'top_fourth_partners', 'common_leads', 'sample_pastes')
+REPLAY_COLUMNS = ('replay_id', 'format_id', 'p1_team', 'p2_team', 'winner_side',
+                  'rating_estimate', 'rating_source', 'played_at', 'tags')
+
 
 def get_db_connection():
     """Get database connection from DATABASE_URL."""
@@ -47,175 +74,201 @@ def get_db_connection():
         return None
 
 
-def import_usage_data(conn, filepath: str):
-    """Import pokemon_usage JSON data."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    if not data:
-        print("No data to import")
-        return
-    
-    cursor = conn.cursor()
-    
-    # Ensure pokemon_dim entries exist
-    for item in data:
-        cursor.execute("""
-            INSERT INTO pokemon_dim (slug, name)
-            VALUES (%s, %s)
-            ON CONFLICT (slug) DO NOTHING
-        """, (item['pokemon'], item['pokemon'].replace('-', ' ').title()))
-    
-    # Import usage data
-    records = [
-        (
-            item['format_id'],
-            item['time_bucket'],
-            item['cutoff'],
-            item['pokemon'],
-            item['usage_rate'],
-            item['rank'],
-            json.dumps(item.get('top_moves', [])),
-            json.dumps(item.get('top_items', [])),
-            json.dumps(item.get('top_abilities', [])),
-            json.dumps(item.get('top_tera', [])),
-            json.dumps(item.get('top_spreads', [])),
-            item.get('sample_size', 0)
-        )
-        for item in data
-    ]
-    
-    execute_values(cursor, """
-        INSERT INTO pokemon_usage 
-        (format_id, time_bucket, cutoff, pokemon, usage_rate, rank, 
-         top_moves, top_items, top_abilities, top_tera, top_spreads, sample_size)
-        VALUES %s
-        ON CONFLICT (format_id, time_bucket, cutoff, pokemon)
-        DO UPDATE SET
-            usage_rate = EXCLUDED.usage_rate,
-            rank = EXCLUDED.rank,
-            top_moves = EXCLUDED.top_moves,
-            top_items = EXCLUDED.top_items,
-            top_abilities = EXCLUDED.top_abilities,
-            top_tera = EXCLUDED.top_tera,
-            top_spreads = EXCLUDED.top_spreads,
-            sample_size = EXCLUDED.sample_size
-    """, records)
-    
-    conn.commit()
-    print(f"✓ Imported {len(records)} usage records")
+def open_data_file(filepath: str):
+    """Open a data file as text, decompressing .gz/.zst transparently."""
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    if filepath.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard not installed. Run: pip install zstandard")
+        raw = open(filepath, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+    return open(filepath, 'r', encoding='utf-8')
 
 
-def import_pair_data(conn, filepath: str):
-    """Import pair_synergy JSON data."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    if not data:
-        print("No data to import")
-        return
-    
-    cursor = conn.cursor()
-    
-    records = [
-        (
-            item['format_id'],
-            item['time_bucket'],
-            item['cutoff'],
-            item['pokemon_a'],
-            item['pokemon_b'],
-            item['pair_rate'],
-            item.get('pair_sample_size', 0),
-            json.dumps(item.get('top_third_partners', [])),
-            json.dumps(item.get('top_fourth_partners', [])),
-            json.dumps(item.get('common_leads', [])),
-            json.dumps(item.get('sample_pastes', []))
-        )
-        for item in data
-    ]
+def iter_records(filepath: str):
+    """Yield records from a JSON array file or a JSONL file (one object per line)."""
+    base = filepath
+    for ext in ('.gz', '.zst'):
+        if base.endswith(ext):
+            base = base[:-len(ext)]
     
-    execute_values(cursor, """
-        INSERT INTO pair_synergy
-        (format_id, time_bucket, cutoff, pokemon_a, pokemon_b, pair_rate,
-         pair_sample_size, top_third_partners, top_fourth_partners, common_leads, sample_pastes)
-        VALUES %s
-        ON CONFLICT (format_id, time_bucket, cutoff, pokemon_a, pokemon_b)
-        DO UPDATE SET
-            pair_rate = EXCLUDED.pair_rate,
-            pair_sample_size = EXCLUDED.pair_sample_size,
-            top_third_partners = EXCLUDED.top_third_partners,
-            top_fourth_partners = EXCLUDED.top_fourth_partners,
-            common_leads = EXCLUDED.common_leads,
-            sample_pastes = EXCLUDED.sample_pastes
-    """, records)
-    
-    conn.commit()
-    print(f"✓ Imported {len(records)} pair records")
+    with open_data_file(filepath) as f:
+        if base.endswith('.json'):
+            # Legacy array format: must be loaded whole
+            yield from json.load(f) or []
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_batches(records, batch_size: int):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def ensure_pokemon_dim(conn, slugs):
+    """Insert any missing pokemon_dim rows for a batch in one statement."""
+    rows = [(slug, slug.replace('-', ' ').title()) for slug in sorted(set(slugs))]
+    bulk_upsert(conn, 'pokemon_dim', ('slug', 'name'), rows, conflict=('slug',), update=())
 
 
-def import_replay_data(conn, filepath: str):
-    """Import replays JSON data."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def import_usage_data(conn, filepath: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Import pokemon_usage data."""
+    total = 0
     
-    if not data:
-        print("No data to import")
+    for batch in iter_batches(iter_records(filepath), batch_size):
+        # Ensure pokemon_dim entries exist
+        ensure_pokemon_dim(conn, (item['pokemon'] for item in batch))
+        
+        records = [
+            (
+                item['format_id'],
+                item['time_bucket'],
+                item['cutoff'],
+                item['pokemon'],
+                item['usage_rate'],
+                item['rank'],
+                json.dumps(item.get('top_moves', [])),
+                json.dumps(item.get('top_items', [])),
+                json.dumps(item.get('top_abilities', [])),
+                json.dumps(item.get('top_tera', [])),
+                json.dumps(item.get('top_spreads', [])),
+                item.get('sample_size', 0)
+            )
+            for item in batch
+        ]
+        
+        bulk_upsert(conn, 'pokemon_usage', USAGE_COLUMNS, records,
+                    conflict=('format_id', 'time_bucket', 'cutoff', 'pokemon'))
+        
+        conn.commit()
+        total += len(records)
+    
+    if not total:
+        print(f"No data to import from {filepath}")
         return
+    print(f"✓ Imported {total} usage records from {filepath}")
+
+
+def import_pair_data(conn, filepath: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Import pair_synergy data."""
+    total = 0
     
-    cursor = conn.cursor()
+    for batch in iter_batches(iter_records(filepath), batch_size):
+        records = [
+            (
+                item['format_id'],
+                item['time_bucket'],
+                item['cutoff'],
+                item['pokemon_a'],
+                item['pokemon_b'],
+                item['pair_rate'],
+                item.get('pair_sample_size', 0),
+                json.dumps(item.get('top_third_partners', [])),
+                json.dumps(item.get('top_fourth_partners', [])),
+                json.dumps(item.get('common_leads', [])),
+                json.dumps(item.get('sample_pastes', []))
+            )
+            for item in batch
+        ]
+        
+        bulk_upsert(conn, 'pair_synergy', PAIR_COLUMNS, records,
+                    conflict=('format_id', 'time_bucket', 'cutoff', 'pokemon_a', 'pokemon_b'))
+        
+        conn.commit()
+        total += len(records)
     
-    records = [
-        (
-            item['replay_id'],
-            item['format_id'],
-            item['p1_team'],
-            item['p2_team'],
-            item.get('winner_side'),
-            item.get('rating_estimate'),
-            item.get('rating_source'),
-            item.get('played_at'),
-            item.get('tags', [])
-        )
-        for item in data
-    ]
+    if not total:
+        print(f"No data to import from {filepath}")
+        return
+    print(f"✓ Imported {total} pair records from {filepath}")
+
+
+def import_replay_data(conn, filepath: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Import replays data."""
+    total = 0
     
-    execute_values(cursor, """
-        INSERT INTO replays
-        (replay_id, format_id, p1_team, p2_team, winner_side, 
-         rating_estimate, rating_source, played_at, tags)
-        VALUES %s
-        ON CONFLICT (replay_id) DO NOTHING
-    """, records)
+    for batch in iter_batches(iter_records(filepath), batch_size):
+        records = [
+            (
+                item['replay_id'],
+                item['format_id'],
+                json.dumps(item['p1_team']),
+                json.dumps(item['p2_team']),
+                item.get('winner_side'),
+                item.get('rating_estimate'),
+                item.get('rating_source'),
+                item.get('played_at'),
+                json.dumps(item.get('tags', []))
+            )
+            for item in batch
+        ]
+        
+        bulk_upsert(conn, 'replays', REPLAY_COLUMNS, records, conflict=('replay_id',), update=())
+        
+        conn.commit()
+        total += len(records)
     
-    conn.commit()
-    print(f"✓ Imported {len(records)} replays")
+    if not total:
+        print(f"No data to import from {filepath}")
+        return
+    print(f"✓ Imported {total} replays from {filepath}")
+
+
+IMPORTERS = {
+    'usage': import_usage_data,
+    'pairs': import_pair_data,
+    'replays': import_replay_data,
+}
+
+
+def run_import(kind: str, filepath: str, batch_size: int):
+    """Import one file on its own connection (unit of work for --jobs)."""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("No database connection")
+    try:
+        IMPORTERS[kind](conn, filepath, batch_size)
+    finally:
+        conn.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description='Import data to VGC Meta Compass database')
-    parser.add_argument('--usage', help='Path to pokemon_usage JSON file')
-    parser.add_argument('--pairs', help='Path to pair_synergy JSON file')
-    parser.add_argument('--replays', help='Path to replays JSON file')
+    parser.add_argument('--usage', nargs='+', default=[], help='pokemon_usage JSON/JSONL file(s)')
+    parser.add_argument('--pairs', nargs='+', default=[], help='pair_synergy JSON/JSONL file(s)')
+    parser.add_argument('--replays', nargs='+', default=[], help='replays JSON/JSONL file(s)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Records per batch')
+    parser.add_argument('--jobs', type=int, default=1, help='Files to load in parallel (one connection each)')
     
     args = parser.parse_args()
     
-    if not any([args.usage, args.pairs, args.replays]):
+    # Usage first so pokemon_dim is populated before pairs reference it
+    tasks = [('usage', f) for f in args.usage] + [('pairs', f) for f in args.pairs] + \
+            [('replays', f) for f in args.replays]
+    if not tasks:
         parser.print_help()
         return
     
-    conn = get_db_connection()
-    if not conn:
-        return
-    
-    try:
-        if args.usage:
-            import_usage_data(conn, args.usage)
-        if args.pairs:
-            import_pair_data(conn, args.pairs)
-        if args.replays:
-            import_replay_data(conn, args.replays)
-    finally:
-        conn.close()
+    if args.jobs <= 1:
+        for kind, filepath in tasks:
+            run_import(kind, filepath, args.batch_size)
+    else:
+        # Each group runs in parallel; groups stay ordered
+        for kind in IMPORTERS:
+            group = [f for k, f in tasks if k == kind]
+            if not group:
+                continue
+            with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                futures = [pool.submit(run_import, kind, f, args.batch_size) for f in group]
+                for future in futures:
+                    future.result()
     
     print("\n✅ Import complete!")
 
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Aggregate State
+Per-day partial aggregates, so Build Aggregates only reads new replays and
+any rolling window is a sum of daily partials.
+
+aggregate_daily holds one row per (format_id, cutoff, day) with the raw
+counts of the replays played that day (played_at, or indexed_at for
+replays without a timestamp):
+
+    pair co-occurrence counts and the team total        (PairEngine)
+    per-target wins/losses and answer appearances       (CountersEngine)
+    3- and 4-species itemset counts                     (ItemsetEngine)
+
+aggregate_watermarks holds, per (format_id, cutoff), the watermark on
+replays.indexed_at and the species order every daily blob is indexed by.
+Species are only ever appended, so older blobs stay valid (their shorter
+arrays are zero-padded when summed). Both tables are defined in
+database/schema.sql and written through bulk_writer.
+
+A run folds replays with indexed_at in (watermark, now() - WATERMARK_LAG]
+into the days they were played on, saves those days and the new watermark
+in the same transaction, and drops days older than the retention period.
+The lag leaves room for replay writers whose transactions are still open
+when the build starts. A window of N days is then the sum of the last N
+daily partials: O(days), not O(replays).
+
+Counts only ever grow: deleted replays, or replays whose rating later
+crosses the cutoff, need a --full-rebuild. --verify recomputes the window
+from scratch up to the same watermark and checks the counts are identical.
+
+Usage:
+    state = update_partials(conn, "reg-f", 1760, window_days=30)
+    pairs = state.pairs.pair_rows()
+    if not verify_partials(conn, state):
+        ...
+"""
+
+import io
+from datetime import timedelta
+
+import numpy as np
+
+from bulk_writer import bulk_upsert
+from counters_engine import DEFAULT_FETCH_SIZE, CountersEngine
+from itemset_engine import ITEMSET_SIZES, ItemsetEngine, merge_counts, unpack
+from pair_engine import PairEngine
+from species import SpeciesRegistry
+
+# Replays indexed more recently than this are left for the next run
+WATERMARK_LAG = "2 minutes"
+
+# Daily partials older than this many days are dropped
+DEFAULT_RETENTION_DAYS = 90
+
+# The day a replay counts towards
+REPLAY_DAY = "COALESCE(played_at, indexed_at)::date"
+
+DAILY_COLUMNS = ("format_id", "cutoff", "day", "replay_count", "partials", "updated_at")
+WATERMARK_COLUMNS = ("format_id", "cutoff", "watermark", "species", "updated_at")
+
+def _padded(array: np.ndarray, n: int) -> np.ndarray:
+    """array zero-padded to n along every axis."""
+    if array.shape and array.shape[0] >= n:
+        return array
+    return np.pad(array, [(0, n - size) for size in array.shape])
+
+class AggregateState:
+    """Pair, counters and itemset counts over a set of replays, in one species order."""
+
+    def __init__(self, format_id: str, cutoff: int, registry: SpeciesRegistry = None):
+        self.format_id = format_id
+        self.cutoff = cutoff
+        self.registry = registry if registry is not None else SpeciesRegistry()
+        self.pairs = PairEngine(self.registry)
+        self.counters = CountersEngine(self.registry)
+        self.itemsets = ItemsetEngine(self.registry)
+        self.replays = 0
+        # Set on window states: the watermark and days they cover
+        self.watermark = None
+        self.first_day = self.last_day = None
+
+    # ---- counting ----
+
+    def add_battles(self, rows: list[tuple]):
+        """Fold (p1_team, p2_team, winner_side) rows in."""
+        teams = [team for row in rows for team in row[:2]]
+        self.pairs.add_teams(teams)
+        self.itemsets.add_teams(teams)
+        self.counters.add_battles(rows)
+        self.replays += len(rows)
+
+    def add(self, other: "AggregateState"):
+        """Add the counts of another state indexed by the same registry."""
+        n = len(self.registry)
+        self.pairs.cooccur = _padded(self.pairs.cooccur, n) + _padded(other.pairs.cooccur, n)
+        self.pairs.teams += other.pairs.teams
+        for name in ("n_wins", "n_losses", "win_appear", "loss_appear"):
+            setattr(self.counters, name,
+                    _padded(getattr(self.counters, name), n) + _padded(getattr(other.counters, name), n))
+        self.counters.battles += other.counters.battles
+        for size in ITEMSET_SIZES:
+            self.itemsets.keys[size], self.itemsets.counts[size] = merge_counts(
+                self.itemsets.keys[size], self.itemsets.counts[size],
+                other.itemsets.keys[size], other.itemsets.counts[size])
+        self.replays += other.replays
+
+    # ---- persistence ----
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            replays=self.replays,
+            cooccur=self.pairs.cooccur, teams=self.pairs.teams,
+            n_wins=self.counters.n_wins, n_losses=self.counters.n_losses,
+            win_appear=self.counters.win_appear, loss_appear=self.counters.loss_appear,
+            battles=self.counters.battles,
+            **{f"itemset_keys_{size}": self.itemsets.keys[size] for size in ITEMSET_SIZES},
+            **{f"itemset_counts_{size}": self.itemsets.counts[size] for size in ITEMSET_SIZES},
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, format_id: str, cutoff: int, registry: SpeciesRegistry, blob) -> "AggregateState":
+        state = cls(format_id, cutoff, registry)
+        with np.load(io.BytesIO(bytes(blob))) as arrays:
+            state.replays = int(arrays["replays"])
+            state.pairs.cooccur = arrays["cooccur"]
+            state.pairs.teams = int(arrays["teams"])
+            state.counters.n_wins = arrays["n_wins"]
+            state.counters.n_losses = arrays["n_losses"]
+            state.counters.win_appear = arrays["win_appear"]
+            state.counters.loss_appear = arrays["loss_appear"]
+            state.counters.battles = int(arrays["battles"])
+            for size in ITEMSET_SIZES:
+                state.itemsets.keys[size] = arrays[f"itemset_keys_{size}"]
+                state.itemsets.counts[size] = arrays[f"itemset_counts_{size}"]
+        return state
+
+    # ---- comparison ----
+
+    def canonical(self) -> dict:
+        """Non-zero counts keyed by slug, independent of species ID order."""
+        slugs = self.registry.slugs
+
+        def cells(matrix):
+            rows, cols = np.nonzero(matrix)
+            return {(slugs[r], slugs[c]): int(matrix[r, c]) for r, c in zip(rows.tolist(), cols.tolist())}
+
+        def totals(vector):
+            return {slugs[i]: int(vector[i]) for i in np.nonzero(vector)[0].tolist()}
+
+        def itemsets(size):
+            ids = unpack(self.itemsets.keys[size], size).tolist()
+            return {frozenset(slugs[i] for i in row): n
+                    for row, n in zip(ids, self.itemsets.counts[size].tolist())}
+
+        return {
+            "replays": self.replays,
+            "teams": self.pairs.teams,
+            "battles": self.counters.battles,
+            "cooccur": cells(self.pairs.cooccur),
+            "n_wins": totals(self.counters.n_wins),
+            "n_losses": totals(self.counters.n_losses),
+            "win_appear": cells(self.counters.win_appear),
+            "loss_appear": cells(self.counters.loss_appear),
+            **{f"itemsets_{size}": itemsets(size) for size in ITEMSET_SIZES},
+        }
+
+def window_range(conn, window_days: int) -> tuple:
+    """(first_day, last_day) of the window_days-day window ending today, as
+    update_partials publishes it (today is taken WATERMARK_LAG ago)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT (NOW() - INTERVAL '{WATERMARK_LAG}')::date")
+    today = cursor.fetchone()[0]
+    return today - timedelta(days=window_days - 1), today
+
+def _iter_days(conn, format_id: str, cutoff: int, window: str, params: tuple,
+               fetch_size: int = DEFAULT_FETCH_SIZE):
+    """(day, rows) batches of (p1_team, p2_team, winner_side), in day order."""
+    cursor = conn.cursor(name="aggregate_state_replays")
+    cursor.itersize = fetch_size
+    cursor.execute(f"""
+        SELECT {REPLAY_DAY} AS day, p1_team, p2_team, winner_side
+        FROM replays
+        WHERE format_id = %s AND rating_estimate >= %s AND {window}
+        ORDER BY day
+    """, (format_id, cutoff) + params)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][0] != rows[start][0]:
+                yield rows[start][0], [row[1:] for row in rows[start:i]]
+                start = i
+    cursor.close()
+
+def _load_day(conn, format_id: str, cutoff: int, registry: SpeciesRegistry, day) -> AggregateState:
+    cursor = conn.cursor()
+    cursor.execute("SELECT partials FROM aggregate_daily WHERE format_id = %s AND cutoff = %s AND day = %s",
+                   (format_id, cutoff, day))
+    row = cursor.fetchone()
+    if row is None:
+        return AggregateState(format_id, cutoff, registry)
+    return AggregateState.from_bytes(format_id, cutoff, registry, row[0])
+
+def load_window(conn, format_id: str, cutoff: int, first_day, last_day) -> AggregateState:
+    """Sum of the saved daily partials for first_day..last_day (inclusive)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT watermark, species FROM aggregate_watermarks WHERE format_id = %s AND cutoff = %s",
+                   (format_id, cutoff))
+    row = cursor.fetchone()
+    watermark, species = row if row else (None, [])
+    registry = SpeciesRegistry(species)
+    window = AggregateState(format_id, cutoff, registry)
+    window.watermark, window.first_day, window.last_day = watermark, first_day, last_day
+    cursor.execute("""
+        SELECT partials FROM aggregate_daily
+        WHERE format_id = %s AND cutoff = %s AND day BETWEEN %s AND %s
+        ORDER BY day
+    """, (format_id, cutoff, first_day, last_day))
+    for (blob,) in cursor:
+        window.add(AggregateState.from_bytes(format_id, cutoff, registry, blob))
+    return window
+
+def update_partials(conn, format_id: str, cutoff: int, window_days: int,
+                    full_rebuild: bool = False, retention_days: int = DEFAULT_RETENTION_DAYS) -> AggregateState:
+    """Fold new replays into the daily partials (or rebuild them), commit, and
+    return the sum over the last window_days days."""
+    if not 0 < window_days <= retention_days:
+        raise ValueError(f"window_days must be between 1 and the retention period ({retention_days})")
+    cursor = conn.cursor()
+    # Serialize concurrent builds of the same partials
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"aggregate_daily:{format_id}:{cutoff}",))
+    cursor.execute(f"SELECT NOW() - INTERVAL '{WATERMARK_LAG}', (NOW() - INTERVAL '{WATERMARK_LAG}')::date")
+    upper, today = cursor.fetchone()
+    oldest = today - timedelta(days=retention_days - 1)
+
+    watermark, species = None, []
+    if full_rebuild:
+        cursor.execute("DELETE FROM aggregate_daily WHERE format_id = %s AND cutoff = %s", (format_id, cutoff))
+    else:
+        cursor.execute("SELECT watermark, species FROM aggregate_watermarks WHERE format_id = %s AND cutoff = %s",
+                       (format_id, cutoff))
+        row = cursor.fetchone()
+        if row:
+            watermark, species = row
+    # Not species.get_registry(): the daily blobs are indexed by this persisted
+    # order, and the dense matrices stay sized by the species actually seen in
+    # the format rather than every pokemon_dim row
+    registry = SpeciesRegistry(species)
+
+    if watermark is None:
+        window, params = "(indexed_at <= %s OR indexed_at IS NULL)", (upper,)
+    else:
+        window, params = "indexed_at > %s AND indexed_at <= %s", (watermark, upper)
+    window += f" AND {REPLAY_DAY} >= %s"
+    params += (oldest,)
+
+    added, daily_rows = 0, []
+    for day, rows in _iter_days(conn, format_id, cutoff, window, params):
+        state = _load_day(conn, format_id, cutoff, registry, day)
+        state.add_battles(rows)
+        daily_rows.append((format_id, cutoff, day, state.replays, state.to_bytes(), None))
+        added += len(rows)
+    days = len(daily_rows)
+    bulk_upsert(conn, "aggregate_daily", DAILY_COLUMNS, daily_rows,
+                conflict=("format_id", "cutoff", "day"), expressions={"updated_at": "NOW()"})
+
+    cursor.execute("DELETE FROM aggregate_daily WHERE format_id = %s AND cutoff = %s AND day < %s",
+                   (format_id, cutoff, oldest))
+    dropped = cursor.rowcount
+    bulk_upsert(conn, "aggregate_watermarks", WATERMARK_COLUMNS, [(format_id, cutoff, upper, registry.slugs, None)],
+                conflict=("format_id", "cutoff"), expressions={"updated_at": "NOW()"})
+    conn.commit()
+    since = "scratch" if watermark is None else watermark.isoformat()
+    print(f"Partials {format_id}/{cutoff}: +{added} replays over {days} days since {since} "
+          f"(watermark {upper.isoformat()}, dropped {dropped} days before {oldest})")
+
+    state = load_window(conn, format_id, cutoff, today - timedelta(days=window_days - 1), today)
+    print(f"Window {state.first_day}..{state.last_day}: {state.replays} replays")
+    return state
+
+def verify_partials(conn, state: AggregateState) -> bool:
+    """Recount state's window from scratch up to its watermark and compare every count."""
+    fresh = AggregateState(state.format_id, state.cutoff)
+    window = f"(indexed_at <= %s OR indexed_at IS NULL) AND {REPLAY_DAY} BETWEEN %s AND %s"
+    for _, rows in _iter_days(conn, state.format_id, state.cutoff, window,
+                              (state.watermark, state.first_day, state.last_day)):
+        fresh.add_battles(rows)
+    conn.commit()
+    expected, actual = fresh.canonical(), state.canonical()
+    mismatched = [key for key in expected if expected[key] != actual[key]]
+    if mismatched:
+        print(f"✗ Daily partials differ from a full rebuild in: {', '.join(mismatched)}")
+        return False
+    print(f"✓ Daily partials match a full rebuild ({fresh.replays} replays)")
+    return True
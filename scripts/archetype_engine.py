@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Archetype Engine
+Clusters replay teams by species-set similarity, without an all-pairs matrix.
+
+1. Identical teams are collapsed (species sets with a count).
+2. Every distinct team gets a MinHash signature (NUM_HASHES permutations),
+   split into LSH bands; teams sharing a band are candidate neighbours.
+3. Leader clustering: distinct teams are visited most common first and
+   join the most similar existing leader among their LSH candidates
+   (exact Jaccard >= JOIN_THRESHOLD, i.e. 4 of 6 species shared), else
+   become a new leader. Comparing against leaders only avoids the
+   chaining that single-linkage merging shows on a meta full of shared
+   cores.
+4. Agglomerative merge: the largest clusters are merged pairwise
+   (centroid linkage on IDF-weighted member-share vectors) while the
+   closest pair's cosine is at least MERGE_THRESHOLD, so teams running
+   different 4-of-6 subsets of one core end up together. Merged clusters
+   under min_teams teams are dropped.
+
+Per archetype, a species' membership frequency is the share of its teams
+that include it: key members >= KEY_SHARE, flex members >= FLEX_SHARE.
+
+Usage:
+    engine = ArchetypeEngine()
+    engine.load(conn, "reg-f", 1760, *window_range(conn, 30))
+    archetypes = engine.cluster(min_teams=50)
+    rain = engine.combine([a for a in archetypes if "pelipper" in a["key_pokemon"]])
+"""
+
+import hashlib
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+
+from aggregate_state import REPLAY_DAY
+from species import SpeciesRegistry
+
+NUM_HASHES = 64
+BANDS = 16                       # 16 bands x 4 rows: candidates from ~0.5 Jaccard up
+ROWS_PER_BAND = NUM_HASHES // BANDS
+MINHASH_PRIME = (1 << 31) - 1
+MINHASH_SEED = 20260101
+SIGNATURE_CHUNK = 10000          # Distinct teams per signature batch
+
+JOIN_THRESHOLD = 0.5             # Team joins a leader sharing >= 4 of 6 species
+MERGE_THRESHOLD = 0.6            # Cosine of member-share vectors for a merge
+MERGE_FLOOR_DIVISOR = 10         # Clusters under min_teams / 10 teams are not merged
+MAX_MERGE_CLUSTERS = 1000        # Largest clusters entering the merge
+KEY_SHARE = 0.6
+FLEX_SHARE = 0.25
+
+def slug_keys(slugs: list[str]) -> np.ndarray:
+    """Stable per-slug hash inputs, so signatures do not depend on species ID order."""
+    return np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                     % MINHASH_PRIME for s in slugs], dtype=np.int64)
+
+def minhash_signatures(teams: list[tuple[int, ...]], num_species: int,
+                       num_hashes: int = NUM_HASHES, seed: int = MINHASH_SEED,
+                       species_keys: Optional[np.ndarray] = None) -> np.ndarray:
+    """(teams x num_hashes) MinHash signatures of species-ID sets.
+
+    Species are hashed by ID, or by species_keys[ID] when given (see slug_keys).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MINHASH_PRIME, size=num_hashes, dtype=np.int64)
+    b = rng.integers(0, MINHASH_PRIME, size=num_hashes, dtype=np.int64)
+    species = np.arange(num_species + 1, dtype=np.int64)
+    if species_keys is not None:
+        species[:num_species] = species_keys[:num_species]
+    table = (species[:, None] * a + b) % MINHASH_PRIME
+    table[num_species] = MINHASH_PRIME  # Padding slot never wins the min
+
+    width = max((len(team) for team in teams), default=1)
+    signatures = np.empty((len(teams), num_hashes), dtype=np.int64)
+    for start in range(0, len(teams), SIGNATURE_CHUNK):
+        chunk = teams[start:start + SIGNATURE_CHUNK]
+        ids = np.full((len(chunk), width), num_species, dtype=np.int64)
+        for i, team in enumerate(chunk):
+            ids[i, :len(team)] = team
+        signatures[start:start + len(chunk)] = table[ids].min(axis=1)
+    return signatures
+
+def band_keys(signatures: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """(teams x bands) int64 hash of each band's rows (wrapping multiply-add)."""
+    rows = signatures.shape[1] // bands
+    keys = np.zeros((len(signatures), bands), dtype=np.int64)
+    with np.errstate(over="ignore"):
+        for r in range(rows):
+            keys = keys * np.int64(1_000_003) + signatures[:, r::rows][:, :bands]
+    return keys
+
+def jaccard(a: int, b: int) -> float:
+    """Jaccard similarity of two species bitmasks."""
+    union = (a | b).bit_count()
+    return (a & b).bit_count() / union if union else 0.0
+
+class ArchetypeEngine:
+    """Distinct team counts plus the clustering that turns them into archetypes."""
+
+    def __init__(self, registry: Optional[SpeciesRegistry] = None):
+        self.registry = registry if registry is not None else SpeciesRegistry()
+        self.team_counts: Counter = Counter()
+        self.teams = 0
+
+    def add_teams(self, teams: Iterable[Iterable[str]]):
+        intern = self.registry.intern
+        for team in teams:
+            ids = tuple(sorted({intern(slug) for slug in team or ()}))
+            if ids:
+                self.team_counts[ids] += 1
+                self.teams += 1
+
+    def load(self, conn, format_id: str, min_rating: int, first_day, last_day,
+             fetch_size: int = 20000) -> int:
+        """Stream both teams of every qualifying replay played first_day..last_day
+        (the days aggregate_state counts them towards); returns the number of teams."""
+        cursor = conn.cursor(name="archetype_engine_replays")
+        cursor.itersize = fetch_size
+        cursor.execute(f"""
+            SELECT p1_team, p2_team
+            FROM replays
+            WHERE format_id = %s AND rating_estimate >= %s AND {REPLAY_DAY} BETWEEN %s AND %s
+        """, (format_id, min_rating, first_day, last_day))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            self.add_teams(team for row in rows for team in row)
+        cursor.close()
+        return self.teams
+
+    def _leader_clusters(self, teams: list[tuple[int, ...]]) -> list[list[int]]:
+        """Team indices per leader cluster (teams are already in visiting order)."""
+        keys = band_keys(minhash_signatures(teams, len(self.registry),
+                                            species_keys=slug_keys(self.registry.slugs))).tolist()
+        masks = [sum(1 << i for i in team) for team in teams]
+        tables: list[dict[int, list[int]]] = [{} for _ in range(BANDS)]
+        leaders: list[int] = []
+        members: list[list[int]] = []
+
+        for t, team_keys in enumerate(keys):
+            candidates = set()
+            for table, key in zip(tables, team_keys):
+                candidates.update(table.get(key, ()))
+            best, best_sim = -1, 0.0
+            for c in sorted(candidates):  # Earlier (larger) leaders win ties
+                sim = jaccard(masks[t], masks[leaders[c]])
+                if sim >= JOIN_THRESHOLD and sim > best_sim:
+                    best, best_sim = c, sim
+            if best >= 0:
+                members[best].append(t)
+                continue
+            leader = len(leaders)
+            leaders.append(t)
+            members.append([t])
+            for table, key in zip(tables, team_keys):
+                table.setdefault(key, []).append(leader)
+        return members
+
+    def cluster(self, min_teams: int) -> list[dict]:
+        """Archetypes with at least min_teams teams, largest first (see describe)."""
+        # Most common first; ties by slug tuple so the result does not depend on ID order
+        slugs = self.registry.slugs
+        distinct = sorted(self.team_counts.items(),
+                          key=lambda item: (-item[1], sorted(slugs[i] for i in item[0])))
+        teams = [team for team, _ in distinct]
+        counts = [n for _, n in distinct]
+        if not teams:
+            return []
+
+        clusters = self._leader_clusters(teams)
+        floor = max(2, min_teams // MERGE_FLOOR_DIVISOR)
+        profiles = []
+        for cluster in clusters:
+            size = sum(counts[t] for t in cluster)
+            if size < floor:
+                continue
+            freq = np.zeros(len(self.registry), dtype=np.int64)
+            for t in cluster:
+                freq[list(teams[t])] += counts[t]
+            profiles.append({"teams": size, "freq": freq, "distinct": len(cluster)})
+        profiles = sorted(profiles, key=lambda p: -p["teams"])[:MAX_MERGE_CLUSTERS]
+
+        # Inverse document frequency, so species on every other team (the
+        # Incineroars of the format) do not make every cluster look alike
+        usage = np.zeros(len(self.registry), dtype=np.int64)
+        for team, n in distinct:
+            usage[list(team)] += n
+        idf = np.log(self.teams / np.maximum(usage, 1))
+        merged = [p for p in self._merge(profiles, idf) if p["teams"] >= min_teams]
+        return [self.describe(p) for p in sorted(merged, key=lambda p: -p["teams"])]
+
+    @staticmethod
+    def _merge(profiles: list[dict], weights: np.ndarray) -> list[dict]:
+        """Centroid-linkage agglomeration: merge the two most similar profiles
+        (cosine of weighted member-share vectors) until none reach MERGE_THRESHOLD."""
+        k = len(profiles)
+        if k < 2:
+            return profiles
+        freq = np.array([p["freq"] for p in profiles], dtype=np.int64)
+        teams = np.array([p["teams"] for p in profiles], dtype=np.int64)
+        distinct = [p["distinct"] for p in profiles]
+
+        def unit(row):
+            # All-zero when every member has IDF 0: similarity 0, never a merge
+            share = row * weights
+            norm = np.linalg.norm(share)
+            return share / norm if norm > 0 else share
+
+        vectors = np.array([unit(row) for row in freq])
+        sim = vectors @ vectors.T
+        np.fill_diagonal(sim, -1.0)
+        alive = np.ones(k, dtype=bool)
+        while True:
+            i, j = divmod(int(sim.argmax()), k)
+            if sim[i, j] < MERGE_THRESHOLD:
+                break
+            freq[i] += freq[j]
+            teams[i] += teams[j]
+            distinct[i] += distinct[j]
+            alive[j] = False
+            sim[j, :] = sim[:, j] = -1.0
+            vectors[i] = unit(freq[i])
+            row = vectors @ vectors[i]
+            row[~alive] = -1.0
+            row[i] = -1.0
+            sim[i, :] = sim[:, i] = row
+
+        return [{"teams": int(teams[i]), "freq": freq[i], "distinct": distinct[i]}
+                for i in np.nonzero(alive)[0].tolist()]
+
+    def describe(self, profile: dict) -> dict:
+        """Archetype dict for a profile: key/flex members, team count and share of all teams."""
+        key = self._members(profile, KEY_SHARE)
+        flex = [s for s in self._members(profile, FLEX_SHARE) if s not in key]
+        return {
+            "key_pokemon": key,
+            "flex_pokemon": flex,
+            "team_sample_size": profile["teams"],
+            "distinct_teams": profile["distinct"],
+            "usage_estimate": round(profile["teams"] / self.teams * 100, 2) if self.teams else 0,
+            "freq": profile["freq"],
+        }
+
+    def combine(self, archetypes: list[dict]) -> dict:
+        """One archetype covering the teams of several (e.g. every rain cluster)."""
+        return self.describe({
+            "teams": sum(a["team_sample_size"] for a in archetypes),
+            "freq": sum(a["freq"] for a in archetypes),
+            "distinct": sum(a["distinct_teams"] for a in archetypes),
+        })
+
+    def _members(self, profile: dict, share: float) -> list[str]:
+        """Species on at least share of the profile's teams, most frequent first."""
+        freq = profile["freq"]
+        ids = np.nonzero(freq >= share * profile["teams"])[0].tolist()
+        slugs = self.registry.slugs
+        return sorted((slugs[i] for i in ids), key=lambda s: (-freq[self.registry.get(s)], s))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Build archetypes from replay teams and upsert to database.
+
+Teams are clustered by archetype_engine.ArchetypeEngine (MinHash/LSH
+leader clustering, then an agglomerative merge of the clusters). Each
+cluster becomes one archetypes row keyed by its top key members
+(e.g. "pelipper-archaludon-basculegion"), and the clusters are rolled up
+into the style rows the site links to (rain, sun, trick-room, tailwind,
+balance) using the same setter rules as replay tags. Rows from earlier
+runs of this bucket that no longer match a cluster are removed.
+Shares are measured over the same last WINDOW_DAYS days (played_at) as
+pair synergy and counters.
+
+Usage:
+  python build_archetypes.py
+  python build_archetypes.py --window-days 7
+  python build_archetypes.py --dry-run
+"""
+
+import argparse
+import math
+import os
+import time
+import psycopg2
+from datetime import datetime
+
+from aggregate_state import window_range
+from archetype_engine import ArchetypeEngine
+from bulk_writer import bulk_upsert
+from species import get_registry
+from tags import identify_tags
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+FORMAT_ID = os.environ.get('FORMAT_ID', 'reg-f')
+MIN_RATING = int(os.environ.get('MIN_RATING', '1760'))
+WINDOW_DAYS = int(os.environ.get('WINDOW_DAYS', '30'))
+MIN_ARCHETYPE_TEAMS = int(os.environ.get('MIN_ARCHETYPE_TEAMS', '20'))
+MIN_ARCHETYPE_SHARE = 0.5  # Percent of all teams a cluster needs to be published
+
+STYLE_NAMES = {
+    'rain': 'Rain',
+    'sun': 'Sun',
+    'trick-room': 'Trick Room',
+    'tailwind': 'Tailwind',
+    'balance': 'Balance',
+}
+NAME_MEMBERS = 3  # Key members used in a cluster's slug and name
+
+ARCHETYPE_COLUMNS = (
+    'format_id', 'time_bucket', 'archetype_slug', 'name', 'description',
+    'key_pokemon', 'flex_pokemon', 'usage_estimate', 'team_sample_size',
+)
+ARCHETYPE_KEY = ('format_id', 'time_bucket', 'archetype_slug')
+
+def get_time_bucket():
+    """Get current YYYY-MM time bucket."""
+    return datetime.now().strftime('%Y-%m')
+
+def display_name(slug):
+    return slug.replace('-', ' ').title()
+
+def pg_array(slugs):
+    """TEXT[] literal for COPY (slugs never need quoting)."""
+    return '{' + ','.join(slugs) + '}'
+
+def describe(archetype, label):
+    key = ', '.join(display_name(s) for s in archetype['key_pokemon']) or 'no fixed core'
+    return (f"{label} teams built around {key}: {archetype['team_sample_size']} teams "
+            f"({archetype['usage_estimate']}% of the sample).")
+
+def archetype_rows(engine, archetypes, time_bucket):
+    """archetypes rows for every cluster plus the style roll-ups."""
+    rows = []
+    styles = {slug: [] for slug in STYLE_NAMES}
+    for archetype in archetypes:
+        members = archetype['key_pokemon'] + archetype['flex_pokemon']
+        taken = {row[2] for row in rows}
+        # Add members until the slug is unique, then fall back to a counter
+        for size in range(NAME_MEMBERS, max(len(members), NAME_MEMBERS) + 1):
+            core = members[:size]
+            slug = '-'.join(core)[:50].rstrip('-')
+            if slug not in taken:
+                break
+        n = 2
+        while slug in taken:
+            suffix = f"-{n}"
+            slug, n = '-'.join(core)[:50 - len(suffix)].rstrip('-') + suffix, n + 1
+        name = ' / '.join(display_name(s) for s in core)
+        tags = identify_tags(archetype['key_pokemon']) or ['balance']
+        for tag in tags:
+            styles[tag].append(archetype)
+        rows.append((FORMAT_ID, time_bucket, slug, name[:100], describe(archetype, STYLE_NAMES[tags[0]]),
+                     pg_array(archetype['key_pokemon']), pg_array(archetype['flex_pokemon']),
+                     archetype['usage_estimate'], archetype['team_sample_size']))
+
+    for style, members in styles.items():
+        if not members:
+            continue
+        rollup = engine.combine(members)
+        rows.append((FORMAT_ID, time_bucket, style, STYLE_NAMES[style], describe(rollup, STYLE_NAMES[style]),
+                     pg_array(rollup['key_pokemon']), pg_array(rollup['flex_pokemon']),
+                     rollup['usage_estimate'], rollup['team_sample_size']))
+    return rows
+
+def build_archetypes(dry_run=False, window_days=WINDOW_DAYS):
+    """Cluster replay teams and replace this bucket's archetypes."""
+    conn = psycopg2.connect(DATABASE_URL)
+
+    time_bucket = get_time_bucket()
+    first_day, last_day = window_range(conn, window_days)
+    print(f"Building archetypes for {FORMAT_ID} / {time_bucket} (min rating: {MIN_RATING}, "
+          f"window {first_day}..{last_day})")
+
+    start = time.perf_counter()
+    engine = ArchetypeEngine(get_registry(conn))
+    teams = engine.load(conn, FORMAT_ID, MIN_RATING, first_day, last_day)
+    conn.commit()
+    print(f"Loaded {teams} teams ({len(engine.team_counts)} distinct) in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    min_teams = max(MIN_ARCHETYPE_TEAMS, math.ceil(teams * MIN_ARCHETYPE_SHARE / 100))
+    archetypes = engine.cluster(min_teams)
+    print(f"Found {len(archetypes)} archetypes with >= {min_teams} teams in {time.perf_counter() - start:.2f}s")
+
+    rows = archetype_rows(engine, archetypes, time_bucket)
+    for row in rows:
+        print(f"  {row[2]:<50} {row[7]:>6.2f}%  {row[8]:>6} teams  key {row[5]}")
+    if dry_run:
+        conn.close()
+        return
+
+    bulk_upsert(conn, 'archetypes', ARCHETYPE_COLUMNS, rows, conflict=ARCHETYPE_KEY, label='archetypes')
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM archetypes
+        WHERE format_id = %s AND time_bucket = %s AND NOT (archetype_slug = ANY(%s))
+    """, (FORMAT_ID, time_bucket, [row[2] for row in rows]))
+    conn.commit()
+    print(f"Upserted {len(rows)} archetypes, removed {cur.rowcount} stale")
+
+    conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build archetypes from replay teams')
+    parser.add_argument('--dry-run', action='store_true', help='Print the archetypes without writing them')
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS, help='Days of replays to cluster (default: WINDOW_DAYS or 30)')
+    args = parser.parse_args()
+    if args.window_days < 1:
+        parser.error("--window-days must be at least 1")
+    if not DATABASE_URL:
+        print("ERROR: DATABASE_URL not set")
+        exit(1)
+    build_archetypes(args.dry_run, args.window_days)
@@ -2,23 +2,57 @@
 """
 Build counters from replays and upsert to database.
 Per GPT Task P2.2
+
+Replays are scanned once by counters_engine.CountersEngine; build_counters.sql
+is the per-target reference query it reproduces. Counts are kept as
+daily partials (aggregate_state.py), so a run only reads replays indexed
+since the previous one, and the published rows cover the last WINDOW_DAYS
+days (played_at) instead of resetting with the calendar month.
+effectiveness_ci_low / effectiveness_ci_high are 95% Newcombe bounds on
+effectiveness_score (confidence.py).
+
+Usage:
+  python build_counters.py
+  python build_counters.py --full-rebuild
+  python build_counters.py --window-days 7
+  python build_counters.py --verify
 """
 
+import argparse
 import os
+import sys
+import numpy as np
 import psycopg2
 from datetime import datetime
 
+from bulk_writer import bulk_upsert
+from confidence import bounds, difference_interval
+from aggregate_state import DEFAULT_RETENTION_DAYS, update_partials, verify_partials
+
 DATABASE_URL = os.environ.get('DATABASE_URL')
 FORMAT_ID = os.environ.get('FORMAT_ID', 'reg-f')
 MIN_RATING = int(os.environ.get('MIN_RATING', '1760'))
+WINDOW_DAYS = int(os.environ.get('WINDOW_DAYS', '30'))
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', str(DEFAULT_RETENTION_DAYS)))
 MIN_SAMPLE = int(os.environ.get('MIN_SAMPLE', '20'))
+COUNTER_LIMIT = 15  # Answers kept per target (self included, as in the SQL)
+
+COUNTER_COLUMNS = (
+    'format_id', 'time_bucket', 'cutoff', 'target_pokemon',
+    'answer_type', 'answer_key',
+    'effectiveness_score', 'loss_appearance_rate', 'win_appearance_rate',
+    'n_wins', 'n_losses', 'answer_in_wins', 'answer_in_losses',
+    'effectiveness_ci_low', 'effectiveness_ci_high',
+)
+COUNTER_KEY = ('format_id', 'time_bucket', 'target_pokemon', 'answer_type', 'answer_key')
+COUNTER_UPDATE = COUNTER_COLUMNS[6:]
 
 def get_time_bucket():
     """Get current YYYY-MM time bucket."""
     return datetime.now().strftime('%Y-%m')
 
-def build_counters():
-    """Build counters from replays for top threats."""
+def build_counters(full_rebuild=False, verify=False, window_days=WINDOW_DAYS):
+    """Build counters from replays for top threats; returns False if --verify found a mismatch."""
     conn = psycopg2.connect(DATABASE_URL)
     cur = conn.cursor()
     
@@ -36,107 +70,51 @@ def build_counters():
     threats = [row[0] for row in cur.fetchall()]
     print(f"Found {len(threats)} threats to analyze")
     
+    # Counts for every target, folded from new replays only (same semantics as build_counters.sql)
+    state = update_partials(conn, FORMAT_ID, MIN_RATING, window_days,
+                            full_rebuild=full_rebuild, retention_days=RETENTION_DAYS)
+    if verify and not verify_partials(conn, state):
+        conn.close()
+        return False
+    engine = state.counters
+    print(f"Counting over {engine.battles} battles")
+    rates = engine.rates()
+
+    rows = []
     for target in threats:
-        print(f"  Processing {target}...")
-        
-        # Execute counter calculation query
-        cur.execute("""
-            WITH base AS (
-              SELECT
-                replay_id AS battle_id, format_id, played_at, rating_estimate,
-                p1_team, p2_team, winner_side
-              FROM replays
-              WHERE format_id = %s
-                AND rating_estimate >= %s
-                AND winner_side IS NOT NULL
-            ),
-            target_matches AS (
-              SELECT
-                battle_id, format_id,
-                CASE
-                  WHEN p1_team ? %s THEN 'p1'
-                  WHEN p2_team ? %s THEN 'p2'
-                  ELSE NULL
-                END AS side,
-                p1_team, p2_team, 
-                CASE winner_side WHEN 1 THEN 'p1' WHEN 2 THEN 'p2' END AS winner
-              FROM base
-              WHERE (p1_team ? %s OR p2_team ? %s)
-            ),
-            totals AS (
-              SELECT
-                COUNT(*) FILTER (WHERE winner = side) AS n_wins,
-                COUNT(*) FILTER (WHERE winner <> side) AS n_losses
-              FROM target_matches
-            ),
-            opp AS (
-              SELECT DISTINCT
-                tm.battle_id,
-                jsonb_array_elements_text(
-                  CASE WHEN tm.side='p1' THEN tm.p2_team ELSE tm.p1_team END
-                ) AS answer,
-                (tm.winner = tm.side) AS target_won
-              FROM target_matches tm
-            ),
-            agg AS (
-              SELECT
-                answer,
-                COUNT(*) FILTER (WHERE target_won) AS win_appear,
-                COUNT(*) FILTER (WHERE NOT target_won) AS loss_appear
-              FROM opp
-              GROUP BY 1
-            )
-            SELECT
-              a.answer,
-              a.win_appear,
-              a.loss_appear,
-              t.n_wins,
-              t.n_losses,
-              (a.loss_appear::float / NULLIF(t.n_losses,0)) AS loss_appearance_rate,
-              (a.win_appear::float / NULLIF(t.n_wins,0)) AS win_appearance_rate,
-              ((a.loss_appear::float / NULLIF(t.n_losses,0)) - (a.win_appear::float / NULLIF(t.n_wins,0))) AS effectiveness_score
-            FROM agg a
-            CROSS JOIN totals t
-            WHERE (a.win_appear + a.loss_appear) >= %s
-            ORDER BY effectiveness_score DESC
-            LIMIT 15
-        """, (FORMAT_ID, MIN_RATING, target, target, target, target, MIN_SAMPLE))
-        
-        counters = cur.fetchall()
-        
+        counters = engine.counters(target, MIN_SAMPLE, COUNTER_LIMIT, rates)
         for answer, win_appear, loss_appear, n_wins, n_losses, loss_rate, win_rate, eff_score in counters:
             if answer == target:
                 continue  # Skip self
-            
-            cur.execute("""
-                INSERT INTO counters (
-                    format_id, time_bucket, cutoff, target_pokemon,
-                    answer_type, answer_key,
-                    effectiveness_score, loss_appearance_rate, win_appearance_rate,
-                    n_wins, n_losses, answer_in_wins, answer_in_losses
-                ) VALUES (%s, %s, %s, %s, 'pokemon', %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (format_id, time_bucket, target_pokemon, answer_type, answer_key)
-                DO UPDATE SET
-                    effectiveness_score = EXCLUDED.effectiveness_score,
-                    loss_appearance_rate = EXCLUDED.loss_appearance_rate,
-                    win_appearance_rate = EXCLUDED.win_appearance_rate,
-                    n_wins = EXCLUDED.n_wins,
-                    n_losses = EXCLUDED.n_losses,
-                    answer_in_wins = EXCLUDED.answer_in_wins,
-                    answer_in_losses = EXCLUDED.answer_in_losses
-            """, (FORMAT_ID, time_bucket, MIN_RATING, target, answer,
-                  eff_score, loss_rate, win_rate, n_wins, n_losses, win_appear, loss_appear))
-        
-        print(f"    -> {len(counters)} counters")
-    
+            rows.append((FORMAT_ID, time_bucket, MIN_RATING, target, 'pokemon', answer,
+                         eff_score, loss_rate, win_rate, n_wins, n_losses, win_appear, loss_appear))
+        print(f"  {target} -> {len(counters)} counters")
+
+    # 95% bounds on effectiveness_score for every row at once
+    if rows:
+        counts = np.array([row[9:13] for row in rows], dtype=np.int64)  # n_wins, n_losses, in wins, in losses
+        ci = bounds(*difference_interval(counts[:, 3], counts[:, 1], counts[:, 2], counts[:, 0]), digits=4)
+        rows = [row + tuple(interval) for row, interval in zip(rows, ci)]
+
+    bulk_upsert(conn, 'counters', COUNTER_COLUMNS, rows, conflict=COUNTER_KEY,
+                update=COUNTER_UPDATE, label='counters')
     conn.commit()
     print("Done!")
     
     cur.close()
     conn.close()
+    return True
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build counters from replays')
+    parser.add_argument('--full-rebuild', action='store_true', help='Discard saved partials and rescan every replay')
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS, help='Days of replays to aggregate (default: WINDOW_DAYS or 30)')
+    parser.add_argument('--verify', action='store_true', help='Check incremental partials against a full rebuild')
+    args = parser.parse_args()
+    if not 0 < args.window_days <= RETENTION_DAYS:
+        parser.error(f"--window-days must be between 1 and RETENTION_DAYS ({RETENTION_DAYS})")
     if not DATABASE_URL:
         print("ERROR: DATABASE_URL not set")
         exit(1)
-    build_counters()
+    if not build_counters(args.full_rebuild, args.verify, args.window_days):
+        sys.exit(1)
@@ -2,89 +2,86 @@
 """
 Build pair synergy from replays and upsert to database.
 Per GPT Task P2.1
+
+Pair counts come from pair_engine.PairEngine (sparse X^T X over every
+replay team); build_pair_synergy.sql is the original self-join query.
+top_third_partners / top_fourth_partners come from itemset_engine.py.
+pair_rate_ci_low / pair_rate_ci_high are 95% Wilson bounds (confidence.py).
+Counts are kept as daily partials (aggregate_state.py), so a run only
+reads replays indexed since the previous one, and the published rows cover
+the last WINDOW_DAYS days (played_at) instead of resetting with the
+calendar month.
+
+Usage:
+  python build_pair_synergy.py
+  python build_pair_synergy.py --full-rebuild
+  python build_pair_synergy.py --window-days 7
+  python build_pair_synergy.py --verify
 """
 
+import argparse
 import os
+import sys
+import time
 import psycopg2
 from datetime import datetime
 
+from aggregate_state import DEFAULT_RETENTION_DAYS, update_partials, verify_partials
+from confidence import bounds, proportion_interval
+from pair_engine import MIN_PAIR_COUNT
+from teammate_matrix import upsert_pair_synergy
+
 DATABASE_URL = os.environ.get('DATABASE_URL')
 FORMAT_ID = os.environ.get('FORMAT_ID', 'reg-f')
 MIN_RATING = int(os.environ.get('MIN_RATING', '1760'))
+WINDOW_DAYS = int(os.environ.get('WINDOW_DAYS', '30'))
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', str(DEFAULT_RETENTION_DAYS)))
+MIN_PAIR_SAMPLE = int(os.environ.get('MIN_PAIR_SAMPLE', str(MIN_PAIR_COUNT)))
 
 def get_time_bucket():
     """Get current YYYY-MM time bucket."""
     return datetime.now().strftime('%Y-%m')
 
-def build_pair_synergy():
-    """Build pair synergy from replays."""
+def build_pair_synergy(full_rebuild=False, verify=False, window_days=WINDOW_DAYS):
+    """Build pair synergy from replays; returns False if --verify found a mismatch."""
     conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    
+
     time_bucket = get_time_bucket()
     print(f"Building pair synergy for {FORMAT_ID} / {time_bucket} (min rating: {MIN_RATING})")
-    
-    # Execute the pair synergy aggregation query
-    cur.execute("""
-        WITH teams AS (
-          SELECT format_id, played_at, rating_estimate, p1_team AS team
-          FROM replays
-          WHERE format_id = %s AND rating_estimate >= %s
-          UNION ALL
-          SELECT format_id, played_at, rating_estimate, p2_team AS team
-          FROM replays
-          WHERE format_id = %s AND rating_estimate >= %s
-        ),
-        mons AS (
-          SELECT format_id, team, jsonb_array_elements_text(team) AS mon
-          FROM teams
-        ),
-        pairs AS (
-          SELECT
-            m1.format_id,
-            LEAST(m1.mon, m2.mon) AS a,
-            GREATEST(m1.mon, m2.mon) AS b,
-            COUNT(*) AS team_count
-          FROM mons m1
-          JOIN mons m2
-            ON m1.format_id = m2.format_id
-           AND m1.team = m2.team
-           AND m1.mon < m2.mon
-          GROUP BY 1,2,3
-        )
-        SELECT a, b, team_count FROM pairs
-        WHERE team_count >= 3
-        ORDER BY team_count DESC
-        LIMIT 200
-    """, (FORMAT_ID, MIN_RATING, FORMAT_ID, MIN_RATING))
-    
-    pairs = cur.fetchall()
-    print(f"Found {len(pairs)} pairs")
-    
-    # Upsert each pair
-    for pokemon_a, pokemon_b, pair_count in pairs:
-        # Estimate pair rate from count
-        pair_rate = min(pair_count * 2.0, 50.0)  # Rough estimate
-        
-        cur.execute("""
-            INSERT INTO pair_synergy (
-                format_id, time_bucket, cutoff, pokemon_a, pokemon_b,
-                pair_rate, pair_sample_size
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (format_id, time_bucket, pokemon_a, pokemon_b)
-            DO UPDATE SET
-                pair_rate = EXCLUDED.pair_rate,
-                pair_sample_size = EXCLUDED.pair_sample_size
-        """, (FORMAT_ID, time_bucket, MIN_RATING, pokemon_a, pokemon_b, pair_rate, pair_count))
-    
+
+    state = update_partials(conn, FORMAT_ID, MIN_RATING, window_days,
+                            full_rebuild=full_rebuild, retention_days=RETENTION_DAYS)
+    if verify and not verify_partials(conn, state):
+        conn.close()
+        return False
+    pairs = state.pairs.pair_rows(MIN_PAIR_SAMPLE)
+    print(f"Found {len(pairs)} pairs on {state.pairs.teams} teams")
+
+    # Third/fourth partners from the frequent 3- and 4-species sets
+    start = time.perf_counter()
+    partners = state.itemsets.partner_lists([(a, b) for a, b, _, _ in pairs], [n for _, _, _, n in pairs])
+    print(f"Ranked partners for {len(pairs)} pairs in {time.perf_counter() - start:.2f}s")
+
+    # pair_rate = teams with both / all teams (percent), with its 95% interval
+    intervals = bounds(*proportion_interval([n for _, _, _, n in pairs], state.pairs.teams), scale=100)
+    upsert_pair_synergy(conn, FORMAT_ID, time_bucket, MIN_RATING, pairs, partners, intervals)
+
     conn.commit()
     print(f"Upserted {len(pairs)} pair synergy records")
-    
-    cur.close()
+
     conn.close()
+    return True
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build pair synergy from replays')
+    parser.add_argument('--full-rebuild', action='store_true', help='Discard saved partials and rescan every replay')
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS, help='Days of replays to aggregate (default: WINDOW_DAYS or 30)')
+    parser.add_argument('--verify', action='store_true', help='Check incremental partials against a full rebuild')
+    args = parser.parse_args()
+    if not 0 < args.window_days <= RETENTION_DAYS:
+        parser.error(f"--window-days must be between 1 and RETENTION_DAYS ({RETENTION_DAYS})")
     if not DATABASE_URL:
         print("ERROR: DATABASE_URL not set")
         exit(1)
-    build_pair_synergy()
+    if not build_pair_synergy(args.full_rebuild, args.verify, args.window_days):
+        sys.exit(1)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Bulk Writer
+One write path for every pipeline table: rows are streamed with COPY into
+a temporary staging table and merged into the target with a single
+INSERT ... SELECT ... ON CONFLICT statement.
+
+- Rows may be any iterable (generators included); they are CSV-encoded
+  lazily while COPY reads, so memory does not grow with the row count
+- dict/list values are serialized as JSON (for JSONB columns), bytes as
+  hex (for BYTEA columns), None as NULL
+- Duplicate keys within one call resolve to the last row, as if the rows
+  had been upserted one by one
+- The caller owns the transaction: nothing is committed here
+
+Usage:
+    from bulk_writer import bulk_upsert
+
+    bulk_upsert(conn, "pokemon_dim", ("slug", "name"), rows, conflict=("slug",))
+    bulk_upsert(conn, "pokemon_usage", USAGE_COLUMNS, rows,
+                conflict=("format_id", "time_bucket", "cutoff", "pokemon"),
+                label="pokemon_usage")
+"""
+
+import csv
+import io
+import json
+import time
+from typing import Iterable, Optional, Sequence
+
+COPY_NULL = "\\N"
+
+# Characters of CSV produced per read() call from COPY
+READ_TARGET = 1 << 16
+
+def copy_value(value):
+    """Python value -> CSV field for COPY."""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    return value
+
+class RowStream(io.TextIOBase):
+    """File-like CSV view over an iterable of row tuples, encoded on demand."""
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self.rows = iter(rows)
+        self.buf = io.StringIO()
+        self.writer = csv.writer(self.buf)
+        self.pending = ""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        target = READ_TARGET if size is None or size < 0 else size
+        while len(self.pending) < target:
+            self.buf.seek(0)
+            self.buf.truncate()
+            for row in self.rows:
+                self.writer.writerow([copy_value(v) for v in row])
+                self.count += 1
+                if self.buf.tell() >= target:
+                    break
+            chunk = self.buf.getvalue()
+            if not chunk:
+                break
+            self.pending += chunk
+        if size is None or size < 0:
+            data, self.pending = self.pending, ""
+        else:
+            data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+def rows_to_csv(rows: Iterable[Sequence]) -> io.StringIO:
+    """Encode rows as COPY-ready CSV in memory (\\N for NULL)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([copy_value(v) for v in row])
+    buf.seek(0)
+    return buf
+
+def bulk_upsert(conn, table: str, columns: Sequence[str], rows: Iterable[Sequence],
+                conflict: Sequence[str], update: Optional[Sequence[str]] = None,
+                expressions: Optional[dict[str, str]] = None,
+                label: Optional[str] = None) -> int:
+    """COPY rows into a staging table and merge them into table in one statement.
+
+    update lists the columns overwritten on conflict: None means every
+    non-key column, () means DO NOTHING. expressions maps a column to a SQL
+    expression over the staging columns (e.g. LEAST(pokemon_a, pokemon_b)).
+    Returns the number of rows inserted or updated; prints rows/sec when
+    label is given.
+    """
+    start = time.perf_counter()
+    expressions = expressions or {}
+    staging = f"{table}_staging"
+    column_list = ", ".join(columns)
+    select_list = ", ".join(expressions.get(c, c) for c in columns)
+    key_list = ", ".join(expressions.get(c, c) for c in conflict)
+    if update is None:
+        update = [c for c in columns if c not in conflict]
+
+    cursor = conn.cursor()
+    # Same column types as the target, no constraints or defaults; _ord keeps input order
+    cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{staging}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+        SELECT {column_list} FROM {table} WITH NO DATA
+    """)
+    cursor.execute(f"ALTER TABLE {staging} ADD COLUMN _ord BIGINT GENERATED ALWAYS AS IDENTITY")
+
+    stream = RowStream(rows)
+    cursor.copy_expert(
+        f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        stream,
+    )
+    if not stream.count:
+        cursor.execute(f"DROP TABLE {staging}")
+        return 0
+
+    if update:
+        action = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update)
+    else:
+        action = "DO NOTHING"
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT DISTINCT ON ({key_list}) {select_list}
+        FROM {staging}
+        ORDER BY {key_list}, _ord DESC
+        ON CONFLICT ({", ".join(conflict)}) {action}
+    """)
+    merged = cursor.rowcount
+    cursor.execute(f"DROP TABLE {staging}")
+
+    if label:
+        elapsed = time.perf_counter() - start
+        rate = stream.count / elapsed if elapsed > 0 else float("inf")
+        print(f"{label}: {stream.count} rows staged, {merged} written in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return merged
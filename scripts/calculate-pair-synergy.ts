@@ -1,79 +0,0 @@
-#!/usr/bin/env node
-/**
- * Pair Synergy Calculator
- * Calculates core data from usage stats
- */
-
-import { Pool } from 'pg';
-
-const FORMAT_ID = 'reg-f';
-const CUTOFF = 1760;
-const MIN_SAMPLE_SIZE = 3; // Lowered for cold start
-
-async function calculatePairSynergy() {
-    const pool = new Pool({
-        connectionString: process.env.DATABASE_URL,
-    });
-
-    try {
-        const timeBucket = '2025-12'; // Match imported Smogon data
-
-        console.log(`Calculating pair synergy for ${FORMAT_ID} / ${timeBucket}`);
-
-        // Get all pokemon with high usage
-        const usageResult = await pool.query(`
-            SELECT pokemon, usage_rate
-            FROM pokemon_usage
-            WHERE format_id = $1 AND time_bucket = $2 AND cutoff >= $3 AND usage_rate >= 5
-            ORDER BY usage_rate DESC
-            LIMIT 50
-        `, [FORMAT_ID, timeBucket, CUTOFF]);
-
-        const topPokemon = usageResult.rows;
-        console.log(`Processing ${topPokemon.length} top Pokemon`);
-
-        // Calculate pairs (simplified - in production would use replay data)
-        let insertedCount = 0;
-        for (let i = 0; i < topPokemon.length; i++) {
-            for (let j = i + 1; j < topPokemon.length; j++) {
-                const a = topPokemon[i].pokemon;
-                const b = topPokemon[j].pokemon;
-                const [pokemonA, pokemonB] = [a, b].sort();
-
-                // Estimate pair rate from usage correlation
-                const avgUsage = (parseFloat(topPokemon[i].usage_rate) + parseFloat(topPokemon[j].usage_rate)) / 2;
-                const pairRate = Math.min(avgUsage * 0.8, 50); // Rough estimate
-                const sampleSize = Math.max(Math.floor(pairRate * 10), 10); // Minimum 10
-
-                await pool.query(`
-                    INSERT INTO pair_synergy (
-                        format_id, time_bucket, cutoff, pokemon_a, pokemon_b,
-                        pair_rate, pair_sample_size, top_third_partners
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                    ON CONFLICT (format_id, time_bucket, cutoff, pokemon_a, pokemon_b)
-                    DO UPDATE SET
-                        pair_rate = EXCLUDED.pair_rate,
-                        pair_sample_size = EXCLUDED.pair_sample_size
-                `, [
-                    FORMAT_ID,
-                    timeBucket,
-                    CUTOFF,
-                    pokemonA,
-                    pokemonB,
-                    pairRate,
-                    sampleSize,
-                    JSON.stringify([]),
-                ]);
-                insertedCount++;
-            }
-        }
-
-        console.log(`Inserted ${insertedCount} pair synergy records`);
-
-        console.log('Pair synergy calculation complete!');
-    } finally {
-        await pool.end();
-    }
-}
-
-calculatePairSynergy().catch(console.error);
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Streaming Chaos Parser
+Incremental reader for Smogon chaos JSON that yields one Pokemon entry at a
+time, so peak memory scales with the largest species entry rather than the
+whole file.
+
+The top-level object is walked token by token; each value (the "info"
+block and every entry under "data") is handed to the C JSON decoder once
+enough of it is buffered. Input is any file-like object with read(n)
+returning bytes or str: an HTTP body, open(), or gzip.open().
+
+Usage:
+    with gzip.open("gen9vgc2026regf-1760.json.gz", "rb") as f:
+        chaos = ChaosStream(f)
+        for name, entry in chaos:
+            ...
+        chaos.info["number of battles"]
+"""
+
+import codecs
+import gzip
+import json
+from json.decoder import scanstring
+from typing import Iterator, Optional
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+
+class ChaosStream:
+    """Iterate (name, entry) pairs under "data"; other top-level keys land in .extra."""
+
+    def __init__(self, stream, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.info: dict = {}
+        self.extra: dict = {}
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Append at least one chunk to the buffer, dropping consumed text."""
+        if self.eof:
+            return False
+        size = max(self.chunk_size, min_size)
+        while True:
+            raw = self.stream.read(size)
+            data = self.decoder.decode(raw, final=not raw) if isinstance(raw, bytes) else raw
+            if data:
+                break
+            if not raw:
+                self.eof = True
+                return False
+            # Read ended inside a multibyte character: the decoder is holding it
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _skip_ws(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return
+
+    def _peek(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.buf):
+            raise ValueError("Unexpected end of chaos JSON")
+        return self.buf[self.pos]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of chaos JSON buffer")
+        self.pos += 1
+
+    def _read_string(self) -> str:
+        self._expect('"')
+        while True:
+            try:
+                value, end = scanstring(self.buf, self.pos)
+                self.pos = end
+                return value
+            except json.JSONDecodeError:
+                # Unterminated: _fill() keeps the text from self.pos onwards
+                if not self._fill():
+                    raise
+
+    def _read_value(self):
+        """Decode the next complete JSON value, buffering more input as needed."""
+        self._skip_ws()
+        grow = self.chunk_size
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may be cut short
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill(grow):
+                continue
+            grow *= 2  # bound retries to O(log value size)
+
+    def _iter_object(self) -> Iterator[str]:
+        """Yield keys of the object starting at the cursor, leaving it before each value."""
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._read_string()
+            self._expect(":")
+            yield key
+            sep = self._peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Expected ',' or '}}' in chaos JSON, got {sep!r}")
+
+    def __iter__(self) -> Iterator[tuple[str, dict]]:
+        for key in self._iter_object():
+            if key == "data" and self._peek() == "{":
+                for name in self._iter_object():
+                    yield name, self._read_value()
+            elif key == "info":
+                self.info = self._read_value()
+            else:
+                self.extra[key] = self._read_value()
+
+def open_chaos_file(path: str):
+    """Open a local chaos file (plain or .gz) for streaming."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+def iter_chaos(stream, chunk_size: int = DEFAULT_CHUNK_SIZE, info: Optional[dict] = None):
+    """Yield (name, entry) pairs; fills info (if given) with the "info" block."""
+    chaos = ChaosStream(stream, chunk_size)
+    yield from chaos
+    if info is not None:
+        info.update(chaos.info)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Batched Chaos Top-K
+Vectorized replacement for calling extract_top_items five times per Pokemon.
+
+The Moves/Items/Abilities/Tera Types/Spreads counts of a batch of species
+are packed into padded NumPy matrices (one row per species and field,
+bucketed by length), and argpartition finds every row's k-th largest count
+at once. Only counts at or above that threshold are sorted and turned back
+into {key, pct, n, rank} dicts, so output is identical to extract_top_items
+(ties keep file order, pct uses Python's round).
+
+Falls back to extract_top_items when NumPy is not installed.
+
+Usage:
+    from chaos_topk import batch_entry_details
+
+    details = batch_entry_details([info_a, info_b, ...])
+"""
+
+from itertools import chain
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# (details key, chaos field, limit) in extract_top_items call order
+TOP_FIELDS = (
+    ("top_moves", "Moves", 10),
+    ("top_items", "Items", 10),
+    ("top_abilities", "Abilities", 10),
+    ("top_tera", "Tera Types", 10),
+    ("top_spreads", "Spreads", 5),
+)
+
+def top_items_batch(dicts: list[dict], limits: list[int]) -> list[list[dict]]:
+    """Top-k {key, pct, n, rank} lists for many count dicts at once."""
+    results: list[Optional[list[dict]]] = [None] * len(dicts)
+    # Rows of similar length share one padded matrix (padding stays under 2x)
+    buckets: dict[int, list[int]] = {}
+    for i, d in enumerate(dicts):
+        if d:
+            buckets.setdefault(len(d).bit_length(), []).append(i)
+        else:
+            results[i] = []
+
+    for bits, rows in buckets.items():
+        for i, items in zip(rows, top_items_bucket([dicts[i] for i in rows],
+                                                   [limits[i] for i in rows], 1 << bits)):
+            results[i] = items
+    return results
+
+def top_items_bucket(dicts: list[dict], limits: list[int], width: int) -> list[list[dict]]:
+    """top_items_batch for non-empty dicts no longer than width."""
+    lengths = np.fromiter((len(d) for d in dicts), dtype=np.int64, count=len(dicts))
+    total_len = int(lengths.sum())
+    flat = np.fromiter(chain.from_iterable(d.values() for d in dicts), dtype=np.float64, count=total_len)
+    row_of = np.repeat(np.arange(len(dicts)), lengths)
+    col_of = np.arange(total_len) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    counts = np.full((len(dicts), width), -np.inf)
+    counts[row_of, col_of] = flat
+
+    # k-th largest count per row: partition out the top max(k), sort just those
+    ks = np.minimum(np.asarray(limits), lengths)
+    kmax = int(ks.max())
+    if kmax < width:
+        top = -np.partition(-counts, kmax - 1, axis=1)[:, :kmax]
+    else:
+        top = counts
+    top = -np.sort(-top, axis=1)
+    threshold = top[np.arange(len(dicts)), ks - 1]
+
+    # Candidates >= threshold (ties included), ordered by row, -count, file order
+    rows, cols = np.nonzero(counts >= threshold[:, None])
+    order = np.lexsort((cols, -counts[rows, cols], rows))
+    rows, cols = rows[order].tolist(), cols[order].tolist()
+    ks = ks.tolist()
+
+    results = [[] for _ in dicts]
+    row_keys = row_values = None
+    current = -1
+    for r, c in zip(rows, cols):
+        items = results[r]
+        if len(items) >= ks[r]:
+            continue
+        if r != current:
+            current = r
+            row_keys, row_values = list(dicts[r]), list(dicts[r].values())
+            total = sum(row_values)
+        count = row_values[c]
+        pct = (count / total * 100) if total > 0 else 0
+        items.append({"key": row_keys[c], "pct": round(pct, 2), "n": count, "rank": len(items) + 1})
+    return results
+
+def batch_entry_details(entries: list[dict], fallback: Optional[callable] = None) -> list[dict]:
+    """pokemon_usage detail dicts for a batch of chaos entries.
+
+    fallback(data, limit) is used per field when NumPy is unavailable.
+    """
+    if np is None:
+        return [
+            {**{name: fallback(info.get(field, {}), limit=limit) for name, field, limit in TOP_FIELDS},
+             "sample_size": info.get("Raw count", 0)}
+            for info in entries
+        ]
+
+    dicts = [info.get(field) or {} for info in entries for _, field, _ in TOP_FIELDS]
+    limits = [limit for _ in entries for _, _, limit in TOP_FIELDS]
+    tops = top_items_batch(dicts, limits)
+
+    details = []
+    for i, info in enumerate(entries):
+        row = tops[i * len(TOP_FIELDS):(i + 1) * len(TOP_FIELDS)]
+        detail = {name: top for (name, _, _), top in zip(TOP_FIELDS, row)}
+        detail["sample_size"] = info.get("Raw count", 0)
+        details.append(detail)
+    return details
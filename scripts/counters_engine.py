@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Counters Engine
+Single-pass replacement for running the build_counters.sql CTE once per threat.
+
+Qualifying replays are streamed once through a server-side cursor. Each
+battle is folded into dense species x species count matrices for every
+target at the same time:
+
+    n_wins[T], n_losses[T]          battles T was in, by T's result
+    win_appear[T, A]                battles T won where A was on the other team
+    loss_appear[T, A]               battles T lost where A was on the other team
+
+Semantics follow the SQL exactly: T's side is p1 if p1 brought it, else
+p2; each answer counts once per battle; battles without a winner are
+skipped. Rates and effectiveness_score are then computed for all targets
+at once, so runtime grows with the replay count, not replays x targets.
+
+Usage:
+    engine = CountersEngine()
+    engine.load(conn, "reg-f", min_rating=1760)
+    rows = engine.counters("flutter-mane", min_sample=20, limit=15)
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from species import SpeciesRegistry
+
+# Battles fetched per round trip from the server-side cursor
+DEFAULT_FETCH_SIZE = 20000
+
+class CountersEngine:
+    """Target x answer win/loss appearance counts built from one replay scan."""
+
+    def __init__(self, registry: Optional[SpeciesRegistry] = None):
+        self.registry = registry if registry is not None else SpeciesRegistry()
+        self.n_wins = np.zeros(0, dtype=np.int64)
+        self.n_losses = np.zeros(0, dtype=np.int64)
+        self.win_appear = np.zeros((0, 0), dtype=np.int64)
+        self.loss_appear = np.zeros((0, 0), dtype=np.int64)
+        self.battles = 0
+
+    def _grow(self, n: int):
+        size = len(self.n_wins)
+        if n <= size:
+            return
+        self.n_wins = np.pad(self.n_wins, (0, n - size))
+        self.n_losses = np.pad(self.n_losses, (0, n - size))
+        self.win_appear = np.pad(self.win_appear, ((0, n - size), (0, n - size)))
+        self.loss_appear = np.pad(self.loss_appear, ((0, n - size), (0, n - size)))
+
+    def _encode(self, teams: list[list[str]]) -> np.ndarray:
+        """Padded (battles x width) species ID matrix, -1 for empty slots, duplicates dropped."""
+        teams = [list(dict.fromkeys(team or ())) for team in teams]
+        width = max((len(team) for team in teams), default=0) or 1
+        ids = np.full((len(teams), width), -1, dtype=np.int64)
+        intern = self.registry.intern
+        for i, team in enumerate(teams):
+            ids[i, :len(team)] = [intern(slug) for slug in team]
+        return ids
+
+    def add_battles(self, battles: Iterable[tuple]):
+        """Fold (p1_team, p2_team, winner_side) rows in; winner_side must be 1 or 2."""
+        battles = [b for b in battles if b[2] in (1, 2)]
+        if not battles:
+            return
+        p1 = self._encode([b[0] for b in battles])
+        p2 = self._encode([b[1] for b in battles])
+        p1_won = np.fromiter((b[2] == 1 for b in battles), dtype=bool, count=len(battles))
+        n = len(self.registry)
+        self._grow(n)
+
+        in_p1 = p1 >= 0
+        in_p2 = p2 >= 0
+        # A species on both teams is a p1 target only
+        p2_target = in_p2 & ~(p2[:, :, None] == p1[:, None, :]).any(axis=2)
+
+        won = p1_won[:, None]
+        self.n_wins += np.bincount(p1[in_p1 & won], minlength=n) + np.bincount(p2[p2_target & ~won], minlength=n)
+        self.n_losses += np.bincount(p1[in_p1 & ~won], minlength=n) + np.bincount(p2[p2_target & won], minlength=n)
+
+        # (target, answer) cells: p1 targets face the p2 team and vice versa
+        won = p1_won[:, None, None]
+        cells_1 = p1[:, :, None] * n + p2[:, None, :]
+        mask_1 = in_p1[:, :, None] & in_p2[:, None, :]
+        cells_2 = p2[:, :, None] * n + p1[:, None, :]
+        mask_2 = p2_target[:, :, None] & in_p1[:, None, :]
+        wins = np.concatenate([cells_1[mask_1 & won], cells_2[mask_2 & ~won]])
+        losses = np.concatenate([cells_1[mask_1 & ~won], cells_2[mask_2 & won]])
+        self.win_appear += np.bincount(wins, minlength=n * n).reshape(n, n)
+        self.loss_appear += np.bincount(losses, minlength=n * n).reshape(n, n)
+        self.battles += len(battles)
+
+    def load(self, conn, format_id: str, min_rating: int, fetch_size: int = DEFAULT_FETCH_SIZE) -> int:
+        """Stream every qualifying replay once; returns the number of battles read."""
+        cursor = conn.cursor(name="counters_engine_replays")
+        cursor.itersize = fetch_size
+        cursor.execute("""
+            SELECT p1_team, p2_team, winner_side
+            FROM replays
+            WHERE format_id = %s
+              AND rating_estimate >= %s
+              AND winner_side IN (1, 2)
+        """, (format_id, min_rating))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            self.add_battles(rows)
+        cursor.close()
+        return self.battles
+
+    def rates(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(loss_appearance_rate, win_appearance_rate, effectiveness_score) for every target row.
+
+        Undefined rates (target never lost / never won) are NaN, as NULL is in SQL.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            losses = np.where(self.n_losses > 0, self.n_losses, np.nan)[:, None]
+            wins = np.where(self.n_wins > 0, self.n_wins, np.nan)[:, None]
+            loss_rate = self.loss_appear / losses
+            win_rate = self.win_appear / wins
+        return loss_rate, win_rate, loss_rate - win_rate
+
+    def counters(self, target: str, min_sample: int, limit: int,
+                 rates: Optional[tuple] = None) -> list[tuple]:
+        """Top answers to target, as the per-threat SQL returned them.
+
+        Rows are (answer, win_appear, loss_appear, n_wins, n_losses,
+        loss_rate, win_rate, effectiveness_score), ordered by effectiveness
+        descending with NULLs first (Postgres DESC order), then by slug.
+        """
+        t = self.registry.get(target)
+        if t is None or t >= len(self.n_wins):
+            return []
+        loss_rate, win_rate, score = rates or self.rates()
+        wins, losses = self.win_appear[t], self.loss_appear[t]
+        answers = np.nonzero(wins + losses >= min_sample)[0]
+        slugs = self.registry.slugs
+        answers = sorted(answers.tolist(), key=lambda a: (0, 0.0, slugs[a]) if np.isnan(score[t, a])
+                         else (1, -score[t, a], slugs[a]))
+
+        def value(x):
+            return None if np.isnan(x) else float(x)
+
+        return [
+            (slugs[a], int(wins[a]), int(losses[a]), int(self.n_wins[t]), int(self.n_losses[t]),
+             value(loss_rate[t, a]), value(win_rate[t, a]), value(score[t, a]))
+            for a in answers[:limit]
+        ]
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Replay Crawl State
+Persistent state for incremental, resumable replay crawls.
+
+- BloomFilter: compact set of replay IDs already indexed (or already
+  rejected), seeded from the replays table in one bulk query
+- CrawlState: per-format high-water mark (newest uploadtime covered by a
+  completed crawl) plus the page checkpoint of an unfinished crawl
+
+Files live under .cache/crawl/ (override with VGC_CRAWL_STATE_DIR):
+    <format>.json   high-water mark and checkpoint
+    <format>.bloom  known replay IDs
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Iterable, Optional
+
+DEFAULT_STATE_DIR = os.environ.get(
+    "VGC_CRAWL_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "crawl"),
+)
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+BLOOM_MAGIC = b"VGCBLOOM1\n"
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        new = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def save(self, path: str):
+        header = json.dumps({
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+        }).encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(BLOOM_MAGIC)
+            f.write(header + b"\n")
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as f:
+            if f.readline() != BLOOM_MAGIC:
+                raise ValueError(f"{path} is not a replay Bloom filter")
+            header = json.loads(f.readline())
+            bloom = cls(header["capacity"], header["error_rate"])
+            bits = f.read()
+        if len(bits) != len(bloom.bits):
+            raise ValueError(f"{path} is truncated")
+        bloom.bits = bytearray(bits)
+        bloom.count = header["count"]
+        return bloom
+
+class CrawlState:
+    """High-water mark, page checkpoint and known IDs for one format.
+
+    A crawl walks search pages newest-first until it reaches the high-water
+    mark of the last completed crawl. Each fully consumed page is recorded as
+    the checkpoint; an interrupted crawl resumes after it and keeps the
+    newest uploadtime it saw, which becomes the new high-water mark once the
+    crawl completes.
+    """
+
+    def __init__(self, format_name: str, state_dir: str = DEFAULT_STATE_DIR):
+        self.format_name = format_name
+        self.state_path = os.path.join(state_dir, f"{format_name}.json")
+        self.bloom_path = os.path.join(state_dir, f"{format_name}.bloom")
+        self.high_water: Optional[int] = None
+        self.checkpoint: Optional[dict] = None
+        self.known: Optional[BloomFilter] = None
+        self.new_ids: list[str] = []
+
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.high_water = data.get("high_water")
+            self.checkpoint = data.get("checkpoint")
+        if os.path.exists(self.bloom_path):
+            self.known = BloomFilter.load(self.bloom_path)
+
+    def seed(self, conn, format_id: str, capacity: int = DEFAULT_CAPACITY):
+        """Rebuild the known-ID filter from the replays table in one bulk query."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT replay_id FROM replays WHERE format_id = %s", (format_id,))
+        ids = [row[0] for row in cursor.fetchall()]
+        self.known = BloomFilter(max(capacity, 2 * len(ids)))
+        self.known.update(ids)
+        print(f"Seeded known-ID filter with {len(ids)} replays")
+
+    def is_known(self, replay_id: str) -> bool:
+        return self.known is not None and replay_id in self.known
+
+    def start_page(self) -> int:
+        """First search page to request: after the checkpoint when resuming."""
+        if self.checkpoint:
+            return self.checkpoint["page"] + 1
+        return 1
+
+    def is_covered(self, upload_time) -> bool:
+        """True once results reach replays covered by the last completed crawl."""
+        return bool(self.high_water and upload_time and upload_time <= self.high_water)
+
+    def observe(self, upload_time):
+        """Track the newest uploadtime seen by the crawl in progress."""
+        if not upload_time:
+            return
+        if self.checkpoint is None:
+            self.checkpoint = {"page": 0, "newest": upload_time, "started_at": int(time.time())}
+        elif upload_time > (self.checkpoint.get("newest") or 0):
+            self.checkpoint["newest"] = upload_time
+
+    def seen(self, replay_id: str):
+        """Record a downloaded replay; it joins the known set on commit()."""
+        self.new_ids.append(replay_id)
+
+    def page_done(self, page: int):
+        if self.checkpoint is None:
+            self.checkpoint = {"page": page, "newest": None, "started_at": int(time.time())}
+        else:
+            self.checkpoint["page"] = page
+
+    def complete(self):
+        """Crawl reached the high-water mark (or the last page): advance it."""
+        if self.checkpoint and self.checkpoint.get("newest"):
+            self.high_water = max(self.high_water or 0, self.checkpoint["newest"])
+        self.checkpoint = None
+
+    def commit(self):
+        """Persist state; call only after the crawl's records are in the database."""
+        if self.new_ids:
+            if self.known is None:
+                self.known = BloomFilter(max(DEFAULT_CAPACITY, 2 * len(self.new_ids)))
+            self.known.update(self.new_ids)
+            self.new_ids = []
+        if self.known is not None:
+            self.known.save(self.bloom_path)
+
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"high_water": self.high_water, "checkpoint": self.checkpoint}, f)
+        os.replace(tmp, self.state_path)
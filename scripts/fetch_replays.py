@@ -5,27 +5,41 @@ Fetches replays from Pokemon Showdown and extracts team data.
 
 Usage:
     python fetch_replays.py --format gen9vgc2024regf --min-rating 1700 --limit 500
+    python fetch_replays.py --format reg-f --limit 5000 --concurrency 16 --rps 8
+    python fetch_replays.py --format reg-f --limit 5000 --incremental
+    python fetch_replays.py --format reg-f --limit 5000 --archive
+    python fetch_replays.py --format reg-f --from-archive --workers 8
+    python fetch_replays.py --format reg-f --from-dump replays.jsonl.gz --workers 8
     
 Writes to: replays table
 """
 
 import argparse
+import gzip
 import json
 import os
-import re
-import sys
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
-from urllib.request import urlopen, Request
 from urllib.error import HTTPError
 
 import psycopg2
-from psycopg2.extras import execute_values
 
-# Showdown API endpoints
-SHOWDOWN_REPLAY_SEARCH = "https://replay.pokemonshowdown.com/search.json"
-SHOWDOWN_REPLAY_BASE = "https://replay.pokemonshowdown.com"
+from crawl_state import CrawlState
+from http_client import get_client
+from replay_archive import DEFAULT_MAX_BYTES, ReplayArchive
+from replay_writer import DEFAULT_BATCH_SIZE, ReplayWriter
+from showdown_log import parse_log, parse_replay
+from species import slugify
+from tags import identify_tags
+
+# Showdown API endpoints (SHOWDOWN_REPLAY_BASE can point at a local mirror, see mirror.py)
+SHOWDOWN_REPLAY_BASE = os.environ.get("SHOWDOWN_REPLAY_BASE", "https://replay.pokemonshowdown.com").rstrip("/")
+SHOWDOWN_REPLAY_SEARCH = f"{SHOWDOWN_REPLAY_BASE}/search.json"
 
 # Format mapping
 FORMAT_MAP = {
@@ -34,6 +48,34 @@ FORMAT_MAP = {
     "reg-h": "gen9vgc2025regh",
 }
 
+# Crawl defaults: in-flight detail fetches and global request budget
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RPS = 4.0
+PAGE_PREFETCH = 2
+
+# Backfill parsing: replays per process-pool work unit
+DEFAULT_CHUNK_SIZE = 200
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests to a global requests-per-second budget."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may issue its next request."""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
 def get_db_connection():
     """Create database connection from environment variable."""
     db_url = os.environ.get("DATABASE_URL")
@@ -41,124 +83,57 @@ def get_db_connection():
         raise ValueError("DATABASE_URL environment variable not set")
     return psycopg2.connect(db_url)
 
-def fetch_url(url: str, retries: int = 3) -> str:
-    """Fetch URL content with retries."""
-    req = Request(url, headers={"User-Agent": "VGCMetaCompass/1.0"})
-    
-    for attempt in range(retries):
-        try:
-            with urlopen(req, timeout=30) as response:
-                return response.read().decode("utf-8")
-        except HTTPError as e:
-            if e.code == 404:
-                raise
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-                continue
-            raise
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            raise
-    
-    raise RuntimeError(f"Failed to fetch {url} after {retries} retries")
+def fetch_url(url: str) -> str:
+    """Fetch URL content over the shared keep-alive client (retries included)."""
+    resp = get_client().get(url)
+    resp.raise_for_status()
+    return resp.text
 
 def search_replays(format_name: str, page: int = 1) -> list[dict]:
-    """Search for replays of a specific format."""
+    """Search for replays of a specific format.
+    
+    Only a successfully decoded empty list means there are no more results.
+    HTTP, network and decode errors propagate, so a failed page is never
+    mistaken for the end of the crawl.
+    """
     url = f"{SHOWDOWN_REPLAY_SEARCH}?format={format_name}&page={page}"
     
-    try:
-        content = fetch_url(url)
-        data = json.loads(content)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, HTTPError):
-        return []
+    data = json.loads(fetch_url(url))
+    if not isinstance(data, list):
+        raise ValueError(f"Unexpected search response for {format_name} page {page}")
+    return data
 
-def fetch_replay_data(replay_id: str) -> Optional[dict]:
-    """Fetch detailed replay data."""
+def fetch_replay_data(replay_id: str, archive: Optional[ReplayArchive] = None,
+                      format_name: Optional[str] = None) -> Optional[dict]:
+    """Fetch detailed replay data, keeping the raw JSON in the archive if given."""
     url = f"{SHOWDOWN_REPLAY_BASE}/{replay_id}.json"
     
     try:
         content = fetch_url(url)
-        return json.loads(content)
+        replay_data = json.loads(content)
     except (json.JSONDecodeError, HTTPError):
         return None
+    
+    if archive is not None:
+        archive.put(format_name, content, replay_data.get("uploadtime"))
+    return replay_data
 
-def extract_team_from_log(log: str, player: int) -> list[str]:
-    """Extract team Pokemon from replay log."""
+def team_from_names(names: list[str]) -> list[str]:
+    """Slugify team preview names, dropping duplicates."""
     team = []
-    player_prefix = f"|poke|p{player}|"
-    
-    for line in log.split("\n"):
-        if line.startswith(player_prefix):
-            # Format: |poke|p1|Pokemon, F|item
-            parts = line.split("|")
-            if len(parts) >= 4:
-                pokemon_part = parts[3]
-                # Remove gender and item info
-                pokemon_name = pokemon_part.split(",")[0].strip()
-                slug = slugify(pokemon_name)
-                if slug and slug not in team:
-                    team.append(slug)
-    
+    for pokemon_name in names:
+        slug = slugify(pokemon_name)
+        if slug and slug not in team:
+            team.append(slug)
     return team[:6]  # Max 6 Pokemon per team
 
+def extract_team_from_log(log: str, player: int) -> list[str]:
+    """Extract team Pokemon from replay log."""
+    return team_from_names(parse_log(log)["teams"][player])
+
 def extract_winner(log: str) -> Optional[int]:
     """Extract winner side from replay log."""
-    for line in log.split("\n"):
-        if line.startswith("|win|"):
-            winner_name = line.split("|")[2]
-            # Check if winner is p1 or p2
-            for check_line in log.split("\n"):
-                if check_line.startswith("|player|p1|") and winner_name in check_line:
-                    return 1
-                if check_line.startswith("|player|p2|") and winner_name in check_line:
-                    return 2
-    return None
-
-def estimate_rating(replay_data: dict) -> tuple[Optional[int], str]:
-    """Estimate rating from replay data."""
-    # Try official rating first
-    rating = replay_data.get("rating")
-    if rating and isinstance(rating, (int, float)) and rating > 1000:
-        return int(rating), "official"
-    
-    # Try to extract from player info
-    p1_rating = replay_data.get("p1rating", {}).get("elo")
-    p2_rating = replay_data.get("p2rating", {}).get("elo")
-    
-    if p1_rating and p2_rating:
-        avg_rating = (p1_rating + p2_rating) / 2
-        return int(avg_rating), "estimated"
-    
-    if p1_rating:
-        return int(p1_rating), "estimated"
-    if p2_rating:
-        return int(p2_rating), "estimated"
-    
-    return None, "unknown"
-
-def slugify(name: str) -> str:
-    """Convert Pokemon name to slug."""
-    slug = name.lower()
-    slug = re.sub(r"[^a-z0-9\-]", "", slug.replace(" ", "-").replace("'", ""))
-    
-    # Handle common form names
-    form_mappings = {
-        "urshifu-rapid-strike-style": "urshifu-rapid-strike",
-        "urshifu-single-strike-style": "urshifu-single-strike",
-        "landorus-therian-forme": "landorus-therian",
-        "tornadus-incarnate-forme": "tornadus",
-        "indeedee-f": "indeedee-f",
-    }
-    
-    for pattern, replacement in form_mappings.items():
-        if pattern in slug:
-            slug = replacement
-            break
-    
-    return slug
+    return parse_log(log)["winner_side"]
 
 def identify_featured_cores(team1: list[str], team2: list[str]) -> list[str]:
     """Identify notable cores present in the teams."""
@@ -184,166 +159,378 @@ def identify_featured_cores(team1: list[str], team2: list[str]) -> list[str]:
     
     return featured
 
-def identify_tags(team1: list[str], team2: list[str], log: str) -> list[str]:
-    """Identify archetype tags from teams."""
-    tags = []
-    all_pokemon = set(team1 + team2)
-    
-    # Rain
-    if "pelipper" in all_pokemon or "politoed" in all_pokemon:
-        tags.append("rain")
-    
-    # Sun
-    if "torkoal" in all_pokemon or "koraidon" in all_pokemon:
-        tags.append("sun")
-    
-    # Trick Room
-    trick_room_setters = {"hatterene", "dusclops", "porygon2", "gothitelle", "farigiraf", "oranguru"}
-    if any(p in all_pokemon for p in trick_room_setters):
-        tags.append("trick-room")
-    
-    # Tailwind
-    tailwind_users = {"tornadus", "whimsicott", "murkrow", "talonflame"}
-    if any(p in all_pokemon for p in tailwind_users):
-        tags.append("tailwind")
-    
-    return tags
-
-def upsert_replays(conn, format_id: str, replays: list[dict]):
-    """Upsert replay data to database."""
-    cursor = conn.cursor()
-    
-    rows = []
-    for r in replays:
-        rows.append((
-            r["replay_id"],
-            format_id,
-            r.get("rating"),
-            r.get("rating_source"),
-            r.get("played_at"),
-            json.dumps(r["p1_team"]),
-            json.dumps(r["p2_team"]),
-            r.get("winner_side"),
-            json.dumps(r.get("tags", [])),
-            json.dumps(r.get("featured_cores", [])),
-        ))
-    
-    execute_values(
-        cursor,
-        """
-        INSERT INTO replays 
-            (replay_id, format_id, rating_estimate, rating_source, played_at,
-             p1_team, p2_team, winner_side, tags, featured_cores)
-        VALUES %s
-        ON CONFLICT (replay_id) DO UPDATE SET
-            rating_estimate = EXCLUDED.rating_estimate,
-            rating_source = EXCLUDED.rating_source,
-            tags = EXCLUDED.tags,
-            featured_cores = EXCLUDED.featured_cores
-        """,
-        rows
-    )
-    
-    conn.commit()
-    print(f"Upserted {len(rows)} replays")
+def build_replay_record(replay_id: str, replay_data: dict, min_rating: int) -> tuple[Optional[dict], str]:
+    """Turn raw replay JSON into a replay record, or None with the skip reason."""
+    parsed = parse_replay(replay_data)
+    p1_team = team_from_names(parsed["teams"][1])
+    p2_team = team_from_names(parsed["teams"][2])
+    rating, rating_source = parsed["rating"], parsed["rating_source"]
+    winner = parsed["winner_side"]
+    
+    # Filter by rating
+    if rating and rating < min_rating:
+        return None, f"low rating ({rating})"
+    
+    # Parse timestamp
+    upload_time = parsed["upload_time"]
+    played_at = None
+    if upload_time:
+        try:
+            played_at = datetime.fromtimestamp(upload_time)
+        except (ValueError, TypeError):
+            pass
+    
+    replay_record = {
+        "replay_id": replay_id,
+        "rating": rating,
+        "rating_source": rating_source,
+        "played_at": played_at,
+        "p1_team": p1_team,
+        "p2_team": p2_team,
+        "winner_side": winner,
+        "tags": identify_tags(p1_team + p2_team),
+        "featured_cores": identify_featured_cores(p1_team, p2_team),
+    }
+    return replay_record, f"OK (rating: {rating}, {len(p1_team)}v{len(p2_team)})"
+
+def iter_search_pages(format_name: str, limiter: RateLimiter, stop: threading.Event, start_page: int = 1):
+    """Yield search result pages, prefetching ahead on a background thread.
+    
+    Pagination runs concurrently with detail fetches; at most PAGE_PREFETCH
+    pages are buffered so the crawl never races far past --limit. A page
+    that fails is yielded as its exception, after which the pages stop.
+    """
+    pages: queue.Queue = queue.Queue(maxsize=PAGE_PREFETCH)
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        page = start_page
+        while not stop.is_set():
+            limiter.wait()
+            try:
+                results = search_replays(format_name, page)
+            except Exception as e:
+                put((page, e))
+                return
+            if not put((page, results)) or not results:
+                return
+            page += 1
+    
+    producer = threading.Thread(target=produce, name="search-pages", daemon=True)
+    producer.start()
+    while True:
+        page, results = pages.get()
+        yield page, results
+        if not results or isinstance(results, Exception):
+            return
+
+def iter_replays(format_name: str, min_rating: int, limit: int,
+                 concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_RPS,
+                 state: Optional[CrawlState] = None, archive: Optional[ReplayArchive] = None):
+    """Crawl replays with a bounded pool of detail fetches, yielding records.
+    
+    Results are consumed in search order, so the records match a serial
+    crawl regardless of how fetches complete; replays fetched past --limit
+    are discarded.
+    
+    With a CrawlState, known replay IDs are skipped before download, the
+    crawl resumes after the last checkpointed page and stops once it reaches
+    the high-water mark of the previous completed crawl. A page is
+    checkpointed only after all of its records have been yielded. A search
+    page that fails raises out of the crawl, leaving the high-water mark
+    where it was; the next run resumes from the checkpoint.
+    
+    With a ReplayArchive, every downloaded replay's raw JSON is archived.
+    """
+    limiter = RateLimiter(rps)
+    stop = threading.Event()
+    pending: deque = deque()
+    open_pages: deque = deque()  # [page, unconsumed fetches, fully submitted]
+    max_pending = max(1, concurrency) * 2
+    yielded = 0
+    
+    def fetch(replay_id: str) -> Optional[dict]:
+        limiter.wait()
+        if archive is not None:
+            return fetch_replay_data(replay_id, archive, format_name)
+        return fetch_replay_data(replay_id)
+    
+    def close_pages():
+        while open_pages and open_pages[0][1] == 0 and open_pages[0][2]:
+            page = open_pages.popleft()[0]
+            if state:
+                state.page_done(page)
+    
+    def drain(until: int):
+        # Consume completed fetches in submission order
+        nonlocal yielded
+        while pending and len(pending) > until and yielded < limit:
+            entry, replay_id, future = pending.popleft()
+            replay_data = future.result()
+            entry[1] -= 1
+            if not replay_data:
+                print(f"    {replay_id}: failed")
+                close_pages()
+                continue
+            if state:
+                state.seen(replay_id)
+            record, status = build_replay_record(replay_id, replay_data, min_rating)
+            print(f"    {replay_id}: {status}")
+            if record:
+                yielded += 1
+                yield record
+            close_pages()
+    
+    start_page = state.start_page() if state else 1
+    if start_page > 1:
+        print(f"  Resuming after checkpointed page {start_page - 1}")
+    
+    reached_known = False
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        try:
+            for page, search_results in iter_search_pages(format_name, limiter, stop, start_page):
+                if isinstance(search_results, Exception):
+                    # Finish the pages already submitted, then stop without completing
+                    yield from drain(0)
+                    raise search_results
+                if not search_results:
+                    print("  No more results")
+                    reached_known = True
+                    break
+                print(f"  Page {page}...")
+                entry = [page, 0, False]
+                open_pages.append(entry)
+                skipped = 0
+                
+                for result in search_results:
+                    replay_id = result.get("id")
+                    if not replay_id:
+                        continue
+                    if state:
+                        upload_time = result.get("uploadtime")
+                        if state.is_covered(upload_time):
+                            reached_known = True
+                            break
+                        state.observe(upload_time)
+                        if state.is_known(replay_id):
+                            skipped += 1
+                            continue
+                    entry[1] += 1
+                    pending.append((entry, replay_id, pool.submit(fetch, replay_id)))
+                    yield from drain(max_pending)
+                    if yielded >= limit:
+                        break
+                
+                if skipped:
+                    print(f"    skipped {skipped} known replays")
+                if yielded >= limit:
+                    break
+                entry[2] = True
+                close_pages()
+                if reached_known:
+                    print("  Reached previously crawled replays")
+                    break
+            
+            yield from drain(0)
+            if state and reached_known and yielded < limit:
+                state.complete()
+        finally:
+            stop.set()
+            for _, _, future in pending:
+                future.cancel()
+
+def parse_raw_chunk(raws, min_rating: int) -> list[dict]:
+    """Decode and parse a chunk of raw replay JSON into records (pool work unit)."""
+    records = []
+    for raw in raws:
+        try:
+            replay_data = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        replay_id = replay_data.get("id")
+        if not replay_id:
+            continue
+        record, _ = build_replay_record(replay_id, replay_data, min_rating)
+        if record:
+            records.append(record)
+    return records
+
+_worker_archives: dict[str, ReplayArchive] = {}
+
+def parse_archive_chunk(root: str, format_name: str, paths: list[str], min_rating: int) -> list[dict]:
+    """Read, decompress and parse a chunk of archive blobs (pool work unit)."""
+    archive = _worker_archives.get(root)
+    if archive is None:
+        archive = _worker_archives[root] = ReplayArchive(root)
+    return parse_raw_chunk((archive.read_blob(format_name, p) for p in paths), min_rating)
+
+def chunked(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_parallel(fn, work_units, workers: int):
+    """Run fn(*unit) on a process pool, yielding each unit's records in input order.
+    
+    At most 2 * workers units are in flight, so memory stays bounded however
+    long the input is.
+    """
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for unit in work_units:
+            pending.append(pool.submit(fn, *unit))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def iter_archived_replays(archive: ReplayArchive, format_name: str, min_rating: int,
+                          workers: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Rebuild replay records from the local archive without network access."""
+    if workers:
+        units = ((archive.root, format_name, paths, min_rating)
+                 for paths in chunked(archive.iter_blob_paths(format_name), chunk_size))
+        yield from iter_parallel(parse_archive_chunk, units, workers)
+        return
+    for raw in archive.iter_raw(format_name):
+        yield from parse_raw_chunk([raw], min_rating)
+
+def iter_dump_replays(path: str, min_rating: int, workers: int = 0,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Parse a JSONL dump of replay JSON (one replay per line, optionally .gz)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        if workers:
+            yield from iter_parallel(parse_raw_chunk,
+                                     ((chunk, min_rating) for chunk in chunked(lines, chunk_size)),
+                                     workers)
+            return
+        for chunk in chunked(lines, chunk_size):
+            yield from parse_raw_chunk(chunk, min_rating)
+
+def crawl_replays(format_name: str, min_rating: int, limit: int,
+                  concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_RPS) -> list[dict]:
+    """Crawl replays into a list (see iter_replays)."""
+    return list(iter_replays(format_name, min_rating, limit, concurrency, rps))
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch Showdown Replays")
     parser.add_argument("--format", default="reg-f", help="Format ID (e.g., reg-f)")
     parser.add_argument("--min-rating", type=int, default=1700, help="Minimum rating filter")
     parser.add_argument("--limit", type=int, default=500, help="Maximum replays to fetch")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum replay fetches in flight (1 = serial)")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS,
+                        help="Global request budget in requests per second (0 = unlimited)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip known replays, stop at the last crawl's high-water mark and resume from checkpoints")
+    parser.add_argument("--reseed", action="store_true",
+                        help="Rebuild the known-ID filter from the replays table (implies --incremental)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Keep raw replay JSON in the local zstd archive")
+    parser.add_argument("--archive-max-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help="Archive size cap; oldest months are evicted first")
+    parser.add_argument("--from-archive", action="store_true",
+                        help="Rebuild replays rows from the local archive only (ignores --limit)")
+    parser.add_argument("--from-dump", metavar="PATH",
+                        help="Rebuild replays rows from a JSONL(.gz) dump of replay JSON (ignores --limit)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Parse processes for --from-archive/--from-dump (0 = parse inline)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Replays per streamed database write")
     parser.add_argument("--dry-run", action="store_true", help="Print data without writing")
     args = parser.parse_args()
     
     # Get Showdown format name
     showdown_format = FORMAT_MAP.get(args.format, args.format)
     
-    print(f"Searching replays for format: {showdown_format}")
-    
-    all_replays = []
-    page = 1
-    
-    while len(all_replays) < args.limit:
-        print(f"  Page {page}...")
-        search_results = search_replays(showdown_format, page)
-        
-        if not search_results:
-            print("  No more results")
-            break
-        
-        for result in search_results:
-            if len(all_replays) >= args.limit:
-                break
-            
-            replay_id = result.get("id")
-            if not replay_id:
-                continue
-            
-            # Fetch full replay data
-            print(f"    Fetching {replay_id}...", end=" ")
-            replay_data = fetch_replay_data(replay_id)
-            
-            if not replay_data:
-                print("failed")
-                continue
-            
-            # Extract data
-            log = replay_data.get("log", "")
-            p1_team = extract_team_from_log(log, 1)
-            p2_team = extract_team_from_log(log, 2)
-            rating, rating_source = estimate_rating(replay_data)
-            winner = extract_winner(log)
-            
-            # Filter by rating
-            if rating and rating < args.min_rating:
-                print(f"low rating ({rating})")
-                continue
-            
-            # Parse timestamp
-            upload_time = replay_data.get("uploadtime")
-            played_at = None
-            if upload_time:
-                try:
-                    played_at = datetime.fromtimestamp(upload_time)
-                except (ValueError, TypeError):
-                    pass
-            
-            replay_record = {
-                "replay_id": replay_id,
-                "rating": rating,
-                "rating_source": rating_source,
-                "played_at": played_at,
-                "p1_team": p1_team,
-                "p2_team": p2_team,
-                "winner_side": winner,
-                "tags": identify_tags(p1_team, p2_team, log),
-                "featured_cores": identify_featured_cores(p1_team, p2_team),
-            }
-            
-            all_replays.append(replay_record)
-            print(f"OK (rating: {rating}, {len(p1_team)}v{len(p2_team)})")
-            
-            # Rate limiting
-            time.sleep(0.5)
-        
-        page += 1
-        time.sleep(1)
+    archive = None
+    if args.archive or args.from_archive:
+        archive = ReplayArchive(max_bytes=args.archive_max_mb * 1024 ** 2)
+    
+    state = None
+    if (args.incremental or args.reseed) and not (args.from_archive or args.from_dump):
+        state = CrawlState(showdown_format)
+        if (args.reseed or state.known is None) and os.environ.get("DATABASE_URL"):
+            conn = get_db_connection()
+            try:
+                state.seed(conn, args.format)
+            finally:
+                conn.close()
     
-    print(f"\nFetched {len(all_replays)} replays")
+    if args.from_archive:
+        print(f"Rebuilding replays for format {showdown_format} from {archive.root}")
+        records = iter_archived_replays(archive, showdown_format, args.min_rating, workers=args.workers)
+    elif args.from_dump:
+        print(f"Rebuilding replays from dump {args.from_dump}")
+        records = iter_dump_replays(args.from_dump, args.min_rating, workers=args.workers)
+    else:
+        print(f"Searching replays for format: {showdown_format} "
+              f"(concurrency: {args.concurrency}, rps: {args.rps})")
+        records = iter_replays(showdown_format, args.min_rating, args.limit,
+                               concurrency=args.concurrency, rps=args.rps,
+                               state=state, archive=archive)
+    
+    writer = None
+    if not args.dry_run:
+        writer = ReplayWriter(get_db_connection(), args.format, batch_size=args.batch_size)
+    
+    fetched = 0
+    preview = []
+    interrupted = None
+    try:
+        for record in records:
+            fetched += 1
+            if writer:
+                writer.write(record)
+            elif len(preview) < 5:
+                preview.append(record)
+    except (KeyboardInterrupt, Exception) as e:
+        if not state:
+            raise
+        # Keep what was fetched; the next run resumes from the checkpoint
+        print(f"\nCrawl interrupted ({type(e).__name__}), saving progress")
+        interrupted = e
+    finally:
+        if writer:
+            try:
+                writer.close()
+            finally:
+                writer.conn.close()
+    
+    print(f"\nFetched {fetched} replays")
+    
+    if archive is not None and not args.from_archive:
+        archive.maybe_train(showdown_format)
+        archive.enforce_cap()
+    
+    if state and not args.dry_run:
+        state.commit()
+    if interrupted is not None:
+        # Progress is saved, but the run still fails
+        raise interrupted
     
     if args.dry_run:
         print("\n--- DRY RUN ---")
-        for r in all_replays[:5]:
+        for r in preview:
             print(f"  {r['replay_id']}: {r['rating']} ({r['rating_source']}) | {r['p1_team']}")
         return
     
-    # Write to database
-    conn = get_db_connection()
-    try:
-        upsert_replays(conn, args.format, all_replays)
-        print("Done!")
-    finally:
-        conn.close()
+    print("Done!")
 
 if __name__ == "__main__":
     main()
@@ -3,27 +3,50 @@
 Smogon Stats Fetcher
 Downloads and parses monthly usage data from Smogon Stats.
 
+The chaos JSON (tens of MB for popular formats) is streamed and parsed one
+Pokemon entry at a time, so only a single species is ever held in memory.
+Its Teammates blocks are folded into a teammate matrix on the way through
+and loaded into pair_synergy alongside the usage rows.
+
+Every fetched file is recorded in the stats manifest (stats_manifest.py).
+A run HEADs the usage and chaos files first and exits without touching the
+database when both are unchanged since they were last loaded.
+
+Backfill mode fetches and parses many (format, cutoff, month) files on a
+process pool and loads each one in its own transaction, skipping files that
+are already in pokemon_usage.
+
 Usage:
     python fetch_smogon_stats.py --format gen9vgc2024regf --cutoff 1760 --month 2026-01
+    python fetch_smogon_stats.py --format reg-f --month 2026-01 --chaos-file gen9vgc2026regf-1760.json.gz
+    python fetch_smogon_stats.py --backfill --formats reg-f,reg-g --cutoffs 0,1500,1630,1760 --months 2025-08:2026-01
     
-Writes to: pokemon_usage, pokemon_dim tables
+Writes to: pokemon_usage, pokemon_dim, pair_synergy tables
 """
 
 import argparse
-import json
+import hashlib
+import io
 import os
 import re
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Optional
-from urllib.request import urlopen, Request
 from urllib.error import HTTPError
 
 import psycopg2
-from psycopg2.extras import execute_values
 
-# Smogon Stats base URL
-SMOGON_STATS_BASE = "https://www.smogon.com/stats"
+from bulk_writer import bulk_upsert
+from chaos_stream import iter_chaos, open_chaos_file
+from chaos_topk import batch_entry_details
+from http_client import get_client
+from species import slugify
+from stats_manifest import HashingReader, StatsManifest
+from teammate_matrix import TeammateMatrix, upsert_pair_synergy
+
+# Smogon Stats base URL (SMOGON_STATS_BASE can point at a local mirror, see mirror.py)
+SMOGON_STATS_BASE = os.environ.get("SMOGON_STATS_BASE", "https://www.smogon.com/stats").rstrip("/")
 
 # Format mapping: our format_id -> Smogon format name
 FORMAT_MAP = {
@@ -32,6 +55,23 @@ FORMAT_MAP = {
     "reg-h": "gen9vgc2025regh",
 }
 
+# Rating cutoffs Smogon publishes stats for
+SMOGON_CUTOFFS = [0, 1500, 1630, 1760]
+
+# Months of history kept (mirrors DATA_RETENTION_MONTHS in src/lib/constants.ts)
+DATA_RETENTION_MONTHS = 6
+
+DEFAULT_BACKFILL_WORKERS = 4
+
+USAGE_COLUMNS = (
+    "format_id", "time_bucket", "cutoff", "pokemon", "usage_rate", "rank",
+    "top_moves", "top_items", "top_abilities", "top_tera", "top_spreads", "sample_size",
+)
+USAGE_KEY = ("format_id", "time_bucket", "cutoff", "pokemon")
+
+# Chaos entries post-processed per vectorized top-k batch
+CHAOS_BATCH_SIZE = 64
+
 def get_db_connection():
     """Create database connection from environment variable."""
     db_url = os.environ.get("DATABASE_URL")
@@ -39,15 +79,27 @@ def get_db_connection():
         raise ValueError("DATABASE_URL environment variable not set")
     return psycopg2.connect(db_url)
 
-def fetch_url(url: str) -> str:
-    """Fetch URL content with proper headers."""
-    req = Request(url, headers={"User-Agent": "VGCMetaCompass/1.0"})
-    try:
-        with urlopen(req, timeout=30) as response:
-            return response.read().decode("utf-8")
-    except HTTPError as e:
-        print(f"HTTP Error {e.code} for {url}")
-        raise
+def usage_file_url(smogon_format: str, month: str, cutoff: int) -> str:
+    return f"{SMOGON_STATS_BASE}/{month}/{smogon_format}-{cutoff}.txt"
+
+def chaos_file_url(smogon_format: str, month: str, cutoff: int) -> str:
+    return f"{SMOGON_STATS_BASE}/{month}/chaos/{smogon_format}-{cutoff}.json"
+
+def fetch_url(url: str, meta: Optional[dict] = None) -> str:
+    """Fetch URL content, revalidating against the local validator store.
+
+    meta (if given) receives headers, size and sha256 for the stats manifest.
+    """
+    resp = get_client().get(url, conditional=True)
+    if resp.status_code >= 400:
+        print(f"HTTP Error {resp.status_code} for {url}")
+    resp.raise_for_status()
+    if resp.from_cache:
+        print(f"Not modified, using stored copy of {url}")
+    if meta is not None:
+        meta.update(headers=resp.headers, size=len(resp.content),
+                    sha256=hashlib.sha256(resp.content).hexdigest())
+    return resp.text
 
 def parse_usage_file(content: str) -> list[dict]:
     """Parse Smogon usage text file into structured data."""
@@ -68,7 +120,7 @@ def parse_usage_file(content: str) -> list[dict]:
                 usage_rate = float(usage_str)
                 
                 # Convert name to slug
-                slug = name.lower().replace(" ", "-").replace("'", "")
+                slug = slugify(name)
                 
                 pokemon_data.append({
                     "rank": rank,
@@ -81,30 +133,66 @@ def parse_usage_file(content: str) -> list[dict]:
     
     return pokemon_data
 
+def parse_chaos_stream(stream, batch_size: int = CHAOS_BATCH_SIZE,
+                       teammates: Optional[TeammateMatrix] = None,
+                       info: Optional[dict] = None) -> dict[str, dict]:
+    """Parse a chaos JSON stream (bytes or text file-like), batch_size species at a time.
+
+    Entries are also fed to teammates when given; info receives the "info" block.
+    """
+    pokemon_details = {}
+    names: list[str] = []
+    entries: list[dict] = []
+
+    def flush():
+        for name, detail in zip(names, batch_entry_details(entries, fallback=extract_top_items)):
+            pokemon_details[slugify(name)] = detail
+        names.clear()
+        entries.clear()
+
+    for pokemon_name, entry in iter_chaos(stream, info=info):
+        names.append(pokemon_name)
+        entries.append(entry)
+        if teammates is not None:
+            teammates.add(pokemon_name, entry)
+        if len(entries) >= batch_size:
+            flush()
+    flush()
+    return pokemon_details
+
 def parse_moveset_file(content: str) -> dict[str, dict]:
     """Parse Smogon moveset/chaos file for detailed Pokemon data."""
-    pokemon_details = {}
-    
     # Try parsing as JSON first (chaos format)
     try:
-        data = json.loads(content)
-        for pokemon_name, info in data.get("data", {}).items():
-            slug = pokemon_name.lower().replace(" ", "-").replace("'", "")
-            pokemon_details[slug] = {
-                "top_moves": extract_top_items(info.get("Moves", {})),
-                "top_items": extract_top_items(info.get("Items", {})),
-                "top_abilities": extract_top_items(info.get("Abilities", {})),
-                "top_tera": extract_top_items(info.get("Tera Types", {})),
-                "top_spreads": extract_top_items(info.get("Spreads", {}), limit=5),
-                "sample_size": info.get("Raw count", 0),
-            }
-        return pokemon_details
-    except json.JSONDecodeError:
+        return parse_chaos_stream(io.StringIO(content))
+    except ValueError:
         pass
     
     # Fallback: parse text format
     # TODO: Implement text format parsing if needed
-    return pokemon_details
+    return {}
+
+def fetch_chaos_details(url: str, meta: Optional[dict] = None, **kwargs) -> dict[str, dict]:
+    """Stream the chaos file at url straight into the parser (meta as in fetch_url)."""
+    with get_client().stream(url, conditional=True) as body:
+        reader = HashingReader(body)
+        details = parse_chaos_stream(reader, **kwargs)
+        # Drain any trailing bytes so the hash covers the whole file
+        while reader.read(1 << 16):
+            pass
+        if meta is not None:
+            meta.update(headers=body.headers, size=reader.size, sha256=reader.hexdigest())
+        return details
+
+def load_chaos_file(path: str, **kwargs) -> dict[str, dict]:
+    """Parse a local chaos file (plain or gzip-compressed)."""
+    with open_chaos_file(path) as f:
+        return parse_chaos_stream(f, **kwargs)
+
+def chaos_pairs(teammates: TeammateMatrix, info: dict) -> list[tuple]:
+    """pair_synergy rows from a parsed chaos file (empty without a battle count)."""
+    battles = int(info.get("number of battles") or 0)
+    return teammates.pair_rows(battles) if battles else []
 
 def extract_top_items(data: dict, limit: int = 10) -> list[dict]:
     """Extract top items from usage data, sorted by percentage."""
@@ -127,39 +215,23 @@ def extract_top_items(data: dict, limit: int = 10) -> list[dict]:
 
 def ensure_pokemon_dim(conn, pokemon_list: list[dict]):
     """Ensure all Pokemon exist in pokemon_dim table."""
-    cursor = conn.cursor()
-    
-    # Get existing slugs
-    cursor.execute("SELECT slug FROM pokemon_dim")
-    existing = {row[0] for row in cursor.fetchall()}
-    
-    # Insert new Pokemon
-    new_pokemon = [(p["slug"], p["name"]) for p in pokemon_list if p["slug"] not in existing]
-    
-    if new_pokemon:
-        execute_values(
-            cursor,
-            "INSERT INTO pokemon_dim (slug, name) VALUES %s ON CONFLICT (slug) DO NOTHING",
-            new_pokemon
-        )
-        print(f"Added {len(new_pokemon)} new Pokemon to pokemon_dim")
-    
-    conn.commit()
+    added = bulk_upsert(conn, "pokemon_dim", ("slug", "name"),
+                        ((p["slug"], p["name"]) for p in pokemon_list),
+                        conflict=("slug",), update=())
+    if added:
+        print(f"Added {added} new Pokemon to pokemon_dim")
+
+def wrap_v1(data):
+    """Versioned JSONB wrapper."""
+    return {"_v": 1, "data": data}
 
 def upsert_usage_data(conn, format_id: str, time_bucket: str, cutoff: int, 
                       usage_data: list[dict], details: dict[str, dict]):
     """Upsert usage data into pokemon_usage table."""
-    cursor = conn.cursor()
-    
     rows = []
     for p in usage_data:
         slug = p["slug"]
         detail = details.get(slug, {})
-        
-        # Create versioned JSONB wrappers
-        def wrap_v1(data):
-            return json.dumps({"_v": 1, "data": data})
-        
         rows.append((
             format_id,
             time_bucket,
@@ -175,88 +247,258 @@ def upsert_usage_data(conn, format_id: str, time_bucket: str, cutoff: int,
             detail.get("sample_size"),
         ))
     
-    execute_values(
-        cursor,
-        """
-        INSERT INTO pokemon_usage 
-            (format_id, time_bucket, cutoff, pokemon, usage_rate, rank,
-             top_moves, top_items, top_abilities, top_tera, top_spreads, sample_size)
-        VALUES %s
-        ON CONFLICT (format_id, time_bucket, cutoff, pokemon) 
-        DO UPDATE SET
-            usage_rate = EXCLUDED.usage_rate,
-            rank = EXCLUDED.rank,
-            top_moves = EXCLUDED.top_moves,
-            top_items = EXCLUDED.top_items,
-            top_abilities = EXCLUDED.top_abilities,
-            top_tera = EXCLUDED.top_tera,
-            top_spreads = EXCLUDED.top_spreads,
-            sample_size = EXCLUDED.sample_size
-        """,
-        rows
-    )
-    
-    conn.commit()
+    bulk_upsert(conn, "pokemon_usage", USAGE_COLUMNS, rows, conflict=USAGE_KEY, label="pokemon_usage")
     print(f"Upserted {len(rows)} Pokemon usage records")
 
-def get_latest_month() -> str:
-    """Get the latest available month on Smogon Stats."""
-    # Check current and previous month
-    now = datetime.now()
-    for offset in range(3):
-        year = now.year
-        month = now.month - offset
-        if month <= 0:
+def load_usage(conn, format_id: str, time_bucket: str, cutoff: int,
+               usage_data: list[dict], details: dict[str, dict],
+               pairs: Optional[list[tuple]] = None, pair_species: Optional[list[dict]] = None):
+    """Write one usage file (pokemon_dim, pokemon_usage, pair_synergy) in a single transaction."""
+    try:
+        ensure_pokemon_dim(conn, usage_data + (pair_species or []))
+        upsert_usage_data(conn, format_id, time_bucket, cutoff, usage_data, details)
+        if pairs:
+            upsert_pair_synergy(conn, format_id, time_bucket, cutoff, pairs)
+            print(f"Upserted {len(pairs)} pair synergy records")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def get_latest_month(smogon_format: str, cutoff: int, manifest: Optional[StatsManifest] = None) -> str:
+    """Get the latest available month on Smogon Stats (HEAD probes, no listing scrape)."""
+    manifest = manifest or StatsManifest()
+    month = manifest.latest_month(lambda m: usage_file_url(smogon_format, m, cutoff),
+                                  smogon_format, cutoff)
+    manifest.save()
+    return month
+
+def month_range(start: str, end: str) -> list[str]:
+    """Inclusive list of YYYY-MM months from start to end."""
+    year, month = map(int, start.split("-"))
+    end_year, end_month = map(int, end.split("-"))
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year}-{month:02d}")
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+    return months
+
+def parse_months(spec: Optional[str], smogon_format: str, cutoff: int) -> list[str]:
+    """Months from "YYYY-MM:YYYY-MM" ranges and/or a comma list; default is the retention window."""
+    if not spec:
+        latest = get_latest_month(smogon_format, cutoff)
+        year, month = map(int, latest.split("-"))
+        month -= DATA_RETENTION_MONTHS - 1
+        while month <= 0:
             month += 12
             year -= 1
-        
-        month_str = f"{year}-{month:02d}"
-        url = f"{SMOGON_STATS_BASE}/{year}-{month:02d}/"
-        
-        try:
-            fetch_url(url)
-            return month_str
-        except HTTPError:
-            continue
-    
-    raise RuntimeError("Could not find any available month on Smogon Stats")
+        return month_range(f"{year}-{month:02d}", latest)
+
+    months = []
+    for part in spec.split(","):
+        part = part.strip()
+        if ":" in part:
+            months.extend(month_range(*part.split(":", 1)))
+        elif part:
+            months.append(part)
+    return sorted(set(months))
+
+def loaded_usage_keys(conn, format_ids: list[str]) -> set[tuple[str, str, int]]:
+    """(format_id, time_bucket, cutoff) already present in pokemon_usage, in one query."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT DISTINCT format_id, time_bucket, cutoff FROM pokemon_usage WHERE format_id = ANY(%s)",
+        (format_ids,),
+    )
+    return {(f, t, c) for f, t, c in cursor.fetchall()}
+
+def fetch_and_parse(format_id: str, time_bucket: str, cutoff: int) -> dict:
+    """Fetch and parse one usage/chaos pair (runs in a backfill worker process)."""
+    smogon_format = FORMAT_MAP.get(format_id, format_id)
+    usage_url = usage_file_url(smogon_format, time_bucket, cutoff)
+    chaos_url = chaos_file_url(smogon_format, time_bucket, cutoff)
+    result = {"format_id": format_id, "time_bucket": time_bucket, "cutoff": cutoff,
+              "usage_data": [], "details": {}, "pairs": [], "pair_species": [],
+              "usage_s": 0.0, "chaos_s": 0.0, "files": {usage_url: None, chaos_url: None}}
+
+    start = time.perf_counter()
+    meta = {}
+    try:
+        result["usage_data"] = parse_usage_file(fetch_url(usage_url, meta))
+    except HTTPError:
+        result["status"] = "missing"
+        return result
+    result["files"][usage_url] = meta
+    result["usage_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    teammates, info, meta = TeammateMatrix(), {}, {}
+    try:
+        result["details"] = fetch_chaos_details(chaos_url, meta, teammates=teammates, info=info)
+        result["pairs"] = chaos_pairs(teammates, info)
+        result["pair_species"] = teammates.species()
+        result["files"][chaos_url] = meta
+    except HTTPError:
+        pass  # Usage without moveset detail is still worth loading
+    result["chaos_s"] = time.perf_counter() - start
+    result["status"] = "ok"
+    return result
+
+def record_files(manifest: StatsManifest, files: dict[str, Optional[dict]],
+                 format_id: str, time_bucket: str, cutoff: int):
+    """Record fetch results (meta dicts from fetch_url/fetch_chaos_details, None = missing)."""
+    labels = {"format": FORMAT_MAP.get(format_id, format_id), "month": time_bucket, "cutoff": cutoff}
+    for url, meta in files.items():
+        kind = "usage" if url.endswith(".txt") else "chaos"
+        if meta is None:
+            manifest.record_missing(url, kind=kind, **labels)
+        else:
+            manifest.record(url, meta["headers"], meta["size"], meta["sha256"], kind=kind, **labels)
+
+def run_backfill(format_ids: list[str], cutoffs: list[int], months: list[str],
+                 workers: int = DEFAULT_BACKFILL_WORKERS, force: bool = False,
+                 dry_run: bool = False) -> dict[str, int]:
+    """Fetch/parse every (format, cutoff, month) on a process pool; load each as it completes."""
+    jobs = [(f, m, c) for f in format_ids for m in months for c in cutoffs]
+    conn = None if dry_run else get_db_connection()
+    counts = {"loaded": 0, "skipped": 0, "missing": 0, "failed": 0}
+    manifest = StatsManifest()
+    try:
+        if conn is not None and not force:
+            loaded = loaded_usage_keys(conn, format_ids)
+            pending = [job for job in jobs if job not in loaded]
+            counts["skipped"] = len(jobs) - len(pending)
+            jobs = pending
+        print(f"Backfill: {len(jobs)} files to fetch, {counts['skipped']} already loaded")
+
+        total_start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(fetch_and_parse, *job): job for job in jobs}
+            for future in as_completed(futures):
+                format_id, time_bucket, cutoff = futures[future]
+                label = f"{format_id} {time_bucket} cutoff {cutoff}"
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  {label}: failed ({e})")
+                    counts["failed"] += 1
+                    continue
+                if result["status"] == "missing":
+                    print(f"  {label}: not published")
+                    counts["missing"] += 1
+                    continue
+                record_files(manifest, result["files"], format_id, time_bucket, cutoff)
+
+                load_s = 0.0
+                if conn is not None:
+                    start = time.perf_counter()
+                    try:
+                        load_usage(conn, format_id, time_bucket, cutoff,
+                                   result["usage_data"], result["details"],
+                                   result["pairs"], result["pair_species"])
+                    except psycopg2.Error as e:
+                        print(f"  {label}: load failed ({e})")
+                        counts["failed"] += 1
+                        continue
+                    load_s = time.perf_counter() - start
+                    manifest.mark_loaded(list(result["files"]))
+                counts["loaded"] += 1
+                print(f"  {label}: {len(result['usage_data'])} Pokemon, "
+                      f"{len(result['details'])} with details, {len(result['pairs'])} pairs | usage {result['usage_s']:.2f}s, "
+                      f"chaos {result['chaos_s']:.2f}s, load {load_s:.2f}s")
+        print(f"Backfill finished in {time.perf_counter() - total_start:.1f}s: "
+              + ", ".join(f"{v} {k}" for k, v in counts.items()))
+    finally:
+        manifest.save()
+        if conn is not None:
+            conn.close()
+    return counts
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch Smogon Stats")
     parser.add_argument("--format", default="reg-f", help="Format ID (e.g., reg-f)")
     parser.add_argument("--cutoff", type=int, default=1760, help="Rating cutoff")
     parser.add_argument("--month", help="Month in YYYY-MM format (default: latest)")
+    parser.add_argument("--chaos-file", help="Local chaos JSON (.json or .json.gz) instead of downloading")
     parser.add_argument("--dry-run", action="store_true", help="Print data without writing")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Fetch every --formats x --cutoffs x --months file in parallel")
+    parser.add_argument("--formats", default=",".join(FORMAT_MAP),
+                        help="Backfill: comma-separated format IDs (default: all in FORMAT_MAP)")
+    parser.add_argument("--cutoffs", default=",".join(str(c) for c in SMOGON_CUTOFFS),
+                        help="Backfill: comma-separated rating cutoffs")
+    parser.add_argument("--months",
+                        help=f"Backfill: YYYY-MM:YYYY-MM ranges or a comma list "
+                             f"(default: last {DATA_RETENTION_MONTHS} months)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BACKFILL_WORKERS,
+                        help="Backfill: parallel fetch/parse processes")
+    parser.add_argument("--force", action="store_true",
+                        help="Reload even if the files are unchanged / already loaded")
     args = parser.parse_args()
     
+    if args.backfill:
+        format_ids = [f.strip() for f in args.formats.split(",") if f.strip()]
+        cutoffs = [int(c) for c in args.cutoffs.split(",") if c.strip()]
+        counts = run_backfill(
+            format_ids, cutoffs,
+            parse_months(args.months, FORMAT_MAP.get(format_ids[0], format_ids[0]), max(cutoffs)),
+            workers=args.workers, force=args.force, dry_run=args.dry_run,
+        )
+        if counts["failed"]:
+            sys.exit(1)
+        return
+    
+    # Get Smogon format name
+    smogon_format = FORMAT_MAP.get(args.format, args.format)
+    manifest = StatsManifest()
+    
     # Determine month
     if args.month:
         time_bucket = args.month
     else:
-        time_bucket = get_latest_month()
+        time_bucket = get_latest_month(smogon_format, args.cutoff, manifest)
         print(f"Using latest month: {time_bucket}")
     
-    # Get Smogon format name
-    smogon_format = FORMAT_MAP.get(args.format, args.format)
-    
     # Build URLs
-    year_month = time_bucket.replace("-", "-")  # Already in YYYY-MM format
-    usage_url = f"{SMOGON_STATS_BASE}/{year_month}/{smogon_format}-{args.cutoff}.txt"
-    chaos_url = f"{SMOGON_STATS_BASE}/{year_month}/chaos/{smogon_format}-{args.cutoff}.json"
+    usage_url = usage_file_url(smogon_format, time_bucket, args.cutoff)
+    chaos_url = chaos_file_url(smogon_format, time_bucket, args.cutoff)
+    
+    # Cheap HEAD check before downloading anything
+    if not args.force and not args.chaos_file and manifest.unchanged([usage_url, chaos_url]):
+        print(f"Smogon stats for {smogon_format} {time_bucket} cutoff {args.cutoff} "
+              "unchanged since last import, nothing to do")
+        return
     
     print(f"Fetching usage data from: {usage_url}")
-    usage_content = fetch_url(usage_url)
+    files = {usage_url: {}, chaos_url: None}
+    usage_content = fetch_url(usage_url, files[usage_url])
     usage_data = parse_usage_file(usage_content)
     print(f"Parsed {len(usage_data)} Pokemon from usage file")
     
-    print(f"Fetching moveset data from: {chaos_url}")
-    try:
-        chaos_content = fetch_url(chaos_url)
-        details = parse_moveset_file(chaos_content)
+    teammates, info = TeammateMatrix(), {}
+    if args.chaos_file:
+        print(f"Reading moveset data from: {args.chaos_file}")
+        details = load_chaos_file(args.chaos_file, teammates=teammates, info=info)
         print(f"Parsed detailed data for {len(details)} Pokemon")
-    except HTTPError:
-        print("Chaos file not available, using basic data only")
-        details = {}
+        del files[chaos_url]
+    else:
+        print(f"Fetching moveset data from: {chaos_url}")
+        try:
+            meta = {}
+            details = fetch_chaos_details(chaos_url, meta, teammates=teammates, info=info)
+            files[chaos_url] = meta
+            print(f"Parsed detailed data for {len(details)} Pokemon")
+        except HTTPError as e:
+            print(f"HTTP Error {e.code} for {chaos_url}")
+            print("Chaos file not available, using basic data only")
+            details = {}
+    record_files(manifest, files, args.format, time_bucket, args.cutoff)
+    manifest.save()
+    pairs = chaos_pairs(teammates, info) if details else []
+    print(f"Derived {len(pairs)} teammate pairs")
     
     if args.dry_run:
         print("\n--- DRY RUN ---")
@@ -265,11 +507,18 @@ def main():
             print(f"{p['rank']:3d}. {p['name']:25s} {p['usage_rate']:6.2f}% | moves: {len(detail.get('top_moves', []))}")
         return
     
+    if not args.force and not args.chaos_file and manifest.content_loaded(list(files)):
+        print("Content identical to the last import, skipping database writes")
+        return
+    
     # Write to database
     conn = get_db_connection()
     try:
-        ensure_pokemon_dim(conn, usage_data)
-        upsert_usage_data(conn, args.format, time_bucket, args.cutoff, usage_data, details)
+        load_usage(conn, args.format, time_bucket, args.cutoff, usage_data, details,
+                   pairs, teammates.species())
+        if not args.chaos_file:
+            manifest.mark_loaded(list(files))
+            manifest.save()
         print("Done!")
     finally:
         conn.close()
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+Keep-alive HTTP client used by every fetcher (scripts/ and pipeline/).
+
+- Pooled persistent connections per host, capped by a per-host limit
+- Transparent gzip/deflate decoding (Accept-Encoding is always sent)
+- Optional ETag/Last-Modified conditional requests backed by a local
+  validator store; a 304 is answered from the stored body
+- Streaming GETs for large files, decoded chunk by chunk
+- Optional recording of every successful GET into a mirror directory
+  (VGC_HTTP_RECORD) that scripts/mirror.py can serve back offline
+
+Usage:
+    from http_client import get_client
+
+    resp = get_client().get("https://www.smogon.com/stats/", conditional=True)
+    resp.raise_for_status()
+    html = resp.text
+
+    with get_client().stream(chaos_url, conditional=True) as body:
+        chunk = body.read(65536)
+"""
+
+import hashlib
+import http.client
+import io
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+USER_AGENT = "VGCMetaCompass/1.0"
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_PER_HOST = 8
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Local validator store (override with VGC_HTTP_CACHE)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "VGC_HTTP_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "http"),
+)
+
+# Mirror directory that successful GETs are recorded into (off unless VGC_HTTP_RECORD is set)
+DEFAULT_RECORD_DIR = os.environ.get("VGC_HTTP_RECORD") or None
+MIRROR_INDEX = "__index__"
+MIRROR_META_SUFFIX = ".meta.json"
+MIRROR_HEADERS = ("content-type", "etag", "last-modified")
+
+# Errors that mean a pooled keep-alive connection went stale
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+class Response:
+    """Decoded HTTP response (requests-style attribute names)."""
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes,
+                 from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise urllib's HTTPError so existing `except HTTPError` blocks keep working."""
+        if self.status_code >= 400:
+            raise HTTPError(self.url, self.status_code, f"HTTP {self.status_code}", None, None)
+
+class ValidatorStore:
+    """ETag/Last-Modified validators plus the body they validate, keyed by URL."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "validators.json")
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def body_path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "bodies", digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Return validators for url if its stored body is still present."""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and os.path.exists(self.body_path(url)):
+            return entry
+        return None
+
+    def load_body(self, url: str) -> bytes:
+        with open(self.body_path(url), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def store(self, url: str, headers: dict, body: bytes):
+        """Remember validators from a 200 response; no-op if the server sent none."""
+        entry = {k: headers[k] for k in ("etag", "last-modified") if headers.get(k)}
+        if not entry:
+            return
+        path = self.body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(body, 6))
+        os.replace(tmp, path)
+        with self.lock:
+            self.entries[url] = entry
+            self._save()
+
+    def open_writer(self, url: str, headers: dict) -> Optional["StoredBodyWriter"]:
+        """Incremental store() for streamed bodies; None if the server sent no validators."""
+        entry = {k: headers[k] for k in ("etag", "last-modified") if headers.get(k)}
+        if not entry:
+            return None
+        return StoredBodyWriter(self, url, entry)
+
+    def commit(self, url: str, entry: dict, tmp: str):
+        os.replace(tmp, self.body_path(url))
+        with self.lock:
+            self.entries[url] = entry
+            self._save()
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.index_path)
+
+class StoredBodyWriter:
+    """Compresses a streamed body into the validator store as it is read."""
+
+    def __init__(self, store: ValidatorStore, url: str, entry: dict):
+        self.store = store
+        self.url = url
+        self.entry = entry
+        path = store.body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = open(self.tmp, "wb")
+        self.compressor = zlib.compressobj(6)
+
+    def write(self, data: bytes):
+        self.file.write(self.compressor.compress(data))
+
+    def commit(self):
+        self.file.write(self.compressor.flush())
+        self.file.close()
+        self.store.commit(self.url, self.entry, self.tmp)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+def mirror_relpath(path: str, query: str = "") -> str:
+    """Mirror-relative file for a URL path and query (same mapping for recording and serving)."""
+    segments = [s for s in (path or "/").split("/") if s not in ("", ".", "..")]
+    if not segments or path.endswith("/"):
+        segments.append(MIRROR_INDEX)
+    if query:
+        segments[-1] += "@" + quote(urlencode(sorted(parse_qsl(query, keep_blank_values=True))), safe="")
+    return os.path.join(*segments)
+
+def mirror_path(root: str, url: str) -> str:
+    """<root>/<host>/<path> file a URL is recorded to."""
+    parts = urlsplit(url)
+    host = parts.netloc.replace(":", "_")
+    return os.path.join(root, host, mirror_relpath(parts.path, parts.query))
+
+class MirrorRecorder:
+    """Writes decoded response bodies into a browsable mirror directory.
+
+    Each body is stored under <root>/<host>/<path> next to a .meta.json
+    sidecar holding the URL, status and the headers scripts/mirror.py
+    replays (Content-Type, ETag, Last-Modified).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def store(self, url: str, headers: dict, body: bytes):
+        writer = self.open_writer(url, headers)
+        writer.write(body)
+        writer.commit()
+
+    def open_writer(self, url: str, headers: dict) -> "MirrorWriter":
+        return MirrorWriter(mirror_path(self.root, url), url, headers)
+
+class MirrorWriter:
+    """Streams one body into the mirror; the file only appears on commit()."""
+
+    def __init__(self, path: str, url: str, headers: dict):
+        self.path = path
+        self.meta = {
+            "url": url,
+            "status": 200,
+            "headers": {k: headers[k] for k in MIRROR_HEADERS if headers.get(k)},
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = open(self.tmp, "wb")
+
+    def write(self, data: bytes):
+        self.file.write(data)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp, self.path)
+        with open(self.path + MIRROR_META_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+class HostPool:
+    """Idle keep-alive connections to one host, with a cap on concurrent use."""
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], max_connections: int, timeout: float):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle: list[http.client.HTTPConnection] = []
+        self.lock = threading.Lock()
+
+    def new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Take a connection slot; returns (connection, reused)."""
+        self.slots.acquire()
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+        return self.new_connection(), False
+
+    def release(self, conn: Optional[http.client.HTTPConnection]):
+        if conn is not None:
+            with self.lock:
+                self.idle.append(conn)
+        self.slots.release()
+
+    def close(self):
+        with self.lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle.clear()
+
+def decode_body(body: bytes, encoding: str) -> bytes:
+    """Undo Content-Encoding (gzip or deflate, raw or zlib-wrapped)."""
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+def body_decoder(encoding: str):
+    """Incremental counterpart of decode_body (None for identity)."""
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    return None
+
+class StreamingBody:
+    """File-like view of a response body: read(n) returns decoded bytes."""
+
+    def __init__(self, resp: http.client.HTTPResponse, encoding: str,
+                 sinks: tuple = (), headers: Optional[dict] = None):
+        self.resp = resp
+        self.headers = headers or {}
+        self.decoder = body_decoder(encoding)
+        self.sinks = [sink for sink in sinks if sink is not None]
+        self.pending = b""
+        self.finished = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.finished and (size < 0 or len(self.pending) < size):
+            raw = self.resp.read(STREAM_CHUNK_SIZE)
+            if raw:
+                data = self.decoder.decompress(raw) if self.decoder else raw
+            else:
+                data = self.decoder.flush() if self.decoder else b""
+                self.finished = True
+            if data:
+                for sink in self.sinks:
+                    sink.write(data)
+            self.pending += data
+        if size < 0 or size >= len(self.pending):
+            data, self.pending = self.pending, b""
+        else:
+            data, self.pending = self.pending[:size], self.pending[size:]
+        if self.finished and self.sinks:
+            for sink in self.sinks:
+                sink.commit()
+            self.sinks = []
+        return data
+
+    def close(self):
+        for sink in self.sinks:
+            sink.abort()  # partially read: never store a truncated body
+        self.sinks = []
+
+class HTTPClient:
+    """Thread-safe keep-alive client shared by the fetchers."""
+
+    def __init__(self, user_agent: str = USER_AGENT, max_per_host: int = DEFAULT_MAX_PER_HOST,
+                 timeout: float = DEFAULT_TIMEOUT, cache_dir: str = DEFAULT_CACHE_DIR,
+                 retries: int = 3, record_dir: Optional[str] = DEFAULT_RECORD_DIR):
+        self.user_agent = user_agent
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.validators = ValidatorStore(cache_dir)
+        self.recorder = MirrorRecorder(record_dir) if record_dir else None
+        self.pools: dict[tuple, HostPool] = {}
+        self.lock = threading.Lock()
+
+    def pool_for(self, scheme: str, host: str, port: Optional[int]) -> HostPool:
+        key = (scheme, host, port)
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = HostPool(scheme, host, port, self.max_per_host, self.timeout)
+                self.pools[key] = pool
+            return pool
+
+    def _open(self, method: str, url: str, headers: dict):
+        """Send one request over a pooled connection; returns (pool, conn, response).
+
+        The caller owns the connection slot and must hand it back with pool.release().
+        """
+        parts = urlsplit(url)
+        pool = self.pool_for(parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        conn, reused = pool.acquire()
+        try:
+            try:
+                conn.request(method, path, headers=headers)
+                return pool, conn, conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # Server closed an idle keep-alive connection; reconnect once
+                conn.close()
+                conn = pool.new_connection()
+                conn.request(method, path, headers=headers)
+                return pool, conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            pool.release(None)
+            raise
+
+    def _send(self, method: str, url: str, headers: dict) -> tuple[int, dict, bytes]:
+        """Send one request and read it fully; returns (status, headers, raw body)."""
+        pool, conn, resp = self._open(method, url, headers)
+        try:
+            body = resp.read()
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            if resp.will_close:
+                conn.close()
+                conn = None
+            return resp.status, resp_headers, body
+        except Exception:
+            conn.close()
+            conn = None
+            raise
+        finally:
+            pool.release(conn)
+
+    def _prepare(self, method: str, url: str, params: Optional[dict], headers: Optional[dict],
+                 conditional: bool) -> tuple[str, dict, Optional[dict]]:
+        """Final URL, request headers and stored validators (if revalidating)."""
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+        req_headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
+        if headers:
+            req_headers.update(headers)
+
+        cached = self.validators.lookup(url) if conditional and method == "GET" else None
+        if cached:
+            if cached.get("etag"):
+                req_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last-modified"):
+                req_headers["If-Modified-Since"] = cached["last-modified"]
+        return url, req_headers, cached
+
+    def request(self, method: str, url: str, params: Optional[dict] = None,
+                headers: Optional[dict] = None, conditional: bool = False) -> Response:
+        """Issue a request with retries and exponential backoff on transient errors.
+
+        With conditional=True, stored validators are sent and a 304 is served
+        from the validator store as a 200 with from_cache=True.
+        """
+        url, req_headers, cached = self._prepare(method, url, params, headers, conditional)
+        for attempt in range(self.retries):
+            try:
+                status, resp_headers, raw = self._send(method, url, req_headers)
+            except (OSError, http.client.HTTPException):
+                if attempt < self.retries - 1:
+                    time.sleep(2 ** attempt)  # Exponential backoff
+                    continue
+                raise
+
+            if (status >= 500 or status == 429) and attempt < self.retries - 1:
+                time.sleep(2 ** attempt)
+                continue
+
+            if status == 304 and cached:
+                body = self.validators.load_body(url)
+                if self.recorder:
+                    self.recorder.store(url, {**cached, **resp_headers}, body)
+                return Response(url, 200, resp_headers, body, from_cache=True)
+
+            body = decode_body(raw, resp_headers.get("content-encoding"))
+            if status == 200 and method == "GET":
+                if conditional:
+                    self.validators.store(url, resp_headers, body)
+                if self.recorder:
+                    self.recorder.store(url, resp_headers, body)
+            return Response(url, status, resp_headers, body)
+
+        raise RuntimeError(f"Failed to fetch {url} after {self.retries} retries")
+
+    def get(self, url: str, params: Optional[dict] = None, **kwargs) -> Response:
+        return self.request("GET", url, params=params, **kwargs)
+
+    def head(self, url: str, **kwargs) -> Response:
+        return self.request("HEAD", url, **kwargs)
+
+    @contextmanager
+    def stream(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+               conditional: bool = False) -> Iterator[io.RawIOBase]:
+        """GET url and yield a file-like body that is decoded as it is read.
+
+        The body's .headers holds the (lower-cased) response headers. Only
+        the connection setup is retried. Error statuses raise HTTPError
+        before anything is yielded; a 304 yields the stored body. The body is
+        only written to the validator store once it has been read to the end.
+        """
+        url, req_headers, cached = self._prepare("GET", url, params, headers, conditional)
+        for attempt in range(self.retries):
+            try:
+                pool, conn, resp = self._open("GET", url, req_headers)
+            except (OSError, http.client.HTTPException):
+                if attempt < self.retries - 1:
+                    time.sleep(2 ** attempt)  # Exponential backoff
+                    continue
+                raise
+            if resp.status < 300 or resp.status == 304 or attempt == self.retries - 1 \
+                    or not (resp.status >= 500 or resp.status == 429):
+                break
+            resp.read()
+            pool.release(None if resp.will_close else conn)
+            time.sleep(2 ** attempt)
+
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        if resp.status != 200:
+            resp.read()
+            pool.release(None if resp.will_close else conn)
+            if resp.status == 304 and cached:
+                content = self.validators.load_body(url)
+                if self.recorder:
+                    self.recorder.store(url, {**cached, **resp_headers}, content)
+                body = io.BytesIO(content)
+                body.headers = resp_headers
+                yield body
+                return
+            raise HTTPError(url, resp.status, f"HTTP {resp.status}", None, None)
+
+        sinks = (
+            self.validators.open_writer(url, resp_headers) if conditional else None,
+            self.recorder.open_writer(url, resp_headers) if self.recorder else None,
+        )
+        body = StreamingBody(resp, resp_headers.get("content-encoding"), sinks, resp_headers)
+        try:
+            yield body
+        finally:
+            body.close()
+            complete = body.finished and not body.pending
+            if not complete or resp.will_close:
+                conn.close()  # unread bytes would corrupt the next keep-alive request
+                conn = None
+            pool.release(conn)
+
+    def close(self):
+        with self.lock:
+            for pool in self.pools.values():
+                pool.close()
+
+_default_client: Optional[HTTPClient] = None
+_default_lock = threading.Lock()
+
+def get_client() -> HTTPClient:
+    """Return the process-wide shared client."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
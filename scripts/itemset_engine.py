@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Itemset Engine
+Frequent 3- and 4-species sets from replay teams, for PartnerList@v1.
+
+A team has at most six species, so every 3- and 4-subset of every team
+(20 + 15 per full team) is enumerated directly with NumPy, instead of
+building an FP-tree. Each sorted subset of species IDs is packed into one
+int64 key. Batches of keys are merged into running (key, count) arrays
+with np.unique, all in the same single pass over the teams as the pair
+counts.
+
+For a published pair (A, B):
+
+    top_third_partners   C ranked by teams with {A, B, C};
+                         pct = n(A, B, C) / n(A, B)
+    top_fourth_partners  D ranked by teams with {A, B, C*, D}, where C* is
+                         the pair's top third partner;
+                         pct = n(A, B, C*, D) / n(A, B, C*)
+
+Ties are broken by slug, so the lists do not depend on species ID order.
+Each entry's "ci" is the 95% Wilson interval of pct (confidence.py).
+
+Usage:
+    engine = ItemsetEngine()
+    engine.add_teams([["incineroar", "rillaboom", "flutter-mane", ...], ...])
+    partners = engine.partner_lists([("incineroar", "rillaboom")], pair_counts)
+"""
+
+from itertools import combinations
+from typing import Iterable, Optional
+
+import numpy as np
+
+from confidence import bounds, proportion_interval
+from species import SpeciesRegistry
+
+# Species IDs are packed KEY_BITS apiece into one int64 key (4 x 12 bits)
+KEY_BITS = 12
+KEY_BASE = 1 << KEY_BITS
+ITEMSET_SIZES = (3, 4)
+
+# Partners kept per pair, and the fewest teams a partner must appear on
+PARTNER_LIMIT = 10
+MIN_PARTNER_COUNT = 3
+
+def pack(ids: np.ndarray) -> np.ndarray:
+    """(n, k) ascending species IDs -> (n,) int64 keys."""
+    keys = np.zeros(len(ids), dtype=np.int64)
+    for col in range(ids.shape[1]):
+        keys = keys * KEY_BASE + ids[:, col]
+    return keys
+
+def unpack(keys: np.ndarray, size: int) -> np.ndarray:
+    """Inverse of pack: (n,) keys -> (n, size) species IDs."""
+    ids = np.empty((len(keys), size), dtype=np.int64)
+    for col in range(size - 1, -1, -1):
+        ids[:, col] = keys % KEY_BASE
+        keys = keys // KEY_BASE
+    return ids
+
+def merge_counts(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray,
+                 new_counts: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted unique keys with summed counts."""
+    if new_counts is None:
+        new_counts = np.ones(len(new_keys), dtype=np.int64)
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([counts, new_counts]),
+                               minlength=len(merged)).astype(np.int64)
+
+class ItemsetEngine:
+    """Running counts of every 3- and 4-species subset of the teams seen."""
+
+    def __init__(self, registry: Optional[SpeciesRegistry] = None):
+        self.registry = registry if registry is not None else SpeciesRegistry()
+        self.keys = {size: np.zeros(0, dtype=np.int64) for size in ITEMSET_SIZES}
+        self.counts = {size: np.zeros(0, dtype=np.int64) for size in ITEMSET_SIZES}
+
+    def add_teams(self, teams: Iterable[Iterable[str]]):
+        """Fold a batch of teams (slug lists) in."""
+        by_length: dict[int, list[list[int]]] = {}
+        intern = self.registry.intern
+        for team in teams:
+            ids = sorted({intern(slug) for slug in team or ()})
+            if len(ids) >= ITEMSET_SIZES[0]:
+                by_length.setdefault(len(ids), []).append(ids)
+        if len(self.registry) > KEY_BASE:
+            raise ValueError(f"More than {KEY_BASE} species; raise KEY_BITS")
+
+        for size in ITEMSET_SIZES:
+            batch = []
+            for length, rows in by_length.items():
+                if length < size:
+                    continue
+                subsets = np.array(list(combinations(range(length), size)))
+                ids = np.array(rows, dtype=np.int64)[:, subsets]  # (teams, subsets, size)
+                batch.append(pack(ids.reshape(-1, size)))
+            if batch:
+                new_keys, new_counts = np.unique(np.concatenate(batch), return_counts=True)
+                self.keys[size], self.counts[size] = merge_counts(
+                    self.keys[size], self.counts[size], new_keys, new_counts)
+
+    def _extensions(self, size: int, bases: np.ndarray, min_count: int):
+        """Every (base row, extra species, count) where base + extra is a counted itemset.
+
+        bases are (n, size - 1) ascending ID rows.
+        """
+        ids = unpack(self.keys[size], size)
+        keep = self.counts[size] >= min_count
+        ids, counts = ids[keep], self.counts[size][keep]
+        base_keys = pack(bases)
+        order = np.argsort(base_keys)
+        sorted_bases = base_keys[order]
+
+        out_base, out_extra, out_count = [], [], []
+        for drop in range(size):
+            sub = pack(np.delete(ids, drop, axis=1))
+            pos = np.searchsorted(sorted_bases, sub)
+            pos = np.minimum(pos, len(sorted_bases) - 1)
+            hit = sorted_bases[pos] == sub
+            out_base.append(order[pos[hit]])
+            out_extra.append(ids[hit, drop])
+            out_count.append(counts[hit])
+        return np.concatenate(out_base), np.concatenate(out_extra), np.concatenate(out_count)
+
+    def _top(self, base_index: np.ndarray, extra: np.ndarray, counts: np.ndarray,
+             totals: np.ndarray, n_bases: int, limit: int) -> list[list[dict]]:
+        """Top-limit PartnerList rows per base, by count then slug."""
+        slugs = self.registry.slugs
+        slug_rank = np.empty(len(slugs), dtype=np.int64)
+        slug_rank[np.argsort(np.array(slugs, dtype=object))] = np.arange(len(slugs))
+        order = np.lexsort((slug_rank[extra], -counts, base_index))
+        base_index, extra, counts = base_index[order], extra[order], counts[order]
+        ci = bounds(*proportion_interval(counts, totals[base_index]), scale=100)
+        totals = totals.tolist()
+        lists: list[list[dict]] = [[] for _ in range(n_bases)]
+        for b, e, n, interval in zip(base_index.tolist(), extra.tolist(), counts.tolist(), ci):
+            items = lists[b]
+            if len(items) < limit:
+                pct = n / totals[b] * 100 if totals[b] else 0
+                items.append({"pokemon": slugs[e], "pct": round(pct, 2), "n": n, "rank": len(items) + 1,
+                              "ci": interval})
+        return lists
+
+    def partner_lists(self, pairs: list[tuple[str, str]], pair_counts: list[int],
+                      limit: int = PARTNER_LIMIT, min_count: int = MIN_PARTNER_COUNT) -> list[tuple[list, list]]:
+        """(top_third_partners, top_fourth_partners) data lists for each (slug_a, slug_b) pair.
+
+        pair_counts[i] is the number of teams with pairs[i] (the third-partner denominator).
+        """
+        if not pairs:
+            return []
+        ids = np.sort(np.array([[self.registry.intern(a), self.registry.intern(b)] for a, b in pairs],
+                               dtype=np.int64), axis=1)
+        totals = np.asarray(pair_counts, dtype=np.int64)
+        thirds = [[] for _ in pairs]
+        if len(self.keys[3]):
+            thirds = self._top(*self._extensions(3, ids, min_count), totals, len(pairs), limit)
+
+        # Fourth partners extend each pair's top third partner
+        with_third = [i for i, items in enumerate(thirds) if items]
+        fourths = [[] for _ in pairs]
+        if with_third and len(self.keys[4]):
+            cores = np.sort(np.column_stack([
+                ids[with_third],
+                [self.registry.get(thirds[i][0]["pokemon"]) for i in with_third],
+            ]), axis=1)
+            core_totals = np.array([thirds[i][0]["n"] for i in with_third], dtype=np.int64)
+            # Two pairs can share a core ({A, B} + C and {A, C} + B)
+            core_keys, first, inverse = np.unique(pack(cores), return_index=True, return_inverse=True)
+            lists = self._top(*self._extensions(4, cores[first], min_count),
+                              core_totals[first], len(core_keys), limit)
+            for i, core in zip(with_third, inverse.tolist()):
+                fourths[i] = [dict(item) for item in lists[core]]
+        return list(zip(thirds, fourths))
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Offline Mirror
+Local stand-in for replay.pokemonshowdown.com and smogon.com/stats.
+
+Record: run any fetcher with VGC_HTTP_RECORD set and every successful GET
+is written to <dir>/<host>/<path> (see http_client.MirrorRecorder).
+
+Serve: this script serves a mirror back over HTTP/1.1 keep-alive with the
+upstream URL layout, so the fetchers only need their base URLs swapped:
+
+    /search.json?format=...&before=...     Showdown replay search pages
+    /<replay-id>.json                      Showdown replay detail
+    /stats/<month>/chaos/<format>-<cutoff>.json
+    /stats/<month>/<format>-<cutoff>.txt   Smogon stats files
+
+Requests are looked up in every recorded host directory. Conditional GETs
+(If-None-Match / If-Modified-Since) get 304s, HEAD works, and unknown paths
+are 404. Latency and failures can be injected; failure decisions hash the
+seed, path and per-path attempt number, so a run sees the same failures no
+matter how its requests interleave across threads.
+
+Usage:
+    VGC_HTTP_RECORD=.cache/mirror python scripts/fetch_replays.py --format reg-f --limit 200
+    python scripts/mirror.py serve --dir .cache/mirror --port 8765 --latency 80 --error-rate 0.05
+    SHOWDOWN_REPLAY_BASE=http://127.0.0.1:8765 SMOGON_STATS_BASE=http://127.0.0.1:8765/stats \\
+        python scripts/fetch_replays.py --format reg-f --limit 200
+    python scripts/mirror.py ls --dir .cache/mirror
+"""
+
+import argparse
+import email.utils
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlsplit
+
+from http_client import MIRROR_META_SUFFIX, mirror_relpath
+
+DEFAULT_MIRROR_DIR = os.environ.get(
+    "VGC_HTTP_RECORD",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "mirror"),
+)
+DEFAULT_PORT = 8765
+SEND_CHUNK_SIZE = 1 << 16
+
+class MirrorServer(ThreadingHTTPServer):
+    """HTTP server over a mirror directory with injected latency and failures."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, root: str, hosts: Optional[list[str]] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, reset_rate: float = 0.0, seed: int = 0,
+                 compress: bool = False, verbose: bool = False):
+        super().__init__(address, MirrorHandler)
+        self.root = root
+        if not hosts and os.path.isdir(root):
+            hosts = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        self.hosts = hosts or []
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reset_rate = reset_rate
+        self.seed = seed
+        self.compress = compress
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.attempts: dict[str, int] = {}
+        self.stats = {"requests": 0, "ok": 0, "not_modified": 0, "not_found": 0, "errors": 0, "resets": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def resolve(self, path: str, query: str) -> Optional[str]:
+        """Mirror file for a request path, searching each host directory in order."""
+        rel = mirror_relpath(path, query)
+        for host in self.hosts:
+            candidate = os.path.join(self.root, host, rel)
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def roll(self, key: str) -> tuple[float, float]:
+        """(failure draw, latency draw) in [0, 1) for the next attempt at key."""
+        with self.lock:
+            attempt = self.attempts.get(key, 0)
+            self.attempts[key] = attempt + 1
+        digest = hashlib.sha256(f"{self.seed}:{key}:{attempt}".encode("utf-8")).digest()
+        return (int.from_bytes(digest[:8], "big") / 2 ** 64,
+                int.from_bytes(digest[8:16], "big") / 2 ** 64)
+
+    def count(self, outcome: str):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats[outcome] += 1
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MirrorServer
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def handle_request(self, send_body: bool):
+        server = self.server
+        parts = urlsplit(self.path)
+        failure, delay = server.roll(f"{self.command} {self.path}")
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + server.jitter * (2 * delay - 1)))
+
+        if failure < server.reset_rate:
+            server.count("resets")
+            self.close_connection = True  # Dropped without a response
+            return
+        if failure < server.reset_rate + server.error_rate:
+            server.count("errors")
+            self.send_empty(server.error_status)
+            return
+
+        path = server.resolve(parts.path, parts.query)
+        if path is None:
+            server.count("not_found")
+            self.send_empty(404)
+            return
+
+        headers = self.stored_headers(path)
+        if self.not_modified(headers):
+            server.count("not_modified")
+            self.send_response(304)
+            for name in ("etag", "last-modified"):
+                self.send_header(name, headers[name])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+        if server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, 5)
+            headers["content-encoding"] = "gzip"
+        server.count("ok")
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            for start in range(0, len(body), SEND_CHUNK_SIZE):
+                self.wfile.write(body[start:start + SEND_CHUNK_SIZE])
+
+    def stored_headers(self, path: str) -> dict:
+        """Recorded Content-Type/ETag/Last-Modified, synthesized from the file if absent."""
+        headers = {}
+        try:
+            with open(path + MIRROR_META_SUFFIX, "r", encoding="utf-8") as f:
+                headers = dict(json.load(f).get("headers", {}))
+        except (OSError, json.JSONDecodeError):
+            pass
+        st = os.stat(path)
+        headers.setdefault("content-type", "application/json" if path.endswith(".json") else "text/plain")
+        headers.setdefault("etag", f'"{st.st_size:x}-{int(st.st_mtime):x}"')
+        headers.setdefault("last-modified", email.utils.formatdate(st.st_mtime, usegmt=True))
+        return headers
+
+    def not_modified(self, headers: dict) -> bool:
+        etag = self.headers.get("If-None-Match")
+        if etag:
+            return etag == headers["etag"]
+        since = self.headers.get("If-Modified-Since")
+        return bool(since) and since == headers["last-modified"]
+
+    def send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def serve_in_thread(root: str, port: int = 0, **options) -> MirrorServer:
+    """Start a MirrorServer on a background thread (port 0 picks a free port)."""
+    server = MirrorServer(("127.0.0.1", port), root, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def list_mirror(root: str):
+    total = 0
+    for dirpath, _, filenames in sorted(os.walk(root)):
+        for name in sorted(filenames):
+            if not name.endswith(MIRROR_META_SUFFIX):
+                continue
+            path = os.path.join(dirpath, name[:-len(MIRROR_META_SUFFIX)])
+            if not os.path.exists(path):
+                continue
+            with open(os.path.join(dirpath, name), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            size = os.path.getsize(path)
+            total += size
+            print(f"  {size:>12,} {meta.get('url', path)}")
+    print(f"Total: {total / 1024 / 1024:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/serve an offline Showdown and Smogon mirror")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Serve a mirror directory over HTTP")
+    serve.add_argument("--dir", default=DEFAULT_MIRROR_DIR, help="Mirror directory (default: VGC_HTTP_RECORD)")
+    serve.add_argument("--bind", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--host", action="append", dest="hosts",
+                       help="Only serve this recorded host (repeatable; default: all)")
+    serve.add_argument("--latency", type=float, default=0.0, help="Added latency per request (ms)")
+    serve.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- latency jitter (ms)")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    serve.add_argument("--error-status", type=int, default=503)
+    serve.add_argument("--reset-rate", type=float, default=0.0, help="Fraction of requests dropped without a response")
+    serve.add_argument("--seed", type=int, default=0, help="Seed for injected failures and jitter")
+    serve.add_argument("--gzip", action="store_true", help="gzip bodies for clients that accept it")
+    serve.add_argument("--verbose", action="store_true", help="Log every request")
+
+    ls = sub.add_parser("ls", help="List recorded files")
+    ls.add_argument("--dir", default=DEFAULT_MIRROR_DIR)
+    args = parser.parse_args()
+
+    if args.command == "ls":
+        list_mirror(args.dir)
+        return
+
+    server = MirrorServer((args.bind, args.port), args.dir, hosts=args.hosts,
+                          latency_ms=args.latency, jitter_ms=args.jitter,
+                          error_rate=args.error_rate, error_status=args.error_status,
+                          reset_rate=args.reset_rate, seed=args.seed,
+                          compress=args.gzip, verbose=args.verbose)
+    print(f"Serving {args.dir} ({', '.join(server.hosts) or 'no hosts recorded'}) at {server.base_url}")
+    print(f"  SHOWDOWN_REPLAY_BASE={server.base_url} SMOGON_STATS_BASE={server.base_url}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {json.dumps(server.stats)}")
+
+if __name__ == "__main__":
+    main()
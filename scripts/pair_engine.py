@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Pair Engine
+Exact pair synergy from replays via a sparse co-occurrence product.
+
+Every side of every qualifying replay is one team (one row of a sparse
+team x species incidence matrix X, species de-duplicated). Teams are read
+once through a server-side cursor and folded in batch by batch:
+
+    C = X^T X           C[A, B] = teams with both A and B, C[A, A] = teams with A
+
+so identical teams from different replays stay separate rows, and
+
+    pair_rate = C[A, B] / teams * 100      (pair_team_rate, percent of teams)
+
+uses the real team denominator. Every pair seen on at least
+MIN_PAIR_COUNT teams is returned, not only the most common ones.
+
+Usage:
+    engine = PairEngine()
+    engine.load(conn, "reg-f", min_rating=1760)
+    pairs = engine.pair_rows()   # [(slug_a, slug_b, pair_rate, pair_sample_size), ...]
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+from scipy import sparse
+
+from species import SpeciesRegistry
+
+# Battles fetched per round trip from the server-side cursor
+DEFAULT_FETCH_SIZE = 20000
+
+# Pairs on fewer teams than this are noise (same floor as the old SQL)
+MIN_PAIR_COUNT = 3
+
+class PairEngine:
+    """Accumulates X^T X over replay teams."""
+
+    def __init__(self, registry: Optional[SpeciesRegistry] = None):
+        self.registry = registry if registry is not None else SpeciesRegistry()
+        self.cooccur = np.zeros((0, 0), dtype=np.int64)
+        self.teams = 0
+
+    def add_teams(self, teams: Iterable[Iterable[str]]):
+        """Fold a batch of teams (slug lists) in; empty teams are not counted."""
+        rows, cols = [], []
+        intern = self.registry.intern
+        n_teams = 0
+        for team in teams:
+            ids = {intern(slug) for slug in team or ()}
+            if not ids:
+                continue
+            rows.extend([n_teams] * len(ids))
+            cols.extend(ids)
+            n_teams += 1
+        if not n_teams:
+            return
+
+        n = len(self.registry)
+        x = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(n_teams, n))
+        product = (x.T @ x).tocoo()
+        if n > len(self.cooccur):
+            size = len(self.cooccur)
+            self.cooccur = np.pad(self.cooccur, ((0, n - size), (0, n - size)))
+        np.add.at(self.cooccur, (product.row, product.col), product.data)
+        self.teams += n_teams
+
+    def load(self, conn, format_id: str, min_rating: int, fetch_size: int = DEFAULT_FETCH_SIZE) -> int:
+        """Stream both teams of every qualifying replay; returns the number of teams."""
+        cursor = conn.cursor(name="pair_engine_replays")
+        cursor.itersize = fetch_size
+        cursor.execute("""
+            SELECT p1_team, p2_team
+            FROM replays
+            WHERE format_id = %s AND rating_estimate >= %s
+        """, (format_id, min_rating))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            self.add_teams(team for row in rows for team in row)
+        cursor.close()
+        return self.teams
+
+    def pair_rows(self, min_count: int = MIN_PAIR_COUNT) -> list[tuple]:
+        """(slug_a, slug_b, pair_rate %, pair_sample_size), most common first."""
+        if not self.teams:
+            return []
+        a, b = np.triu_indices(len(self.cooccur), 1)
+        counts = self.cooccur[a, b]
+        keep = counts >= min_count
+        a, b, counts = a[keep], b[keep], counts[keep]
+        order = np.argsort(-counts, kind="stable")
+        slugs = self.registry.slugs
+        return [
+            (slugs[i], slugs[j], round(n / self.teams * 100, 2), n)
+            for i, j, n in zip(a[order].tolist(), b[order].tolist(), counts[order].tolist())
+        ]
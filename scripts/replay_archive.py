@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Replay Archive
+Local content-addressed archive of raw Showdown replay JSON, so replays can
+be reparsed (new parser fixes, tags, cores) without crawling Showdown again.
+
+Layout (root defaults to .cache/replay-archive, override with VGC_REPLAY_ARCHIVE):
+    <root>/<format>/dict-<id>.zdict          zstd dictionaries trained on logs
+    <root>/<format>/<YYYY-MM>/<sha256>.zst   one compressed replay per file
+
+Blobs are named by the SHA-256 of the raw JSON, so re-archiving a replay is
+a no-op. Each zstd frame records the dictionary it was compressed with.
+When the archive grows past its size cap, whole months are evicted
+oldest first.
+
+Usage:
+    python replay_archive.py train --format gen9vgc2026regf
+    python replay_archive.py stats
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = os.environ.get(
+    "VGC_REPLAY_ARCHIVE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "replay-archive"),
+)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+COMPRESSION_LEVEL = 10
+
+# Dictionary training: train once a format has this many blobs
+TRAIN_MIN_SAMPLES = 500
+TRAIN_MAX_SAMPLES = 5000
+DICT_SIZE = 112 * 1024
+
+UNKNOWN_MONTH = "unknown"
+
+def month_of(upload_time) -> str:
+    """Shard month (YYYY-MM, UTC) for a replay's uploadtime."""
+    try:
+        return datetime.fromtimestamp(int(upload_time), timezone.utc).strftime("%Y-%m")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return UNKNOWN_MONTH
+
+class ReplayArchive:
+    """Sharded, size-capped zstd archive of raw replay JSON."""
+
+    def __init__(self, root: str = DEFAULT_ARCHIVE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        if zstandard is None:
+            raise RuntimeError("zstandard not installed. Run: pip install zstandard")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.dicts: dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self.current_dict: dict[str, Optional[int]] = {}
+        self.local = threading.local()
+
+    # ---- dictionaries ----
+
+    def format_dir(self, format_name: str) -> str:
+        return os.path.join(self.root, format_name)
+
+    def load_dict(self, format_name: str, dict_id: int) -> "zstandard.ZstdCompressionDict":
+        with self.lock:
+            if dict_id not in self.dicts:
+                path = os.path.join(self.format_dir(format_name), f"dict-{dict_id}.zdict")
+                with open(path, "rb") as f:
+                    self.dicts[dict_id] = zstandard.ZstdCompressionDict(f.read())
+            return self.dicts[dict_id]
+
+    def latest_dict_id(self, format_name: str) -> Optional[int]:
+        """Newest trained dictionary for a format (by file mtime), or None."""
+        with self.lock:
+            if format_name in self.current_dict:
+                return self.current_dict[format_name]
+        fdir = self.format_dir(format_name)
+        dict_files = []
+        if os.path.isdir(fdir):
+            dict_files = [e for e in os.scandir(fdir) if e.name.startswith("dict-") and e.name.endswith(".zdict")]
+        dict_id = None
+        if dict_files:
+            newest = max(dict_files, key=lambda e: e.stat().st_mtime)
+            dict_id = int(newest.name[len("dict-"):-len(".zdict")])
+        with self.lock:
+            self.current_dict[format_name] = dict_id
+        return dict_id
+
+    def compressor(self, format_name: str) -> "zstandard.ZstdCompressor":
+        # zstd (de)compressors are not thread-safe: keep one per thread and dictionary
+        dict_id = self.latest_dict_id(format_name)
+        cache = self.local.__dict__.setdefault("compressors", {})
+        if dict_id not in cache:
+            dict_data = self.load_dict(format_name, dict_id) if dict_id else None
+            cache[dict_id] = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dict_data,
+                                                      write_content_size=True)
+        return cache[dict_id]
+
+    def decompressor(self, format_name: str, dict_id: int) -> "zstandard.ZstdDecompressor":
+        cache = self.local.__dict__.setdefault("decompressors", {})
+        if dict_id not in cache:
+            dict_data = self.load_dict(format_name, dict_id) if dict_id else None
+            cache[dict_id] = zstandard.ZstdDecompressor(dict_data=dict_data)
+        return cache[dict_id]
+
+    def train_dictionary(self, format_name: str, max_samples: int = TRAIN_MAX_SAMPLES,
+                         dict_size: int = DICT_SIZE) -> int:
+        """Train a zstd dictionary on archived replays of a format; returns its id."""
+        paths = list(self.iter_blob_paths(format_name))
+        if not paths:
+            raise RuntimeError(f"No archived replays for {format_name}")
+        sample_paths = random.Random(0).sample(paths, min(max_samples, len(paths)))
+        samples = [self.read_blob(format_name, p) for p in sample_paths]
+        trained = zstandard.train_dictionary(dict_size, samples)
+        dict_id = trained.dict_id()
+
+        fdir = self.format_dir(format_name)
+        os.makedirs(fdir, exist_ok=True)
+        with open(os.path.join(fdir, f"dict-{dict_id}.zdict"), "wb") as f:
+            f.write(trained.as_bytes())
+        with self.lock:
+            self.dicts[dict_id] = trained
+            self.current_dict[format_name] = dict_id
+        print(f"Trained dictionary {dict_id} for {format_name} on {len(samples)} replays")
+        return dict_id
+
+    def maybe_train(self, format_name: str) -> Optional[int]:
+        """Train the first dictionary once a format has enough samples."""
+        if self.latest_dict_id(format_name) is not None:
+            return None
+        if sum(1 for _ in self.iter_blob_paths(format_name)) < TRAIN_MIN_SAMPLES:
+            return None
+        return self.train_dictionary(format_name)
+
+    # ---- blobs ----
+
+    def put(self, format_name: str, content, upload_time=None) -> str:
+        """Archive raw replay JSON (str or bytes); returns the blob path."""
+        raw = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(raw).hexdigest()
+        path = os.path.join(self.format_dir(format_name), month_of(upload_time), f"{digest}.zst")
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.compressor(format_name).compress(raw))
+        os.replace(tmp, path)
+        return path
+
+    def read_blob(self, format_name: str, path: str) -> bytes:
+        with open(path, "rb") as f:
+            frame = f.read()
+        dict_id = zstandard.get_frame_parameters(frame).dict_id
+        return self.decompressor(format_name, dict_id).decompress(frame)
+
+    def months(self, format_name: str) -> list[str]:
+        fdir = self.format_dir(format_name)
+        if not os.path.isdir(fdir):
+            return []
+        return sorted(e.name for e in os.scandir(fdir) if e.is_dir())
+
+    def iter_blob_paths(self, format_name: str, months: Optional[list[str]] = None) -> Iterator[str]:
+        for month in months or self.months(format_name):
+            mdir = os.path.join(self.format_dir(format_name), month)
+            if not os.path.isdir(mdir):
+                continue
+            for entry in sorted(os.scandir(mdir), key=lambda e: e.name):
+                if entry.name.endswith(".zst"):
+                    yield entry.path
+
+    def iter_raw(self, format_name: str, months: Optional[list[str]] = None) -> Iterator[bytes]:
+        """Yield decompressed replay JSON for a format, oldest month first."""
+        for path in self.iter_blob_paths(format_name, months):
+            yield self.read_blob(format_name, path)
+
+    # ---- size cap ----
+
+    def shard_sizes(self) -> list[tuple[str, str, int]]:
+        """(month, format, bytes) for every shard."""
+        shards = []
+        if not os.path.isdir(self.root):
+            return shards
+        for fentry in os.scandir(self.root):
+            if not fentry.is_dir():
+                continue
+            for month in self.months(fentry.name):
+                mdir = os.path.join(fentry.path, month)
+                size = sum(e.stat().st_size for e in os.scandir(mdir) if e.is_file())
+                shards.append((month, fentry.name, size))
+        return shards
+
+    def enforce_cap(self) -> int:
+        """Evict whole month shards, oldest first, until under max_bytes."""
+        shards = self.shard_sizes()
+        total = sum(size for _, _, size in shards)
+        evicted = 0
+        # "unknown" sorts after digits, so undated shards are evicted last
+        for month, format_name, size in sorted(shards):
+            if total <= self.max_bytes:
+                break
+            mdir = os.path.join(self.format_dir(format_name), month)
+            for entry in os.scandir(mdir):
+                os.remove(entry.path)
+            os.rmdir(mdir)
+            total -= size
+            evicted += 1
+            print(f"Evicted archive shard {format_name}/{month} ({size / 1024 ** 2:.1f} MB)")
+        return evicted
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local replay archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Train a zstd dictionary for a format")
+    train.add_argument("--format", required=True, help="Showdown format name (e.g., gen9vgc2026regf)")
+    sub.add_parser("stats", help="Show archive size per shard")
+    args = parser.parse_args()
+
+    archive = ReplayArchive()
+    if args.command == "train":
+        archive.train_dictionary(args.format)
+    elif args.command == "stats":
+        total = 0
+        for month, format_name, size in sorted(archive.shard_sizes()):
+            print(f"  {format_name}/{month}: {size / 1024 ** 2:.1f} MB")
+            total += size
+        print(f"Total: {total / 1024 ** 2:.1f} MB (cap {archive.max_bytes / 1024 ** 2:.0f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Streaming Replay Writer
+Writes replay records to the replays table in fixed-size batches on a
+background thread while the crawl keeps fetching.
+
+Each batch goes through bulk_writer.bulk_upsert (COPY into a staging
+table, one INSERT ... SELECT ... ON CONFLICT) and is then committed, so a
+crash loses at most the batches still in the queue. Only
+batch_size * (queue_size + 2) records are ever held in memory.
+
+Usage:
+    with ReplayWriter(get_db_connection(), "reg-f") as writer:
+        for record in records:
+            writer.write(record)
+"""
+
+import json
+import queue
+import threading
+from typing import Optional
+
+from bulk_writer import bulk_upsert
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_QUEUE_SIZE = 4
+
+REPLAY_COLUMNS = (
+    "replay_id", "format_id", "rating_estimate", "rating_source", "played_at",
+    "p1_team", "p2_team", "winner_side", "tags", "featured_cores",
+)
+
+# Columns refreshed when a replay is written again
+REPLAY_UPDATE_COLUMNS = ("rating_estimate", "rating_source", "tags", "featured_cores")
+
+def replay_row(format_id: str, r: dict) -> tuple:
+    """Replay record -> replays row (JSONB columns serialized)."""
+    return (
+        r["replay_id"],
+        format_id,
+        r.get("rating"),
+        r.get("rating_source"),
+        r.get("played_at"),
+        json.dumps(r["p1_team"]),
+        json.dumps(r["p2_team"]),
+        r.get("winner_side"),
+        json.dumps(r.get("tags", [])),
+        json.dumps(r.get("featured_cores", [])),
+    )
+
+class ReplayWriter:
+    """Background batch writer for the replays table."""
+
+    def __init__(self, conn, format_id: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.conn = conn
+        self.format_id = format_id
+        self.batch_size = batch_size
+        self.batch: list[tuple] = []
+        self.batches: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.error: Optional[BaseException] = None
+        self.written = 0
+        self.thread = threading.Thread(target=self._run, name="replay-writer", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record: dict):
+        """Queue one record; blocks when the writer falls queue_size batches behind."""
+        self._check()
+        self.batch.append(replay_row(self.format_id, record))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.batches.put(self.batch)
+            self.batch = []
+
+    def close(self):
+        """Flush the last partial batch and wait for the writer thread."""
+        if self.error is None:
+            self.flush()
+        self.batches.put(None)
+        self.thread.join()
+        self._check()
+        print(f"Upserted {self.written} replays")
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError("Replay writer failed") from self.error
+
+    def _run(self):
+        while True:
+            rows = self.batches.get()
+            if rows is None:
+                return
+            if self.error is not None:
+                continue  # drain so producers never block on a dead writer
+            try:
+                self.merge_batch(self.conn, rows)
+                self.conn.commit()
+                self.written += len(rows)
+            except BaseException as e:
+                self.conn.rollback()
+                self.error = e
+
+    @staticmethod
+    def merge_batch(conn, rows: list[tuple]):
+        bulk_upsert(conn, "replays", REPLAY_COLUMNS, rows,
+                    conflict=("replay_id",), update=REPLAY_UPDATE_COLUMNS)
@@ -21,7 +21,7 @@ if [ "$1" == "--install" ]; then
 fi
 
 echo ""
-echo "📊 Step 1: Fetch Smogon Stats (Python)"
+echo "📊 Step 1: Fetch Smogon Stats + Teammate Pairs (Python)"
 python3 scripts/fetch_smogon_stats.py --format reg-f --cutoff 1760
 
 echo ""
@@ -33,11 +33,7 @@ echo "📈 Step 3: Import/Process Stats (TypeScript)"
 npx tsx scripts/import-showdown-stats.ts
 
 echo ""
-echo "🔗 Step 4: Calculate Pair Synergy"
-npx tsx scripts/calculate-pair-synergy.ts
-
-echo ""
-echo "🛡️ Step 5: Calculate Counters"
+echo "🛡️ Step 4: Calculate Counters"
 npx tsx scripts/calculate-counters.ts
 
 echo ""
@@ -45,11 +45,7 @@ echo "🎬 Step 4: Fetching replays (limited to 100 for quick setup)..."
 python3 scripts/fetch_replays.py --format reg-f --min-rating 1700 --limit 100
 
 echo ""
-echo "🔗 Step 5: Calculating pair synergy..."
-npx tsx scripts/calculate-pair-synergy.ts
-
-echo ""
-echo "🛡️ Step 6: Calculating counters..."
+echo "🛡️ Step 5: Calculating counters..."
 npx tsx scripts/calculate-counters.ts
 
 echo ""
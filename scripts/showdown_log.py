@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Showdown Log Parser
+Single-pass parser for Showdown replay JSON and battle logs.
+
+The header of a log (|player|, |poke| team preview) is walked line by line
+and the walk stops at |start|; the winner is then located with one forward
+search for |win| from that point. Long logs are therefore never split into
+a list of lines, and the turn-by-turn body is only touched by str.find.
+
+Usage:
+    from showdown_log import parse_replay
+
+    parsed = parse_replay(replay_data)
+    parsed["teams"][1], parsed["winner_side"], parsed["rating"]
+"""
+
+from typing import Optional
+
+def new_parsed_log() -> dict:
+    """Empty parsed-log record."""
+    return {
+        "players": {},          # side -> player name
+        "player_lines": [],     # (side, raw |player| line) in log order
+        "player_ratings": {},   # side -> rating shown on the |player| line
+        "teams": {1: [], 2: []},  # side -> species names from team preview
+        "winner_name": None,
+        "winner_side": None,
+    }
+
+def parse_log(log: str) -> dict:
+    """Walk a battle log once and return players, team preview and winner."""
+    parsed = new_parsed_log()
+    pos = 0
+    end = len(log)
+
+    while pos < end:
+        nl = log.find("\n", pos)
+        if nl == -1:
+            nl = end
+        line = log[pos:nl]
+        pos = nl + 1
+
+        if line.startswith("|poke|p"):
+            # Format: |poke|p1|Pokemon, F|item
+            parts = line.split("|")
+            if len(parts) >= 4 and parts[2] in ("p1", "p2"):
+                parsed["teams"][int(parts[2][1])].append(parts[3].split(",")[0].strip())
+        elif line.startswith("|player|p"):
+            # Format: |player|p1|name|avatar|rating
+            parts = line.split("|")
+            if len(parts) >= 4 and parts[2] in ("p1", "p2"):
+                side = int(parts[2][1])
+                parsed["player_lines"].append((side, line))
+                if parts[3]:
+                    parsed["players"].setdefault(side, parts[3])
+                if len(parts) > 5 and parts[5].isdigit():
+                    parsed["player_ratings"].setdefault(side, int(parts[5]))
+        elif line.startswith("|start"):
+            # Team preview and player info are complete
+            break
+        elif line.startswith("|win|"):
+            pos -= len(line) + 1
+            break
+
+    # Winner: first |win| line after the header
+    win_at = log.find("|win|", pos) if log.startswith("|win|", pos) else log.find("\n|win|", pos)
+    if win_at != -1:
+        if log[win_at] == "\n":
+            win_at += 1
+        win_end = log.find("\n", win_at)
+        win_line = log[win_at:win_end if win_end != -1 else end]
+        parsed["winner_name"] = win_line.split("|")[2]
+        parsed["winner_side"] = resolve_winner(log, parsed)
+
+    return parsed
+
+def resolve_winner(log: str, parsed: dict) -> Optional[int]:
+    """Match the winner against |player| lines in log order (substring match)."""
+    winner_name = parsed["winner_name"]
+    for side, line in parsed["player_lines"]:
+        if winner_name in line:
+            return side
+    # Player lines that only appear after the header (rare): full scan
+    for line in log.split("\n"):
+        if line.startswith("|player|p1|") and winner_name in line:
+            return 1
+        if line.startswith("|player|p2|") and winner_name in line:
+            return 2
+    return None
+
+def estimate_rating(replay_data: dict) -> tuple[Optional[int], str]:
+    """Estimate rating from replay data."""
+    # Try official rating first
+    rating = replay_data.get("rating")
+    if rating and isinstance(rating, (int, float)) and rating > 1000:
+        return int(rating), "official"
+
+    # Try to extract from player info
+    p1_rating = replay_data.get("p1rating", {}).get("elo")
+    p2_rating = replay_data.get("p2rating", {}).get("elo")
+
+    if p1_rating and p2_rating:
+        avg_rating = (p1_rating + p2_rating) / 2
+        return int(avg_rating), "estimated"
+
+    if p1_rating:
+        return int(p1_rating), "estimated"
+    if p2_rating:
+        return int(p2_rating), "estimated"
+
+    return None, "unknown"
+
+def parse_replay(replay_data: dict) -> dict:
+    """Parse replay JSON into one record: log fields plus rating and upload time."""
+    parsed = parse_log(replay_data.get("log", "") or "")
+    parsed["rating"], parsed["rating_source"] = estimate_rating(replay_data)
+    parsed["upload_time"] = replay_data.get("uploadtime")
+    return parsed
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Species Registry
+Canonical Pokemon name -> slug -> small integer ID mapping shared by every
+fetcher and aggregator.
+
+slugify() is the single slug implementation (Showdown, Smogon and pipeline
+names all go through it) and is memoized, so repeated names cost one dict
+lookup. SpeciesRegistry interns slugs to dense integer IDs so teams can be
+handled as compact sorted int tuples.
+
+get_registry(conn) loads pokemon_dim once per process; build_archetypes
+and team_index intern into that instance, so a known species has the same
+ID whichever of them sees it first, and slugs that are not in pokemon_dim
+yet get the next free ID. aggregate_state keeps its own persisted order
+instead (its daily partials are indexed by it).
+
+Usage:
+    from species import get_registry, slugify
+
+    registry = get_registry(conn)
+    species_id = registry.id_for_name("Flutter Mane")
+    registry.slug(species_id)
+"""
+
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Slug prefixes that collapse to one canonical form (first match wins)
+FORM_MAPPINGS = {
+    "urshifu-rapid-strike-style": "urshifu-rapid-strike",
+    "urshifu-single-strike-style": "urshifu-single-strike",
+    "landorus-therian-forme": "landorus-therian",
+    "tornadus-incarnate-forme": "tornadus",
+    "indeedee-f": "indeedee-f",
+}
+
+# Exact aliases for names Showdown and Smogon spell differently
+ALIASES = {
+    "indeedee-female": "indeedee-f",
+    "indeedee-male": "indeedee",
+}
+
+SLUG_STRIP = re.compile(r"[^a-z0-9\-]")
+
+@lru_cache(maxsize=None)
+def slugify(name: str) -> str:
+    """Convert Pokemon name to slug."""
+    # Drop accents (Flabébé -> flabebe) before stripping punctuation
+    slug = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    slug = slug.strip().lower()
+    # Team preview hides some formes as "Urshifu-*"
+    if slug.endswith("-*"):
+        slug = slug[:-2]
+    slug = SLUG_STRIP.sub("", slug.replace(" ", "-").replace("'", ""))
+
+    for pattern, replacement in FORM_MAPPINGS.items():
+        if pattern in slug:
+            slug = replacement
+            break
+
+    return ALIASES.get(slug, slug)
+
+class SpeciesRegistry:
+    """Interned slug <-> integer ID mapping (IDs are dense, starting at 0)."""
+
+    def __init__(self, slugs: Iterable[str] = ()):
+        self.ids: dict[str, int] = {}
+        self.slugs: list[str] = []
+        self.names: dict[str, int] = {}
+        self.lock = threading.Lock()
+        for slug in slugs:
+            self.intern(slug)
+
+    @classmethod
+    def load(cls, conn) -> "SpeciesRegistry":
+        """Build a registry from pokemon_dim in one query (IDs follow slug order)."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT slug, name FROM pokemon_dim ORDER BY slug")
+        registry = cls()
+        for slug, name in cursor.fetchall():
+            species_id = registry.intern(slug)
+            if name:
+                registry.names[name] = species_id
+        return registry
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def intern(self, slug: str) -> int:
+        """ID for a slug, assigning the next free ID on first sight."""
+        species_id = self.ids.get(slug)
+        if species_id is None:
+            with self.lock:
+                species_id = self.ids.get(slug)
+                if species_id is None:
+                    species_id = len(self.slugs)
+                    self.slugs.append(slug)
+                    self.ids[slug] = species_id
+        return species_id
+
+    def id_for_name(self, name: str) -> int:
+        """ID for a display name (Showdown or Smogon spelling)."""
+        species_id = self.names.get(name)
+        if species_id is None:
+            species_id = self.intern(slugify(name))
+            self.names[name] = species_id
+        return species_id
+
+    def get(self, slug: str) -> Optional[int]:
+        return self.ids.get(slug)
+
+    def slug(self, species_id: int) -> str:
+        return self.slugs[species_id]
+
+_default_registry: Optional[SpeciesRegistry] = None
+
+def get_registry(conn=None) -> SpeciesRegistry:
+    """Process-wide registry, loaded from pokemon_dim on first use if conn is given."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = SpeciesRegistry.load(conn) if conn is not None else SpeciesRegistry()
+    return _default_registry
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Smogon Stats Manifest
+Record of every Smogon stats file the fetchers have seen: URL, ETag,
+Last-Modified, size, SHA-256 and the hash that was last loaded into the
+database.
+
+A scheduled run HEADs the usage and chaos files first; when the validators
+match what was last loaded it exits before downloading anything. If the
+server sends new validators but the bytes hash the same, the run still
+skips the database. The manifest also answers "latest month" by probing
+single files with HEAD, never by scraping the directory listing.
+
+Manifest path defaults to .cache/smogon/manifest.json (override with
+VGC_STATS_MANIFEST).
+
+Usage:
+    python stats_manifest.py show
+    python stats_manifest.py latest --format gen9vgc2026regf --cutoff 1760
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from http_client import get_client
+
+DEFAULT_MANIFEST_PATH = os.environ.get(
+    "VGC_STATS_MANIFEST",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "smogon", "manifest.json"),
+)
+
+# How many months back from today to look for a published month
+LATEST_MONTH_LOOKBACK = 3
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def validators_of(headers: dict) -> dict:
+    """ETag/Last-Modified/size from (lower-cased) response headers."""
+    meta = {"etag": headers.get("etag"), "last_modified": headers.get("last-modified")}
+    # Content-Length of a compressed transfer is not the file size
+    if headers.get("content-length") and not headers.get("content-encoding"):
+        meta["size"] = int(headers["content-length"])
+    return meta
+
+class HashingReader:
+    """File-like pass-through that hashes and counts the bytes read."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1):
+        data = self.stream.read(size)
+        self.sha256.update(data.encode("utf-8") if isinstance(data, str) else data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+class StatsManifest:
+    """JSON manifest of fetched Smogon stats files, keyed by URL."""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.entries.get(url)
+
+    # ---- probing ----
+
+    @staticmethod
+    def probe(url: str) -> Optional[dict]:
+        """HEAD url: validators if it exists, None on 404."""
+        resp = get_client().head(url)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return validators_of(resp.headers)
+
+    def matches(self, url: str, probe: Optional[dict]) -> bool:
+        """True if a HEAD probe shows url is unchanged since it was last loaded."""
+        entry = self.entries.get(url)
+        if entry is None:
+            return False
+        if probe is None:
+            return entry.get("missing", False)
+        if not entry.get("sha256") or entry.get("loaded_sha256") != entry.get("sha256"):
+            return False
+        if probe.get("etag") and entry.get("etag"):
+            same = probe["etag"] == entry["etag"]
+        elif probe.get("last_modified") and entry.get("last_modified"):
+            same = probe["last_modified"] == entry["last_modified"]
+        else:
+            return False  # No validators to compare: must download
+        if same and probe.get("size") is not None and entry.get("size") is not None:
+            same = probe["size"] == entry["size"]
+        return same
+
+    def unchanged(self, urls: list[str], probe: Callable[[str], Optional[dict]] = None) -> bool:
+        """HEAD every url; True only if all of them match the manifest."""
+        probe = probe or self.probe
+        return all(self.matches(url, probe(url)) for url in urls)
+
+    # ---- recording ----
+
+    def record(self, url: str, headers: dict, size: int, sha256: str, **labels):
+        """Store what a successful download returned (labels: format, month, cutoff, kind)."""
+        meta = validators_of(headers)
+        meta["size"] = size
+        with self.lock:
+            entry = self.entries.setdefault(url, {})
+            entry.pop("missing", None)
+            entry.update(labels)
+            entry.update({k: v for k, v in meta.items() if v is not None})
+            entry.update({"sha256": sha256, "checked_at": now_iso()})
+
+    def record_missing(self, url: str, **labels):
+        with self.lock:
+            entry = self.entries.setdefault(url, {})
+            entry.update(labels)
+            entry.update({"missing": True, "checked_at": now_iso()})
+
+    def content_loaded(self, urls: list[str]) -> bool:
+        """True if every url's current hash is the one already in the database."""
+        for url in urls:
+            entry = self.entries.get(url) or {}
+            if entry.get("missing"):
+                continue
+            if not entry.get("sha256") or entry.get("loaded_sha256") != entry["sha256"]:
+                return False
+        return True
+
+    def mark_loaded(self, urls: list[str]):
+        with self.lock:
+            for url in urls:
+                entry = self.entries.get(url)
+                if entry and entry.get("sha256"):
+                    entry["loaded_sha256"] = entry["sha256"]
+                    entry["loaded_at"] = now_iso()
+
+    # ---- latest month ----
+
+    def known_months(self, smogon_format: str, cutoff: int) -> list[str]:
+        """Months for which the manifest has seen this format's usage file."""
+        return sorted(
+            e["month"] for e in self.entries.values()
+            if e.get("kind") == "usage" and e.get("format") == smogon_format
+            and e.get("cutoff") == cutoff and not e.get("missing") and e.get("month")
+        )
+
+    def latest_month(self, usage_url: Callable[[str], str], smogon_format: str, cutoff: int,
+                     now: Optional[datetime] = None) -> str:
+        """Newest month whose usage file exists.
+
+        Months newer than the newest one in the manifest are HEAD-probed
+        (newest first); anything the manifest already knows needs no request.
+        """
+        known = self.known_months(smogon_format, cutoff)
+        newest_known = known[-1] if known else None
+        now = now or datetime.now()
+        for offset in range(LATEST_MONTH_LOOKBACK):
+            year, month = now.year, now.month - offset
+            if month <= 0:
+                month += 12
+                year -= 1
+            month_str = f"{year}-{month:02d}"
+            if newest_known and month_str <= newest_known:
+                return newest_known
+            url = usage_url(month_str)
+            probe = self.probe(url)
+            if probe is not None:
+                with self.lock:
+                    entry = self.entries.setdefault(url, {})
+                    entry.pop("missing", None)
+                    entry.update({"format": smogon_format, "cutoff": cutoff, "month": month_str,
+                                  "kind": "usage", "checked_at": now_iso()})
+                return month_str
+        if newest_known:
+            return newest_known
+        raise RuntimeError("Could not find any available month on Smogon Stats")
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the Smogon stats manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="List every file in the manifest")
+    latest = sub.add_parser("latest", help="Latest published month for a format")
+    latest.add_argument("--format", required=True, help="Smogon format name (e.g., gen9vgc2026regf)")
+    latest.add_argument("--cutoff", type=int, default=1760)
+    args = parser.parse_args()
+
+    manifest = StatsManifest()
+    if args.command == "show":
+        for url, entry in sorted(manifest.entries.items()):
+            state = "missing" if entry.get("missing") else (
+                "loaded" if entry.get("loaded_sha256") == entry.get("sha256") else "fetched")
+            print(f"  {state:8s} {entry.get('size', '-'):>10} {url}")
+    elif args.command == "latest":
+        from fetch_smogon_stats import usage_file_url
+        print(manifest.latest_month(lambda m: usage_file_url(args.format, m, args.cutoff),
+                                    args.format, args.cutoff))
+        manifest.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Team Tags
+Archetype tags from the setters a team runs, shared by replay records
+(fetch_replays.py) and the archetype style roll-ups (build_archetypes.py).
+
+Usage:
+    identify_tags(p1_team + p2_team)    # e.g. ["rain", "tailwind"]
+"""
+
+from typing import Iterable
+
+RAIN_SETTERS = {"pelipper", "politoed"}
+SUN_SETTERS = {"torkoal", "koraidon"}
+TRICK_ROOM_SETTERS = {"hatterene", "dusclops", "porygon2", "gothitelle", "farigiraf", "oranguru"}
+TAILWIND_USERS = {"tornadus", "whimsicott", "murkrow", "talonflame"}
+
+def identify_tags(pokemon: Iterable[str]) -> list[str]:
+    """Identify archetype tags from a set of species slugs."""
+    tags = []
+    all_pokemon = set(pokemon)
+    
+    # Rain
+    if all_pokemon & RAIN_SETTERS:
+        tags.append("rain")
+    
+    # Sun
+    if all_pokemon & SUN_SETTERS:
+        tags.append("sun")
+    
+    # Trick Room
+    if all_pokemon & TRICK_ROOM_SETTERS:
+        tags.append("trick-room")
+    
+    # Tailwind
+    if all_pokemon & TAILWIND_USERS:
+        tags.append("tailwind")
+    
+    return tags
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Team Index
+MinHash LSH index over every stored replay team, for "replays like this
+team" lookups ranked by overall species overlap.
+
+Each replay side is one entry. Identical teams share one MinHash signature
+(archetype_engine.minhash_signatures, INDEX_BANDS x INDEX_ROWS hashes),
+whose bands are kept as uint32 keys. At load time every band is sorted
+once, so a query is INDEX_BANDS binary searches for candidate teams, an
+exact Jaccard rerank of those candidates, and a walk down their replays
+(highest rating first). Nothing is scanned, and the table is not touched
+after the index is loaded.
+
+With 3-row bands a team sharing 4 of 6 species (Jaccard 0.5) is found
+~74% of the time, 5 of 6 (0.71) ~99%; exact matches always.
+
+The index is an npz blob in team_index, one row per format, rebuilt by
+the Build Aggregates workflow.
+
+Usage:
+    python team_index.py build --format reg-f
+    python team_index.py query --format reg-f incineroar rillaboom flutter-mane urshifu-rapid-strike
+
+    index = TeamIndex.load(conn, "reg-f")
+    index.query(["incineroar", "rillaboom", ...], limit=10)
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+import psycopg2
+
+from archetype_engine import band_keys, minhash_signatures
+from bulk_writer import bulk_upsert
+from species import SpeciesRegistry, get_registry, slugify
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+INDEX_BANDS = 10
+INDEX_ROWS = 3
+TEAM_WIDTH = 6                   # Species per team (shorter teams are padded with -1)
+DEFAULT_LIMIT = 10
+DEFAULT_FETCH_SIZE = 20000
+
+INDEX_COLUMNS = ("format_id", "replay_count", "species", "index_data", "built_at")
+
+def team_band_keys(teams: list[tuple[int, ...]], num_species: int) -> np.ndarray:
+    """(teams x INDEX_BANDS) uint32 band keys."""
+    signatures = minhash_signatures(teams, num_species, num_hashes=INDEX_BANDS * INDEX_ROWS)
+    return (band_keys(signatures, INDEX_BANDS) & 0xFFFFFFFF).astype(np.uint32)
+
+class TeamIndex:
+    """Distinct teams with their band keys, and the replay sides that used them."""
+
+    def __init__(self, registry: SpeciesRegistry, teams: np.ndarray, keys: np.ndarray,
+                 entry_team: np.ndarray, replay_ids: np.ndarray, sides: np.ndarray, ratings: np.ndarray):
+        self.registry = registry
+        self.teams = teams              # (distinct, TEAM_WIDTH) int16 species IDs, -1 padded
+        self.keys = keys                # (distinct, INDEX_BANDS) uint32
+        self.entry_team = entry_team    # per entry: row in teams; entries sorted by team, rating desc
+        self.replay_ids = replay_ids    # per entry: bytes
+        self.sides = sides              # per entry: 1 or 2
+        self.ratings = ratings          # per entry: rating_estimate (-1 if unknown)
+        self.team_start = np.searchsorted(entry_team, np.arange(len(teams) + 1))
+        # One contiguous sorted row per band for binary search
+        self.band_order = np.ascontiguousarray(np.argsort(keys, axis=0, kind="stable").T)
+        self.band_sorted = np.take_along_axis(keys.T, self.band_order, axis=1)
+
+    # ---- building ----
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple], registry: Optional[SpeciesRegistry] = None) -> "TeamIndex":
+        """Index from (replay_id, p1_team, p2_team, rating_estimate) rows."""
+        registry = registry if registry is not None else SpeciesRegistry()
+        team_rows: dict[tuple[int, ...], int] = {}
+        entry_team, replay_ids, sides, ratings = [], [], [], []
+        for replay_id, p1_team, p2_team, rating in rows:
+            for side, team in ((1, p1_team), (2, p2_team)):
+                ids = tuple(sorted({registry.intern(slug) for slug in team or ()}))[:TEAM_WIDTH]
+                if not ids:
+                    continue
+                entry_team.append(team_rows.setdefault(ids, len(team_rows)))
+                replay_ids.append(replay_id)
+                sides.append(side)
+                ratings.append(rating if rating is not None else -1)
+
+        distinct = list(team_rows)
+        teams = np.full((len(distinct), TEAM_WIDTH), -1, dtype=np.int16)
+        for i, team in enumerate(distinct):
+            teams[i, :len(team)] = team
+        keys = team_band_keys(distinct, len(registry)) if distinct else np.zeros((0, INDEX_BANDS), np.uint32)
+
+        entry_team = np.array(entry_team, dtype=np.int32)
+        ratings = np.array(ratings, dtype=np.int32)
+        order = np.lexsort((-ratings, entry_team))
+        return cls(registry, teams, keys, entry_team[order],
+                   np.array(replay_ids, dtype=bytes)[order] if replay_ids else np.zeros(0, dtype="S1"),
+                   np.array(sides, dtype=np.int8)[order], ratings[order])
+
+    @classmethod
+    def from_db(cls, conn, format_id: str, fetch_size: int = DEFAULT_FETCH_SIZE) -> "TeamIndex":
+        registry = get_registry(conn)
+        cursor = conn.cursor(name="team_index_replays")
+        cursor.itersize = fetch_size
+        cursor.execute("""
+            SELECT replay_id, p1_team, p2_team, rating_estimate
+            FROM replays
+            WHERE format_id = %s
+        """, (format_id,))
+        index = cls.build(cursor, registry)
+        cursor.close()
+        return index
+
+    # ---- persistence ----
+
+    def save(self, conn, format_id: str):
+        buf = io.BytesIO()
+        np.savez_compressed(buf, teams=self.teams, keys=self.keys, entry_team=self.entry_team,
+                            replay_ids=self.replay_ids, sides=self.sides, ratings=self.ratings)
+        row = (format_id, len(set(self.replay_ids.tolist())), self.registry.slugs, buf.getvalue(), None)
+        bulk_upsert(conn, "team_index", INDEX_COLUMNS, [row], conflict=("format_id",),
+                    expressions={"built_at": "NOW()"})
+        return len(buf.getvalue())
+
+    @classmethod
+    def load(cls, conn, format_id: str) -> Optional["TeamIndex"]:
+        """The saved index for format_id, or None if it has not been built."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('team_index')")
+        if cursor.fetchone()[0] is None:
+            return None
+        cursor.execute("SELECT species, index_data FROM team_index WHERE format_id = %s", (format_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        species, blob = row
+        with np.load(io.BytesIO(bytes(blob))) as arrays:
+            return cls(SpeciesRegistry(species), arrays["teams"], arrays["keys"], arrays["entry_team"],
+                       arrays["replay_ids"], arrays["sides"], arrays["ratings"])
+
+    # ---- querying ----
+
+    def candidates(self, team: tuple[int, ...]) -> np.ndarray:
+        """Distinct-team rows sharing at least one band with team."""
+        keys = team_band_keys([team], max(len(self.registry), max(team) + 1))[0]
+        hits = []
+        for band, key in enumerate(keys):
+            column = self.band_sorted[band]
+            lo, hi = np.searchsorted(column, key, "left"), np.searchsorted(column, key, "right")
+            hits.append(self.band_order[band, lo:hi])
+        return np.unique(np.concatenate(hits)) if hits else np.zeros(0, dtype=np.int64)
+
+    def query(self, team: Iterable[str], limit: int = DEFAULT_LIMIT,
+              min_rating: Optional[int] = None) -> list[dict]:
+        """Most similar replays to team (names or slugs): Jaccard, then rating, desc."""
+        ids, extra = set(), 0
+        for name in team:
+            species_id = self.registry.get(slugify(name))
+            if species_id is None:  # Never indexed: matches nothing, but counts in the union
+                species_id = len(self.registry) + extra
+                extra += 1
+            ids.add(species_id)
+        if not ids or not len(self.teams):
+            return []
+        query_ids = tuple(sorted(ids))
+
+        rows = self.candidates(query_ids)
+        members = self.teams[rows]
+        shared = np.isin(members, list(query_ids)).sum(axis=1)
+        sizes = (members >= 0).sum(axis=1)
+        similarity = shared / (sizes + len(query_ids) - shared)
+
+        results = []
+        slugs = self.registry.slugs
+        for r in np.argsort(-similarity, kind="stable").tolist():
+            # Teams are visited best first; stop once no later team can make the cut
+            if len(results) >= limit and similarity[r] < results[-1]["similarity"]:
+                break
+            team_row = int(rows[r])
+            for e in range(self.team_start[team_row], self.team_start[team_row + 1]):
+                rating = int(self.ratings[e])
+                if min_rating is not None and rating < min_rating:
+                    continue
+                results.append({
+                    "replay_id": self.replay_ids[e].decode(),
+                    "side": int(self.sides[e]),
+                    "rating": rating if rating >= 0 else None,
+                    "similarity": round(float(similarity[r]), 4),
+                    "team": [slugs[i] for i in self.teams[team_row].tolist() if i >= 0],
+                })
+        results.sort(key=lambda hit: (-hit["similarity"], -(hit["rating"] or -1), hit["replay_id"]))
+        return results[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the similar-team index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Rebuild the index for a format from replays")
+    build.add_argument("--format", default=os.environ.get("FORMAT_ID", "reg-f"))
+
+    query = sub.add_parser("query", help="Replays most similar to a team")
+    query.add_argument("--format", default=os.environ.get("FORMAT_ID", "reg-f"))
+    query.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    query.add_argument("--min-rating", type=int)
+    query.add_argument("team", nargs="+", help="Species names or slugs")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("ERROR: DATABASE_URL not set")
+        sys.exit(1)
+    conn = psycopg2.connect(DATABASE_URL)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = TeamIndex.from_db(conn, args.format)
+        size = index.save(conn, args.format)
+        conn.commit()
+        print(f"Indexed {len(index.replay_ids)} teams ({len(index.teams)} distinct) for {args.format} "
+              f"in {time.perf_counter() - start:.2f}s ({size / 1024 / 1024:.1f} MB)")
+    else:
+        index = TeamIndex.load(conn, args.format)
+        if index is None:
+            print(f"No team index for {args.format}; run: python team_index.py build --format {args.format}")
+            sys.exit(1)
+        start = time.perf_counter()
+        hits = index.query(args.team, args.limit, args.min_rating)
+        print(f"{len(hits)} replays in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for hit in hits:
+            print(f"  {hit['similarity']:.2f}  {hit['rating'] or '-':>5}  {hit['replay_id']} (p{hit['side']})  "
+                  f"{', '.join(hit['team'])}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Teammate Matrix
+Pair synergy straight from Smogon chaos data.
+
+Every chaos entry's Teammates block is folded into a dense species x species
+matrix in one pass. For a Pokemon A with weighted count w(A) (the sum of its
+Abilities counts) and team usage u(A):
+
+    P(B | A)    = Teammates_A[B] / w(A)
+    joint(A, B) = P(B | A) * u(A)          fraction of teams with both
+
+Both directions estimate the same joint rate, so they are averaged. The
+result is written to pair_synergy as pair_rate (percent of teams) and
+pair_sample_size (teams with both, from the battle count) with one bulk merge.
+
+Usage:
+    matrix = TeammateMatrix()
+    for name, info in iter_chaos(stream):
+        matrix.add(name, info)
+    pairs = matrix.pair_rows(battles=info["number of battles"])
+    upsert_pair_synergy(conn, "reg-f", "2026-01", 1760, pairs)
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from bulk_writer import bulk_upsert
+from species import SpeciesRegistry
+
+# Pairs seen on fewer teams than this are not written (same floor as the replay builder)
+MIN_PAIR_SAMPLE = 3
+
+class TeammateMatrix:
+    """Accumulates chaos Teammates blocks into a conditional-probability matrix."""
+
+    def __init__(self):
+        self.registry = SpeciesRegistry()
+        self.names: dict[int, str] = {}
+        self.usage: dict[int, float] = {}
+        self.rows: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(self, name: str, info: dict):
+        """Fold one chaos entry in (only its Teammates row is kept)."""
+        a = self.registry.id_for_name(name)
+        self.names[a] = name
+        # Smogon writes "usage"; older dumps used "Usage"
+        self.usage[a] = float(info.get("usage", info.get("Usage", 0)) or 0)
+        weight = sum((info.get("Abilities") or {}).values())
+        teammates = info.get("Teammates") or {}
+        if weight > 0 and teammates:
+            ids = np.fromiter((self.registry.id_for_name(n) for n in teammates), dtype=np.int64,
+                              count=len(teammates))
+            probs = np.fromiter(teammates.values(), dtype=np.float64, count=len(teammates)) / weight
+            self.rows[a] = (ids, probs)
+
+    def species(self) -> list[dict]:
+        """Species that have their own chaos entry, as pokemon_dim rows."""
+        return [{"slug": self.registry.slug(a), "name": name} for a, name in self.names.items()]
+
+    def joint(self) -> np.ndarray:
+        """Symmetric joint team rate matrix (fraction of teams with both A and B)."""
+        n = len(self.registry)
+        directed = np.zeros((n, n))
+        for a, (ids, probs) in self.rows.items():
+            np.add.at(directed, (a, ids), np.clip(probs, 0, 1) * self.usage[a])
+        np.fill_diagonal(directed, 0)
+        # Average the A->B and B->A estimates; keep a lone direction as-is
+        present = (directed > 0).astype(np.float64)
+        joint = (directed + directed.T) / np.maximum(present + present.T, 1)
+        # No pair can be on more teams than its rarer member
+        usage = np.zeros(n)
+        usage[list(self.usage)] = list(self.usage.values())
+        return np.minimum(joint, np.minimum.outer(usage, usage))
+
+    def pair_rows(self, battles: int, min_sample: int = MIN_PAIR_SAMPLE) -> list[tuple]:
+        """(slug_a, slug_b, pair_rate %, pair_sample_size) for pairs of entered species."""
+        joint = self.joint()
+        entered = np.zeros(len(self.registry), dtype=bool)
+        entered[list(self.names)] = True
+
+        a, b = np.triu_indices(len(self.registry), 1)
+        keep = entered[a] & entered[b] & (joint[a, b] > 0)
+        a, b = a[keep], b[keep]
+        rates = joint[a, b]
+        samples = np.rint(rates * 2 * battles).astype(np.int64)  # two teams per battle
+        keep = samples >= min_sample
+
+        slugs = self.registry.slugs
+        return [
+            (slugs[i], slugs[j], round(rate * 100, 2), n)
+            for i, j, rate, n in zip(a[keep].tolist(), b[keep].tolist(),
+                                     rates[keep].tolist(), samples[keep].tolist())
+        ]
+
+def upsert_pair_synergy(conn, format_id: str, time_bucket: str, cutoff: int,
+                        pairs: list[tuple], partners: Optional[list[tuple]] = None,
+                        intervals: Optional[list] = None) -> int:
+    """Bulk-upsert pair_synergy rows through bulk_writer.
+
+    partners, if given, holds (top_third_partners, top_fourth_partners)
+    PartnerList data lists aligned with pairs; intervals holds the
+    [low, high] pair_rate bounds.
+    """
+    columns = ("format_id", "time_bucket", "cutoff", "pokemon_a", "pokemon_b", "pair_rate", "pair_sample_size")
+    rows = ((format_id, time_bucket, cutoff, a, b, rate, n) for a, b, rate, n in pairs)
+    if intervals is not None:
+        columns += ("pair_rate_ci_low", "pair_rate_ci_high")
+        rows = (row + tuple(interval) for row, interval in zip(rows, intervals))
+    if partners is not None:
+        columns += ("top_third_partners", "top_fourth_partners")
+        # PartnerList@v1 envelopes
+        rows = (row + ({"_v": 1, "data": third}, {"_v": 1, "data": fourth})
+                for row, (third, fourth) in zip(rows, partners))
+    bulk_upsert(
+        conn, "pair_synergy", columns, rows,
+        conflict=("format_id", "time_bucket", "cutoff", "pokemon_a", "pokemon_b"),
+        update=columns[5:],
+        # Canonical order is taken in SQL so it matches the pair_order CHECK's collation
+        expressions={"pokemon_a": "LEAST(pokemon_a, pokemon_b)",
+                     "pokemon_b": "GREATEST(pokemon_a, pokemon_b)"},
+        label="pair_synergy",
+    )
+    return len(pairs)
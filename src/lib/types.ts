@@ -69,6 +69,8 @@ export interface PairSynergy {
     pokemon_a: string;
     pokemon_b: string;
     pair_rate: number;
+    pair_rate_ci_low?: number | null;
+    pair_rate_ci_high?: number | null;
     pair_sample_size: number;
     synergy_score?: number;
     top_third_partners?: PartnerInfo[];
@@ -107,6 +109,8 @@ export interface Counter {
     answer_type: 'mechanic' | 'pokemon' | 'archetype';
     answer_key: string;
     effectiveness_score: number | null;
+    effectiveness_ci_low?: number | null;
+    effectiveness_ci_high?: number | null;
     loss_appearance_rate: number;
     win_appearance_rate: number;
     n_losses: number;
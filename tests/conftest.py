@@ -0,0 +1,51 @@
+"""
+Shared fixtures for the pipeline tests.
+
+The scripts are flat modules that import each other by name (as the
+workflows run them from scripts/), so scripts/ and benchmarks/ go on
+sys.path here. Database tests are skipped unless DATABASE_URL is set.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT_DIR, "scripts"), os.path.join(ROOT_DIR, "benchmarks")]
+
+SPECIES = [f"mon-{i}" for i in range(40)]
+
+def random_battles(count: int, seed: int = 0, species: list[str] = SPECIES) -> list[tuple]:
+    """(p1_team, p2_team, winner_side) rows with skewed usage and some short teams."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(species))]
+    battles = []
+    for _ in range(count):
+        teams = []
+        for _ in range(2):
+            size = rng.choice([6, 6, 6, 5, 4, 2])
+            team: list[str] = []
+            while len(team) < size:
+                mon = rng.choices(species, weights)[0]
+                if mon not in team:
+                    team.append(mon)
+            teams.append(team)
+        battles.append((teams[0], teams[1], rng.choice([1, 2])))
+    return battles
+
+@pytest.fixture
+def battles() -> list[tuple]:
+    return random_battles(400)
+
+@pytest.fixture
+def db_conn():
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(url)
+    yield conn
+    conn.rollback()
+    conn.close()
@@ -0,0 +1,92 @@
+"""Daily partials: summing states, persistence, and incremental folds against full rebuilds."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from aggregate_state import AggregateState, update_partials, verify_partials
+from conftest import random_battles
+from species import SpeciesRegistry
+
+FORMAT_ID = "test-aggregate-state"
+
+def test_sum_of_parts_equals_whole(battles):
+    whole = AggregateState(FORMAT_ID, 0)
+    whole.add_battles(battles)
+
+    # The first part sees fewer species, so its arrays are shorter than the second's
+    registry = SpeciesRegistry()
+    first, second = AggregateState(FORMAT_ID, 0, registry), AggregateState(FORMAT_ID, 0, registry)
+    first.add_battles(battles[:15])
+    second.add_battles(battles[15:])
+    assert len(first.pairs.cooccur) < len(second.pairs.cooccur)
+    total = AggregateState(FORMAT_ID, 0, registry)
+    total.add(first)
+    total.add(second)
+    assert total.canonical() == whole.canonical()
+
+def test_bytes_round_trip(battles):
+    state = AggregateState(FORMAT_ID, 0)
+    state.add_battles(battles)
+    loaded = AggregateState.from_bytes(FORMAT_ID, 0, state.registry, state.to_bytes())
+    assert loaded.canonical() == state.canonical()
+
+def rating(i: int) -> int:
+    return 1500 + i * 37 % 500
+
+def insert_replays(conn, battles, start: int, day_of, indexed_at):
+    cursor = conn.cursor()
+    for i, (p1, p2, winner) in enumerate(battles, start):
+        cursor.execute("""
+            INSERT INTO replays (replay_id, format_id, rating_estimate, played_at, p1_team, p2_team,
+                                 winner_side, indexed_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (f"{FORMAT_ID}-{i}", FORMAT_ID, rating(i), day_of(i), json.dumps(p1), json.dumps(p2),
+              winner, indexed_at))
+    conn.commit()
+
+def cleanup(conn):
+    conn.rollback()
+    cursor = conn.cursor()
+    for table in ("replays", "aggregate_daily", "aggregate_watermarks"):
+        cursor.execute(f"DELETE FROM {table} WHERE format_id = %s", (FORMAT_ID,))
+    conn.commit()
+
+@pytest.mark.parametrize("cutoff", [0, 1760])
+def test_incremental_folds_match_full_rebuild(db_conn, cutoff, capsys):
+    now = datetime.now(timezone.utc)
+    cleanup(db_conn)
+    try:
+        first, second = random_battles(150, seed=1), random_battles(120, seed=2)
+        insert_replays(db_conn, first, 0, lambda i: now - timedelta(days=i % 12, hours=3),
+                       now - timedelta(hours=3))
+        update_partials(db_conn, FORMAT_ID, cutoff, window_days=30)
+        # As if that run had happened two hours ago
+        cursor = db_conn.cursor()
+        cursor.execute("UPDATE aggregate_watermarks SET watermark = %s WHERE format_id = %s",
+                       (now - timedelta(hours=2), FORMAT_ID))
+        db_conn.commit()
+
+        # Later replays land on old and new days, plus one outside retention and one undated
+        insert_replays(db_conn, second, 1000, lambda i: now - timedelta(days=i % 20, hours=3),
+                       now - timedelta(hours=1))
+        insert_replays(db_conn, [(["mon-0"], ["mon-1"], 1)], 5000, lambda i: now - timedelta(days=200),
+                       now - timedelta(hours=1))
+        insert_replays(db_conn, [(["mon-2", "mon-3"], ["mon-1"], 2)], 5001, lambda i: None,
+                       now - timedelta(hours=1))
+        incremental = update_partials(db_conn, FORMAT_ID, cutoff, window_days=30, retention_days=90)
+        assert verify_partials(db_conn, incremental)
+
+        rebuilt = update_partials(db_conn, FORMAT_ID, cutoff, window_days=30, full_rebuild=True)
+        assert incremental.canonical() == rebuilt.canonical()
+        ids = list(range(150)) + list(range(1000, 1120)) + [5001]
+        assert incremental.replays == sum(rating(i) >= cutoff for i in ids) > 0
+
+        short = update_partials(db_conn, FORMAT_ID, cutoff, window_days=5)
+        assert 0 < short.replays < incremental.replays
+        cursor.execute("SELECT MIN(day) FROM aggregate_daily WHERE format_id = %s", (FORMAT_ID,))
+        assert cursor.fetchone()[0] > (now - timedelta(days=100)).date()
+    finally:
+        cleanup(db_conn)
+    capsys.readouterr()
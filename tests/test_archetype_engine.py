@@ -0,0 +1,99 @@
+"""MinHash/LSH building blocks and archetype clustering on planted cores."""
+
+import random
+
+import numpy as np
+
+from archetype_engine import ArchetypeEngine, band_keys, jaccard, minhash_signatures
+from tags import identify_tags
+
+CORES = {
+    "rain": ["pelipper", "archaludon", "basculegion", "kingambit"],
+    "sun": ["torkoal", "lilligant-hisui", "flutter-mane", "ursaluna"],
+    "room": ["hatterene", "indeedee-f", "ursaluna-bloodmoon", "torkoal"],
+}
+FILLER = [f"filler-{i}" for i in range(60)]
+STAPLES = ["incineroar", "rillaboom"]  # On half of every team, whatever the core
+
+def planted_teams(per_core: int, seed: int = 0) -> list[list[str]]:
+    rng = random.Random(seed)
+    teams = []
+    for core in CORES.values():
+        for _ in range(per_core):
+            team = rng.sample(core, rng.choice([3, 4]))
+            team += [s for s in STAPLES if rng.random() < 0.5 and len(team) < 6]
+            while len(team) < 6:
+                mon = rng.choice(FILLER)
+                if mon not in team:
+                    team.append(mon)
+            teams.append(team)
+    rng.shuffle(teams)
+    return teams
+
+def test_minhash_estimates_jaccard():
+    rng = random.Random(1)
+    teams = [tuple(sorted(rng.sample(range(200), 6))) for _ in range(300)]
+    signatures = minhash_signatures(teams, 200, num_hashes=256)
+    for _ in range(200):
+        a, b = rng.sample(range(len(teams)), 2)
+        masks = [sum(1 << i for i in teams[t]) for t in (a, b)]
+        estimate = float((signatures[a] == signatures[b]).mean())
+        assert abs(estimate - jaccard(*masks)) < 0.15
+
+def test_identical_teams_share_every_band():
+    signatures = minhash_signatures([(1, 2, 3), (1, 2, 3), (4, 5, 6)], 10)
+    keys = band_keys(signatures)
+    assert (keys[0] == keys[1]).all() and not (keys[0] == keys[2]).any()
+
+def test_planted_cores_are_recovered():
+    engine = ArchetypeEngine()
+    engine.add_teams(planted_teams(300) + [[], None])
+    assert engine.teams == 900
+    archetypes = engine.cluster(min_teams=100)
+
+    assert len(archetypes) == len(CORES)
+    found = set()
+    for archetype in archetypes:
+        members = set(archetype["key_pokemon"] + archetype["flex_pokemon"])
+        name = max(CORES, key=lambda c: len(members & set(CORES[c])))
+        found.add(name)
+        assert members >= set(CORES[name])
+        assert not members & set(FILLER)
+        # At least half of the core's 300 teams; fragments too small to merge are dropped
+        assert 150 <= archetype["team_sample_size"] <= 300
+    assert found == set(CORES)
+    assert sum(a["team_sample_size"] for a in archetypes) <= engine.teams
+
+    combined = engine.combine(archetypes)
+    assert combined["team_sample_size"] == sum(a["team_sample_size"] for a in archetypes)
+    assert np.array_equal(combined["freq"], sum(a["freq"] for a in archetypes))
+
+def test_cluster_does_not_depend_on_input_order():
+    teams = planted_teams(200, seed=3)
+    results = []
+    for order in (teams, teams[::-1]):
+        engine = ArchetypeEngine()
+        engine.add_teams(order)
+        results.append([(a["key_pokemon"], a["team_sample_size"]) for a in engine.cluster(min_teams=50)])
+    assert results[0] == results[1]
+
+def test_style_tags():
+    assert identify_tags(CORES["rain"]) == ["rain"]
+    assert identify_tags(CORES["room"]) == ["sun", "trick-room"]
+    assert identify_tags(["tornadus", "politoed"]) == ["rain", "tailwind"]
+    assert identify_tags([]) == []
+
+def profile(freq: list[int]) -> dict:
+    return {"teams": max(freq), "freq": np.array(freq, dtype=np.int64), "distinct": 1}
+
+def test_disjoint_profiles_never_merge():
+    # The first profile's members all have IDF 0 (they are on every team)
+    weights = np.array([0.0, 0.0, 1.0, 1.0])
+    profiles = [profile([5, 5, 0, 0]), profile([0, 0, 5, 0]), profile([0, 0, 0, 5])]
+    with np.errstate(all="raise"):
+        merged = ArchetypeEngine._merge(profiles, weights)
+    assert sorted(p["freq"].tolist() for p in merged) == sorted(p["freq"].tolist() for p in profiles)
+
+    # Profiles sharing a weighted core still merge
+    merged = ArchetypeEngine._merge([profile([0, 0, 5, 5]), profile([0, 0, 4, 5])], weights)
+    assert [(p["teams"], p["freq"].tolist()) for p in merged] == [(10, [0, 0, 9, 10])]
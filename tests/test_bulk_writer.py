@@ -0,0 +1,63 @@
+"""COPY encoding and merge semantics of bulk_upsert."""
+
+import csv
+import io
+
+import pytest
+
+from bulk_writer import COPY_NULL, RowStream, copy_value, rows_to_csv
+
+ROWS = [
+    (1, "plain", None, {"a": [1, 2]}, b"\x00\xffblob"),
+    (2, 'comma, "quote"\nnewline', 1.5, [], b""),
+    (3, "\\N literal", 0, {"é": "ü"}, bytearray(b"\x01")),
+]
+
+def test_copy_value():
+    assert copy_value(None) == COPY_NULL
+    assert copy_value({"a": 1}) == '{"a": 1}'
+    assert copy_value(b"\x00\xab") == "\\x00ab"
+    assert copy_value(memoryview(b"z")) == "\\x7a"
+    assert copy_value(7) == 7
+
+@pytest.mark.parametrize("size", [1, 3, 17, -1])
+def test_row_stream_matches_in_memory_csv(size):
+    rows = ROWS * 500
+    stream = RowStream(iter(rows))
+    chunks = []
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert "".join(chunks) == rows_to_csv(rows).getvalue()
+    assert stream.count == len(rows)
+    assert len(list(csv.reader(io.StringIO("".join(chunks))))) == len(rows)
+
+def test_bulk_upsert_merges(db_conn):
+    from bulk_writer import bulk_upsert
+
+    cursor = db_conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE bulk_writer_test (
+            k INTEGER PRIMARY KEY, v TEXT, j JSONB, b BYTEA, t TIMESTAMPTZ
+        )
+    """)
+    columns = ("k", "v", "j", "b", "t")
+    cursor.execute("INSERT INTO bulk_writer_test VALUES (1, 'old', NULL, NULL, NULL)")
+
+    rows = [(1, "first", {"n": 1}, b"\x00\x01", None), (2, None, [1], None, None), (1, "last", None, b"\xff", None)]
+    written = bulk_upsert(db_conn, "bulk_writer_test", columns, iter(rows), conflict=("k",),
+                          expressions={"t": "NOW()"})
+    assert written == 2
+    cursor.execute("SELECT k, v, j, b, t IS NOT NULL FROM bulk_writer_test ORDER BY k")
+    assert [(k, v, j, bytes(b) if b is not None else None, t) for k, v, j, b, t in cursor.fetchall()] == [
+        (1, "last", None, b"\xff", True),   # Duplicate keys: last row wins
+        (2, None, [1], None, True),
+    ]
+
+    assert bulk_upsert(db_conn, "bulk_writer_test", columns, [(2, "ignored", None, None, None)],
+                       conflict=("k",), update=()) == 0
+    assert bulk_upsert(db_conn, "bulk_writer_test", columns, [], conflict=("k",)) == 0
+    cursor.execute("SELECT v FROM bulk_writer_test WHERE k = 2")
+    assert cursor.fetchone() == (None,)
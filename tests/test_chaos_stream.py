@@ -0,0 +1,57 @@
+"""ChaosStream must yield exactly what json.loads reads, however the input is chunked."""
+
+import gzip
+import io
+import json
+
+import pytest
+
+import synth
+from chaos_stream import ChaosStream, iter_chaos, open_chaos_file
+
+DOC = {
+    "info": {"metagame": "gen9vgc2026regf", "cutoff": 1760, "number of battles": 12345},
+    "data": {
+        "Flabébé": {"Moves": {"moonblast": 10.5, "protect": 3}, "Raw count": 7, "usage": 0.012},
+        "Incineroar": {"Moves": {}, "Teammates": {"Rillaboom": 1e-05, "Flabébé": 2}, "usage": 0.5},
+        "Porygon2": {"Spreads": {"Sassy:252/4/0/0/252/0": 1.25}, "Checks and Counters": {}},
+        "\"Quoted\" \\ Name": {"Items": {"leftovers": -0.0}, "usage": 1},
+    },
+    "extra": [1, 2, {"x": None}],
+}
+
+def encoded(doc, **kwargs) -> bytes:
+    return json.dumps(doc, ensure_ascii=False, **kwargs).encode("utf-8")
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_matches_json_loads(chunk_size, indent):
+    chaos = ChaosStream(io.BytesIO(encoded(DOC, indent=indent)), chunk_size)
+    assert list(chaos) == list(DOC["data"].items())
+    assert chaos.info == DOC["info"]
+    assert chaos.extra == {"extra": DOC["extra"]}
+
+def test_text_streams_and_gzip(tmp_path):
+    text = encoded(DOC).decode("utf-8")
+    assert list(ChaosStream(io.StringIO(text), 1)) == list(DOC["data"].items())
+
+    path = str(tmp_path / "chaos.json.gz")
+    with gzip.open(path, "wb") as f:
+        f.write(encoded(DOC))
+    info = {}
+    with open_chaos_file(path) as f:
+        assert dict(iter_chaos(f, chunk_size=7, info=info)) == DOC["data"]
+    assert info == DOC["info"]
+
+def test_synthetic_chaos_file():
+    doc = synth.make_chaos(species=40, spreads=60, seed=3)
+    assert list(ChaosStream(io.BytesIO(encoded(doc)), 4096)) == list(doc["data"].items())
+
+def test_empty_data():
+    assert list(ChaosStream(io.BytesIO(b'{"info": {}, "data": {}}'), 1)) == []
+
+@pytest.mark.parametrize("cut", [1, 10, 40])
+def test_truncated_input_raises(cut):
+    raw = encoded(DOC)[:-cut]
+    with pytest.raises(ValueError):
+        list(ChaosStream(io.BytesIO(raw), 3))
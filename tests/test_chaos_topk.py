@@ -0,0 +1,50 @@
+"""batch_entry_details must reproduce extract_top_items field by field."""
+
+import random
+
+import chaos_topk
+import synth
+from chaos_topk import TOP_FIELDS, batch_entry_details, top_items_batch
+from fetch_smogon_stats import extract_top_items
+
+def expected(info: dict) -> dict:
+    detail = {name: extract_top_items(info.get(field, {}), limit=limit) for name, field, limit in TOP_FIELDS}
+    detail["sample_size"] = info.get("Raw count", 0)
+    return detail
+
+def tricky_entries() -> list[dict]:
+    rng = random.Random(11)
+    entries = [
+        {},
+        {"Moves": {}, "Items": None},
+        {"Moves": {"a": 0, "b": 0}},                                    # zero total
+        {"Moves": {k: 5 for k in "abcdefghijklmn"}},                   # all tied past the limit
+        {"Items": {"x": 3, "y": 3, "z": 1}, "Raw count": 9},            # fewer keys than the limit
+        {"Spreads": {f"s{i}": float(i % 4) for i in range(40)}},        # ties straddling the cut
+        {"Tera Types": {"Fairy": 1e-9, "Water": 2.5e-9}},
+    ]
+    for _ in range(50):
+        size = rng.choice([1, 2, 9, 10, 11, 33, 300])
+        entries.append({field: {f"{field}-{i}": rng.choice([0, 1, 2, 2.5, rng.random() * 100])
+                                for i in range(size)}
+                        for _, field, _ in TOP_FIELDS})
+    return entries
+
+def test_matches_extract_top_items_on_edge_cases():
+    entries = tricky_entries()
+    assert batch_entry_details(entries) == [expected(info) for info in entries]
+
+def test_matches_extract_top_items_on_synthetic_chaos():
+    entries = list(synth.make_chaos(species=60, spreads=200, seed=5)["data"].values())
+    assert batch_entry_details(entries) == [expected(info) for info in entries]
+
+def test_top_items_batch_limits():
+    counts = {f"k{i}": 100 - i for i in range(20)}
+    tops = top_items_batch([counts, counts, {}], [3, 25, 10])
+    assert [item["key"] for item in tops[0]] == ["k0", "k1", "k2"]
+    assert len(tops[1]) == 20 and tops[2] == []
+
+def test_fallback_without_numpy(monkeypatch):
+    monkeypatch.setattr(chaos_topk, "np", None)
+    entries = tricky_entries()[:10]
+    assert batch_entry_details(entries, fallback=extract_top_items) == [expected(info) for info in entries]
@@ -0,0 +1,64 @@
+"""Wilson and Newcombe intervals against Newcombe (1998)'s worked examples."""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from confidence import Z, bounds, difference_interval, proportion_interval
+
+# Newcombe, Statistics in Medicine 17 (1998): Table I (Wilson score, method 3)
+WILSON_EXAMPLES = [
+    (81, 263, 0.2553, 0.3662),
+    (15, 148, 0.0624, 0.1605),
+    (0, 20, 0.0000, 0.1611),
+    (1, 29, 0.0061, 0.1718),
+    (29, 29, 0.8830, 1.0000),
+]
+
+# Newcombe, Statistics in Medicine 17 (1998): Table II (hybrid score, method 10)
+NEWCOMBE_EXAMPLES = [
+    (56, 70, 48, 80, 0.0524, 0.3339),
+    (9, 10, 3, 10, 0.1705, 0.8090),
+    (5, 56, 0, 29, -0.0381, 0.1926),
+    (0, 10, 0, 20, -0.1611, 0.2775),
+    (10, 10, 0, 20, 0.6791, 1.0000),
+]
+
+def test_wilson_published_examples():
+    k, n, low, high = map(np.array, zip(*WILSON_EXAMPLES))
+    got_low, got_high = proportion_interval(k, n)
+    assert np.allclose(got_low, low, atol=5e-5) and np.allclose(got_high, high, atol=5e-5)
+
+def test_newcombe_published_examples():
+    k1, n1, k2, n2, low, high = map(np.array, zip(*NEWCOMBE_EXAMPLES))
+    got_low, got_high = difference_interval(k1, n1, k2, n2)
+    assert np.allclose(got_low, low, atol=5e-5) and np.allclose(got_high, high, atol=5e-5)
+
+def scalar_wilson(k: int, n: int):
+    p = k / n
+    denom = 1 + Z * Z / n
+    center = (p + Z * Z / (2 * n)) / denom
+    half = Z * math.sqrt(p * (1 - p) / n + Z * Z / (4 * n * n)) / denom
+    return max(center - half, 0), min(center + half, 1)
+
+def test_vectorized_matches_scalar():
+    rng = random.Random(0)
+    cells = [(rng.randint(0, n), n) for n in (rng.randint(1, 5000) for _ in range(2000))]
+    low, high = proportion_interval([k for k, _ in cells], [n for _, n in cells])
+    expected = np.array([scalar_wilson(k, n) for k, n in cells])
+    assert np.allclose(low, expected[:, 0]) and np.allclose(high, expected[:, 1])
+    assert ((low <= np.array([k / n for k, n in cells])) & (low >= 0) & (high <= 1)).all()
+
+def test_empty_cells_and_rounding():
+    low, high = proportion_interval([0, 3], [0, 10])
+    assert np.isnan(low[0]) and np.isnan(high[0])
+    low, high = difference_interval([1, 2], [0, 4], [1, 1], [5, 4])
+    assert np.isnan(low[0]) and not np.isnan(low[1])
+    assert bounds(*proportion_interval([0, 3], [0, 10]), scale=100) == [[None, None], [10.78, 60.32]]
+
+@pytest.mark.parametrize("k,n", [(0, 1), (1, 1), (500, 1000)])
+def test_interval_contains_point_estimate(k, n):
+    low, high = proportion_interval([k], [n])
+    assert low[0] <= k / n <= high[0] and high[0] > low[0]
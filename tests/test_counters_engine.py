@@ -0,0 +1,58 @@
+"""CountersEngine counts and rankings against a per-battle brute force."""
+
+import math
+from collections import Counter
+
+from conftest import random_battles
+from counters_engine import CountersEngine
+
+def brute_force(battles):
+    n_wins, n_losses, win_appear, loss_appear = Counter(), Counter(), Counter(), Counter()
+    for p1, p2, winner in battles:
+        if winner not in (1, 2):
+            continue
+        p1, p2 = set(p1), set(p2)
+        # A species on both teams counts as a p1 target only
+        for targets, answers, won in ((p1, p2, winner == 1), (p2 - p1, p1, winner == 2)):
+            for t in targets:
+                (n_wins if won else n_losses)[t] += 1
+                for a in answers:
+                    (win_appear if won else loss_appear)[t, a] += 1
+    return n_wins, n_losses, win_appear, loss_appear
+
+def engine_counts(engine):
+    slugs = engine.registry.slugs
+    vector = lambda v: Counter({slugs[i]: int(n) for i, n in enumerate(v.tolist()) if n})
+    matrix = lambda m: Counter({(slugs[i], slugs[j]): int(m[i, j]) for i, j in zip(*m.nonzero())})
+    return vector(engine.n_wins), vector(engine.n_losses), matrix(engine.win_appear), matrix(engine.loss_appear)
+
+def test_counts_match_brute_force(battles):
+    battles = battles + [(["mon-0"], ["mon-0", "mon-1"], 2), (["mon-3"], ["mon-4"], None)]
+    engine = CountersEngine()
+    for start in range(0, len(battles), 37):  # Several batches, registry growing in between
+        engine.add_battles(battles[start:start + 37])
+    assert engine_counts(engine) == brute_force(battles)
+    assert engine.battles == sum(1 for b in battles if b[2] in (1, 2))
+
+def test_counters_ranking():
+    battles = random_battles(600, seed=4)
+    engine = CountersEngine()
+    engine.add_battles(battles)
+    n_wins, n_losses, win_appear, loss_appear = brute_force(battles)
+
+    target, min_sample = "mon-0", 20
+    expected = []
+    for (t, a) in set(win_appear) | set(loss_appear):
+        if t != target or win_appear[t, a] + loss_appear[t, a] < min_sample:
+            continue
+        loss_rate = loss_appear[t, a] / n_losses[t] if n_losses[t] else None
+        win_rate = win_appear[t, a] / n_wins[t] if n_wins[t] else None
+        score = loss_rate - win_rate if loss_rate is not None and win_rate is not None else None
+        expected.append((a, score))
+    expected.sort(key=lambda row: (0, 0.0, row[0]) if row[1] is None else (1, -row[1], row[0]))
+
+    rows = engine.counters(target, min_sample, limit=15)
+    assert [row[0] for row in rows] == [a for a, _ in expected[:15]]
+    for row, (_, score) in zip(rows, expected):
+        assert math.isclose(row[7], score, abs_tol=1e-12)
+    assert engine.counters("never-seen", 1, 5) == []
@@ -0,0 +1,127 @@
+"""Bloom filter, crawl state and the incremental crawl's stop conditions."""
+
+import json
+from urllib.error import HTTPError
+
+import pytest
+
+import fetch_replays
+from crawl_state import BloomFilter, CrawlState
+
+def test_bloom_has_no_false_negatives_and_few_false_positives(tmp_path):
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    bloom.update(f"gen9vgc-{i}" for i in range(5000))
+    assert all(f"gen9vgc-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+    path = str(tmp_path / "known.bloom")
+    bloom.save(path)
+    loaded = BloomFilter.load(path)
+    assert loaded.bits == bloom.bits and len(loaded) == len(bloom)
+
+def test_bloom_rejects_truncated_file(tmp_path):
+    path = str(tmp_path / "known.bloom")
+    BloomFilter(capacity=100).save(path)
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 1)
+    with pytest.raises(ValueError):
+        BloomFilter.load(path)
+
+def test_crawl_state_round_trip(tmp_path):
+    state = CrawlState("fmt", str(tmp_path))
+    state.observe(200)
+    state.observe(150)
+    state.page_done(3)
+    state.seen("r1")
+    state.commit()
+
+    resumed = CrawlState("fmt", str(tmp_path))
+    assert resumed.start_page() == 4
+    assert resumed.is_known("r1")
+    resumed.complete()
+    assert resumed.high_water == 200 and resumed.start_page() == 1
+    assert resumed.is_covered(200) and not resumed.is_covered(201)
+
+def fake_site(pages: dict):
+    """fetch_url stand-in: search pages from pages (an exception is raised), details for any ID."""
+    def fetch_url(url: str) -> str:
+        if "search.json" in url:
+            page = pages.get(int(url.rsplit("=", 1)[1]), [])
+            if isinstance(page, Exception):
+                raise page
+            return page if isinstance(page, str) else json.dumps(page)
+        replay_id = url.rsplit("/", 1)[1][:-len(".json")]
+        return json.dumps({"id": replay_id, "log": "", "uploadtime": 1})
+    return fetch_url
+
+def crawl(monkeypatch, tmp_path, pages: dict, high_water: int = 100):
+    monkeypatch.setattr(fetch_replays, "fetch_url", fake_site(pages))
+    state = CrawlState("fmt", str(tmp_path))
+    state.high_water = high_water
+    records = []
+    try:
+        for record in fetch_replays.iter_replays("fmt", 0, 100, rps=0, state=state):
+            records.append(record["replay_id"])
+    except Exception as e:
+        return records, state, e
+    return records, state, None
+
+PAGE_1 = [{"id": "a1", "uploadtime": 300}, {"id": "a2", "uploadtime": 290}]
+
+def test_crawl_completes_on_empty_page(monkeypatch, tmp_path):
+    records, state, error = crawl(monkeypatch, tmp_path, {1: PAGE_1, 2: []})
+    assert error is None and records == ["a1", "a2"]
+    assert state.high_water == 300 and state.checkpoint is None
+
+def test_crawl_completes_on_known_replays(monkeypatch, tmp_path):
+    pages = {1: PAGE_1 + [{"id": "old", "uploadtime": 50}], 2: HTTPError("x", 500, "x", None, None)}
+    records, state, error = crawl(monkeypatch, tmp_path, pages)
+    assert error is None and records == ["a1", "a2"]
+    assert state.high_water == 300
+
+@pytest.mark.parametrize("failure", [
+    HTTPError("x", 503, "Service Unavailable", None, None),
+    RuntimeError("Failed after retries"),
+    "[{\"id\": \"trunc",
+    {"error": "rate limited"},
+])
+def test_failed_search_page_does_not_advance_high_water(monkeypatch, tmp_path, failure):
+    records, state, error = crawl(monkeypatch, tmp_path, {1: PAGE_1, 2: failure})
+    assert error is not None
+    # Page 1 is kept and checkpointed; the high-water mark stays put
+    assert records == ["a1", "a2"]
+    assert state.high_water == 100
+    assert state.start_page() == 2
+
+class FakeWriter:
+    """ReplayWriter stand-in that keeps replay IDs in memory."""
+    def __init__(self, conn, format_id, batch_size):
+        self.conn, self.ids = conn, []
+
+    def write(self, record):
+        self.ids.append(record["replay_id"])
+
+    def close(self):
+        pass
+
+class FakeConn:
+    def close(self):
+        pass
+
+def test_failed_crawl_saves_progress_and_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(fetch_replays, "fetch_url", fake_site({1: PAGE_1, 2: RuntimeError("Failed after retries")}))
+    monkeypatch.setattr(fetch_replays, "CrawlState", lambda name: CrawlState(name, str(tmp_path)))
+    monkeypatch.setattr(fetch_replays, "ReplayWriter", FakeWriter)
+    monkeypatch.setattr(fetch_replays, "get_db_connection", FakeConn)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr("sys.argv", ["fetch_replays.py", "--format", "fmt", "--incremental",
+                                     "--min-rating", "0", "--rps", "0"])
+    # The error escapes main, so the process exits non-zero
+    with pytest.raises(RuntimeError):
+        fetch_replays.main()
+
+    # Page 1 was written and checkpointed before the failure surfaced
+    saved = CrawlState("fmt", str(tmp_path))
+    assert saved.start_page() == 2 and saved.high_water is None
+    assert saved.is_known("a1") and saved.is_known("a2")
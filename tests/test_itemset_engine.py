@@ -0,0 +1,50 @@
+"""ItemsetEngine counts and partner lists against enumerating every subset."""
+
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+
+from itemset_engine import MIN_PARTNER_COUNT, ItemsetEngine, merge_counts, pack, unpack
+
+def subset_counts(teams, size):
+    return Counter(s for team in teams for s in combinations(sorted(set(team)), size))
+
+def ranked(counts: dict, total: int, limit: int = 10):
+    items = sorted(((n, s) for s, n in counts.items() if n >= MIN_PARTNER_COUNT), key=lambda x: (-x[0], x[1]))
+    return [(s, n, round(n / total * 100, 2)) for n, s in items[:limit]]
+
+def test_pack_round_trip_and_merge():
+    ids = np.array([[0, 5, 4095], [1, 2, 3]], dtype=np.int64)
+    assert (unpack(pack(ids), 3) == ids).all()
+    keys, counts = merge_counts(np.array([1, 5]), np.array([2, 1]), np.array([5, 3, 5]))
+    assert keys.tolist() == [1, 3, 5] and counts.tolist() == [2, 1, 3]
+
+def test_counts_and_partners_match_brute_force(battles):
+    teams = [team for p1, p2, _ in battles for team in (p1, p2)]
+    engine = ItemsetEngine()
+    for start in range(0, len(teams), 64):
+        engine.add_teams(teams[start:start + 64])
+
+    slugs = engine.registry.slugs
+    for size in (3, 4):
+        got = {tuple(sorted(slugs[i] for i in row)): n
+               for row, n in zip(unpack(engine.keys[size], size).tolist(), engine.counts[size].tolist())}
+        assert got == subset_counts(teams, size)
+
+    pairs = subset_counts(teams, 2).most_common(25)
+    triples, quads = subset_counts(teams, 3), subset_counts(teams, 4)
+    lists = engine.partner_lists([pair for pair, _ in pairs], [n for _, n in pairs])
+    for (pair, n_pair), (thirds, fourths) in zip(pairs, lists):
+        third = ranked({c: triples[tuple(sorted(pair + (c,)))] for c in set(slugs) - set(pair)}, n_pair)
+        assert [(e["pokemon"], e["n"], e["pct"]) for e in thirds] == third
+        assert [e["rank"] for e in thirds] == list(range(1, len(thirds) + 1))
+        if not third:
+            assert fourths == []
+            continue
+        core = pair + (third[0][0],)
+        fourth = ranked({d: quads[tuple(sorted(core + (d,)))] for d in set(slugs) - set(core)}, third[0][1])
+        assert [(e["pokemon"], e["n"], e["pct"]) for e in fourths] == fourth
+        for entry in thirds + fourths:
+            low, high = entry["ci"]
+            assert low <= entry["pct"] <= high
@@ -0,0 +1,28 @@
+"""PairEngine pair rows against counting every pair of every team."""
+
+from collections import Counter
+from itertools import combinations
+
+from pair_engine import MIN_PAIR_COUNT, PairEngine
+
+def test_pair_rows_match_brute_force(battles):
+    teams = [team for p1, p2, _ in battles for team in (p1, p2)] + [[], None, ["mon-1", "mon-1"]]
+    engine = PairEngine()
+    for start in range(0, len(teams), 50):
+        engine.add_teams(teams[start:start + 50])
+
+    counted = [set(team) for team in teams if team]
+    pairs = Counter(pair for team in counted for pair in combinations(sorted(team), 2))
+    expected = {pair: n for pair, n in pairs.items() if n >= MIN_PAIR_COUNT}
+
+    rows = engine.pair_rows()
+    assert engine.teams == len(counted)
+    assert {tuple(sorted((a, b))): n for a, b, _, n in rows} == expected
+    for a, b, rate, n in rows:
+        assert rate == round(n / len(counted) * 100, 2)
+    assert [n for _, _, _, n in rows] == sorted((n for _, _, _, n in rows), reverse=True)
+
+def test_empty_engine():
+    engine = PairEngine()
+    engine.add_teams([[], None])
+    assert engine.pair_rows() == [] and engine.teams == 0
@@ -0,0 +1,74 @@
+"""parse_log must agree with the per-line regex/split parsers it replaced."""
+
+import synth
+from showdown_log import parse_log, parse_replay
+from species import slugify
+
+def legacy_team(log: str, player: int) -> list[str]:
+    """extract_team_from_log before the single-pass parser."""
+    team = []
+    player_prefix = f"|poke|p{player}|"
+    for line in log.split("\n"):
+        if line.startswith(player_prefix):
+            parts = line.split("|")
+            if len(parts) >= 4:
+                slug = slugify(parts[3].split(",")[0].strip())
+                if slug and slug not in team:
+                    team.append(slug)
+    return team[:6]
+
+def legacy_winner(log: str):
+    """extract_winner before the single-pass parser."""
+    for line in log.split("\n"):
+        if line.startswith("|win|"):
+            winner_name = line.split("|")[2]
+            for check_line in log.split("\n"):
+                if check_line.startswith("|player|p1|") and winner_name in check_line:
+                    return 1
+                if check_line.startswith("|player|p2|") and winner_name in check_line:
+                    return 2
+    return None
+
+def team(parsed: dict, side: int) -> list[str]:
+    out = []
+    for name in parsed["teams"][side]:
+        slug = slugify(name)
+        if slug and slug not in out:
+            out.append(slug)
+    return out[:6]
+
+EDGE_LOGS = [
+    "",
+    "|player|p1|Alice|1|1700\n|player|p2|Bob|2|1650\n|poke|p1|Pelipper, F|\n|poke|p2|Torkoal|\n|start\n|win|Bob",
+    # |win| before |start| (forfeit during team preview)
+    "|player|p1|Alice|1\n|player|p2|Bob|2\n|poke|p1|Incineroar, M|\n|win|Alice\n|start",
+    # No winner
+    "|player|p1|Alice|1\n|player|p2|Bob|2\n|poke|p1|Incineroar|\n|start\n|turn|1",
+    # Player lines only after the header
+    "|poke|p1|Rillaboom|\n|start\n|player|p1|Alice|1\n|player|p2|Bob|2\n|win|Bob",
+    # Winner whose name is a substring of the other player's line
+    "|player|p1|Bobby|1\n|player|p2|Bob|2\n|poke|p2|Urshifu-*|\n|start\n|win|Bob\n",
+    # Trailing |win| without a newline, accented names, duplicate preview lines
+    "|player|p1|Ann|1\n|player|p2|Cy|2\n|poke|p1|Flabébé|\n|poke|p1|Flabébé|\n|start\n|win|Cy",
+]
+
+def test_matches_legacy_on_synthetic_replays():
+    for replay in synth.iter_replays(300, species=60, seed=7):
+        log = replay["log"]
+        parsed = parse_log(log)
+        assert team(parsed, 1) == legacy_team(log, 1)
+        assert team(parsed, 2) == legacy_team(log, 2)
+        assert parsed["winner_side"] == legacy_winner(log)
+
+def test_matches_legacy_on_edge_cases():
+    for log in EDGE_LOGS:
+        parsed = parse_log(log)
+        assert team(parsed, 1) == legacy_team(log, 1), log
+        assert team(parsed, 2) == legacy_team(log, 2), log
+        assert parsed["winner_side"] == legacy_winner(log), log
+
+def test_parse_replay_rating():
+    assert parse_replay({"rating": 1800, "log": ""})["rating"] == 1800
+    parsed = parse_replay({"p1rating": {"elo": 1700}, "p2rating": {"elo": 1600}, "uploadtime": 5})
+    assert (parsed["rating"], parsed["rating_source"], parsed["upload_time"]) == (1650, "estimated", 5)
+    assert parse_replay({})["rating_source"] == "unknown"
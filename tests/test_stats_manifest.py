@@ -0,0 +1,56 @@
+"""When the stats manifest lets a scheduled run skip downloading or loading."""
+
+import io
+from datetime import datetime
+
+from stats_manifest import HashingReader, StatsManifest
+
+URL = "https://www.smogon.com/stats/2026-01/gen9vgc2026regf-1760.txt"
+HEADERS = {"etag": '"abc"', "last-modified": "Mon, 02 Feb 2026 00:00:00 GMT", "content-length": "10"}
+
+def loaded_manifest(tmp_path) -> StatsManifest:
+    manifest = StatsManifest(str(tmp_path / "manifest.json"))
+    manifest.record(URL, HEADERS, 10, "h1", format="gen9vgc2026regf", month="2026-01", cutoff=1760, kind="usage")
+    manifest.mark_loaded([URL])
+    return manifest
+
+def test_unchanged_only_after_load(tmp_path):
+    manifest = StatsManifest(str(tmp_path / "manifest.json"))
+    manifest.record(URL, HEADERS, 10, "h1")
+    probe = {"etag": '"abc"', "size": 10}
+    assert not manifest.matches(URL, probe)  # Downloaded but never loaded
+    manifest.mark_loaded([URL])
+    assert manifest.matches(URL, probe)
+    assert not manifest.matches(URL, {"etag": '"def"', "size": 10})
+    assert not manifest.matches(URL, {"etag": '"abc"', "size": 11})
+    assert not manifest.matches(URL, {})  # No validators to compare
+
+def test_same_content_under_new_validators_is_still_loaded(tmp_path):
+    manifest = loaded_manifest(tmp_path)
+    manifest.record(URL, {"etag": '"new"'}, 10, "h1")
+    assert manifest.content_loaded([URL])
+    manifest.record(URL, {"etag": '"newer"'}, 12, "h2")
+    assert not manifest.content_loaded([URL])
+
+def test_round_trip_and_missing_files(tmp_path):
+    manifest = loaded_manifest(tmp_path)
+    manifest.record_missing("https://example/missing.json")
+    manifest.save()
+    reloaded = StatsManifest(manifest.path)
+    assert reloaded.matches(URL, {"etag": '"abc"'})
+    assert reloaded.matches("https://example/missing.json", None)
+    assert reloaded.content_loaded([URL, "https://example/missing.json"])
+
+def test_latest_month_probes_only_newer_months(tmp_path, monkeypatch):
+    manifest = loaded_manifest(tmp_path)
+    probed = []
+    monkeypatch.setattr(StatsManifest, "probe", staticmethod(lambda url: probed.append(url) or None))
+    month = manifest.latest_month(lambda m: f"u/{m}", "gen9vgc2026regf", 1760, now=datetime(2026, 3, 5))
+    assert month == "2026-01" and probed == ["u/2026-03", "u/2026-02"]
+
+def test_hashing_reader_counts_bytes():
+    reader = HashingReader(io.BytesIO(b"hello world"))
+    while reader.read(3):
+        pass
+    assert reader.size == 11
+    assert reader.hexdigest() == "b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9"
@@ -0,0 +1,69 @@
+"""TeamIndex lookups against a brute-force Jaccard scan of every stored team."""
+
+import random
+
+import pytest
+
+from team_index import TeamIndex
+from conftest import random_battles
+
+FORMAT_ID = "test-team-index"
+
+def indexed_rows(count: int, seed: int = 0) -> list[tuple]:
+    rng = random.Random(seed)
+    return [(f"{FORMAT_ID}-{i}", p1, p2, rng.choice([None, 1500, 1600, 1700, 1800]))
+            for i, (p1, p2, _) in enumerate(random_battles(count, seed))]
+
+def brute_force_best(rows, query) -> float:
+    query = set(query)
+    return max(len(query & set(team)) / len(query | set(team))
+               for row in rows for team in row[1:3] if team)
+
+def test_exact_match_is_top_hit():
+    rows = indexed_rows(500)
+    index = TeamIndex.build(rows)
+    for replay_id, p1, _, _ in rows[:50]:
+        hits = index.query(p1, limit=500)
+        assert hits[0]["similarity"] == 1.0
+        assert sorted(hits[0]["team"]) == sorted(p1)
+        assert replay_id in {hit["replay_id"] for hit in hits if hit["similarity"] == 1.0}
+
+def test_top_hit_matches_brute_force():
+    rows = indexed_rows(500)
+    index = TeamIndex.build(rows)
+    rng = random.Random(7)
+    species = sorted({mon for row in rows for team in row[1:3] for mon in team})
+    found = 0
+    for _ in range(100):
+        # Perturb a stored team by one species: a 5-of-6 neighbour always exists
+        query = list(rng.choice(rows)[1])
+        query[rng.randrange(len(query))] = rng.choice([s for s in species if s not in query])
+        hits = index.query(query, limit=1)
+        best = brute_force_best(rows, query)
+        if hits:
+            assert hits[0]["similarity"] <= best + 1e-4
+            found += abs(hits[0]["similarity"] - best) < 1e-4
+    assert found >= 90
+
+def test_results_are_ordered_and_filtered():
+    rows = indexed_rows(500)
+    index = TeamIndex.build(rows)
+    hits = index.query(rows[0][1], limit=20, min_rating=1700)
+    assert hits and all(hit["rating"] >= 1700 for hit in hits)
+    keys = [(-hit["similarity"], -hit["rating"]) for hit in hits]
+    assert keys == sorted(keys)
+    assert index.query(["never-seen"]) == []
+    assert index.query([]) == []
+
+def test_save_and_load(db_conn):
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT to_regclass('team_index')")
+    if cursor.fetchone()[0] is None:
+        pytest.skip("team_index table not created")
+    rows = indexed_rows(200)
+    index = TeamIndex.build(rows)
+    index.save(db_conn, FORMAT_ID)
+    loaded = TeamIndex.load(db_conn, FORMAT_ID)
+    for _, p1, _, _ in rows[:20]:
+        assert loaded.query(p1) == index.query(p1)
+    assert TeamIndex.load(db_conn, FORMAT_ID + "-missing") is None
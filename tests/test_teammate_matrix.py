@@ -0,0 +1,56 @@
+"""TeammateMatrix pair rows against the joint-rate definition, pair by pair."""
+
+import synth
+from species import slugify
+from teammate_matrix import MIN_PAIR_SAMPLE, TeammateMatrix
+
+def brute_force_pairs(data: dict, battles: int) -> dict:
+    cond = {}
+    usage = {}
+    for name, info in data.items():
+        a = slugify(name)
+        usage[a] = float(info.get("usage", 0))
+        weight = sum((info.get("Abilities") or {}).values())
+        if weight > 0:
+            for mate, count in (info.get("Teammates") or {}).items():
+                b = slugify(mate)
+                if b != a:
+                    cond[a, b] = cond.get((a, b), 0) + min(max(count / weight, 0), 1) * usage[a]
+    pairs = {}
+    entered = sorted(usage)
+    for i, a in enumerate(entered):
+        for b in entered[i + 1:]:
+            estimates = [cond[k] for k in ((a, b), (b, a)) if cond.get(k, 0) > 0]
+            if not estimates:
+                continue
+            rate = min(sum(estimates) / len(estimates), usage[a], usage[b])
+            if rate <= 0:
+                continue
+            sample = round(rate * 2 * battles)
+            if sample >= MIN_PAIR_SAMPLE:
+                pairs[a, b] = (round(rate * 100, 2), sample)
+    return pairs
+
+def test_pair_rows_match_definition():
+    doc = synth.make_chaos(species=50, spreads=20, battles=50000, seed=2)
+    battles = doc["info"]["number of battles"]
+    matrix = TeammateMatrix()
+    for name, info in doc["data"].items():
+        matrix.add(name, info)
+
+    rows = {tuple(sorted((a, b))): (rate, n) for a, b, rate, n in matrix.pair_rows(battles)}
+    expected = brute_force_pairs(doc["data"], battles)
+    assert rows.keys() == expected.keys()
+    for pair, (rate, n) in expected.items():
+        assert abs(rows[pair][0] - rate) <= 0.01 and abs(rows[pair][1] - n) <= 1, pair
+
+def test_teammates_without_own_entry_are_not_paired():
+    matrix = TeammateMatrix()
+    matrix.add("Incineroar", {"usage": 0.5, "Abilities": {"Intimidate": 100},
+                              "Teammates": {"Rillaboom": 40, "Ghostmon": 30}})
+    matrix.add("Rillaboom", {"usage": 0.4, "Abilities": {"Grassy Surge": 80},
+                             "Teammates": {"Incineroar": 40}})
+    rows = matrix.pair_rows(battles=1000)
+    assert [(a, b) for a, b, _, _ in rows] == [("incineroar", "rillaboom")]
+    # Both directions: 0.4 * 0.5 and 0.5 * 0.4 -> 20% of teams
+    assert rows[0][2:] == (20.0, 400)